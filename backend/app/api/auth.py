@@ -1,8 +1,14 @@
-from fastapi import Security
+from typing import Optional
+
+from fastapi import Depends, HTTPException, Request, Security
 from fastapi.security import APIKeyHeader
 
+from app.services.groq_scheduler import ANONYMOUS_KEY
+
 api_key_header = APIKeyHeader(name="X-API-Key", auto_error=False)
 VALID_API_KEYS = ["dev-key-123", "prod-key-456"]
+# Only a local proxy (app.dispatcher) may tell us who the client is
+TRUSTED_PROXY_HOSTS = {"127.0.0.1", "::1"}
 
 def verify_api_key(api_key: str = Security(api_key_header)):
     # If no key is provided, just allow access (optional auth)
@@ -14,3 +20,21 @@ def verify_api_key(api_key: str = Security(api_key_header)):
         return None
     return api_key
 
+
+def require_api_key(api_key: Optional[str] = Depends(verify_api_key)) -> str:
+    """Like verify_api_key, but rejects callers without a valid key (operator-only endpoints)."""
+    if api_key is None:
+        raise HTTPException(status_code=401, detail="A valid X-API-Key header is required")
+    return api_key
+
+
+def scheduler_key(request: Request, api_key: Optional[str] = Depends(verify_api_key)) -> str:
+    """Caller identity for per-caller Groq queue limits: the API key, else the client address."""
+    if api_key:
+        return api_key
+    host = request.client.host if request.client else "unknown"
+    forwarded = request.headers.get("x-forwarded-for")
+    if forwarded and host in TRUSTED_PROXY_HOSTS:
+        # The proxy appends the address it saw; earlier entries are client-supplied
+        host = forwarded.split(",")[-1].strip()
+    return f"{ANONYMOUS_KEY}:{host}"
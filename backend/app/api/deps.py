@@ -1,19 +1,42 @@
-from langchain_groq import ChatGroq
+import threading
 from app.config import config
-from app.storage.vector_store import get_vectorstore
-from app.services.qa_chain import create_qa_chain
+from app.services.groq_scheduler import get_async_groq_client, get_async_http_client, get_http_client
 
-def get_llm():
+LLM_MAX_TOKENS = 1024
+
+_llm = None
+_llm_lock = threading.Lock()
+
+def build_llm():
     """Return LLM based on provider setting."""
     if config.LLM_PROVIDER == "groq":
+        from langchain_groq import ChatGroq
+
+        # Pooled HTTP clients feed rate-limit headers to the scheduler, which also owns retries
+        pooled = {"http_client": get_http_client()}
+        if "http_async_client" in ChatGroq.__fields__:
+            pooled["http_async_client"] = get_async_http_client()
+        else:
+            # Older langchain-groq hands `http_client` to AsyncGroq as well, which cannot
+            # drive a sync httpx.Client; give the async path its own pooled client
+            pooled["async_client"] = get_async_groq_client().chat.completions
+        if config.GROQ_BASE_URL:
+            pooled["groq_api_base"] = config.GROQ_BASE_URL
         return ChatGroq(
             groq_api_key=config.GROQ_API_KEY,
             model_name=config.GROQ_MODEL,
             temperature=0.3,  # Lower temperature for more focused responses
-            max_tokens=1024
+            max_tokens=LLM_MAX_TOKENS,
+            streaming=True,  # Token callbacks fire as they arrive, which lets us measure TTFT
+            max_retries=0,
+            **pooled
         )
 
-# Initialize once when app starts
-llm = get_llm()
-vectorstore = get_vectorstore()
-qa_chain = create_qa_chain(llm, vectorstore)
\ No newline at end of file
+def get_llm():
+    """Shared LLM client, built on first use (or during warm-up)."""
+    global _llm
+    if _llm is None:
+        with _llm_lock:
+            if _llm is None:
+                _llm = build_llm()
+    return _llm
@@ -1,21 +1,36 @@
 # app/api/endpoints.py
 
 import asyncio
-import os
+import json
 import re
-import uuid
-import logging
-from fastapi import APIRouter
+import time
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException
 from fastapi.responses import StreamingResponse
-from app.models.schemas import AskRequest
-from app.storage.vector_store import load_vectorstore_for_video, create_vectorstore_for_video
+from app.models.schemas import AskRequest, BatchAskRequest, SummaryResponse, WarmRequest
+from app.storage.vector_store import load_vectorstore_for_video
 from app.services.qa_chain import create_qa_chain
-from app.api.deps import llm
+from app.api.deps import get_llm
+from app.api.auth import require_api_key, scheduler_key
 from app.storage.cache import load_transcript
 from app.services.transcripts import get_transcript
+from app.services.batch_qa import answer_batch
+from app.services.extractive import extractive_answer, record_llm_seconds
+from app.services.ingestion import index_transcript, ingest_video, load_or_ingest_vectorstore
+from app.services.warm_report import summarize_warm_run
+from app.services import prefetch
+from app.services.availability import probe_availability
+from app.services.summaries import cached_overview_answer, get_or_build_summary_tree, root_summary, section_summaries
+from app.services.answer_streams import FrameCoalescer, resume_stream, start_stream
+from app.services.video_utils import extract_video_id, is_youtube_playlist_url, list_playlist_video_ids
+from app.services.groq_scheduler import INTERACTIVE, SchedulerBusy, get_scheduler, retry_after_header
+from app.config import config
+from app.utils.metrics import ANSWER_TIME_TO_FIRST_FRAME, ASK_REQUESTS_TOTAL
+from app.utils.logger import get_logger
+from app.utils.tracing import StageTimingCallback, get_request_id, stage
 
 router = APIRouter()
-logger = logging.getLogger(__name__)
+logger = get_logger(__name__)
 
 
 def remove_consecutive_duplicates(text: str) -> str:
@@ -46,32 +61,128 @@ def remove_consecutive_duplicates(text: str) -> str:
     return ' '.join(cleaned)
 
 
+def _admit_interactive(api_key: str, count: int = 1):
+    """Reserve Groq scheduler slots up front so overload is a fast 429, not a late SSE error."""
+    try:
+        return get_scheduler().admit(
+            INTERACTIVE, api_key, est_tokens=config.GROQ_EST_TOKENS_PER_ANSWER, count=count
+        )
+    except SchedulerBusy as e:
+        logger.warning(f"REQ {get_request_id()}: rejected ({e.reason}), retry after {e.retry_after:.1f}s")
+        raise HTTPException(status_code=429, detail=e.reason, headers=retry_after_header(e))
+
+
+async def _invoke_qa_chain(qa_chain, question: str, video_id: str, ticket, documents=None) -> dict:
+    """
+    Run RetrievalQA through the Groq scheduler.
+
+    With `documents` (already retrieved by the extractive stage), only the chain's
+    stuff-documents step runs, on those chunks.
+    """
+    callbacks = {"callbacks": [StageTimingCallback()]}
+    scheduler = get_scheduler()
+    with stage("qa.chain", video_id=video_id):
+        if documents is not None:
+            result = await scheduler.arun(
+                lambda: qa_chain.combine_documents_chain.ainvoke(
+                    {"input_documents": documents, "question": question}, config=callbacks
+                ),
+                ticket,
+            )
+            return {"result": result["output_text"]}
+        return await scheduler.arun(
+            lambda: qa_chain.ainvoke({"query": question}, config=callbacks),
+            ticket,
+        )
+
+
+async def _generate_answer(vectorstore, question: str, video_id: str, ticket) -> tuple[str, bool]:
+    """
+    Answer from a loaded vectorstore: a transcript span when the extractive fast path
+    is confident, otherwise RetrievalQA through Groq.
+
+    Returns:
+        (answer, extractive)
+    """
+    extracted, documents = await asyncio.to_thread(extractive_answer, vectorstore, question, video_id)
+    if extracted:
+        return extracted["answer"], True
+
+    qa_chain = create_qa_chain(get_llm(), vectorstore)
+    start = time.perf_counter()
+    result = await _invoke_qa_chain(qa_chain, question, video_id, ticket, documents)
+    record_llm_seconds(time.perf_counter() - start)
+    answer = str(result.get('result', result.get('answer', str(result)))).strip()
+    return remove_consecutive_duplicates(answer), False
+
+
+async def _release_if_unused(stream, ticket):
+    """Pass frames through; give the admission back if the stream ends before using it."""
+    try:
+        async for frame in stream:
+            yield frame
+    finally:
+        get_scheduler().release_unclaimed(ticket)
+
+
+async def _answer_frames(answer: str):
+    """Answer text as coalesced, de-duplicated word frames, paced for a typing effect."""
+    coalescer = FrameCoalescer(config.ANSWER_FRAME_MAX_CHARS, config.ANSWER_FRAME_MAX_DELAY)
+    prev_word = None
+    for word in answer.split():
+        word_clean = word.strip()
+        word_normalized = re.sub(r'[^\w]', '', word_clean).lower()
+        if word_normalized != prev_word or word_normalized == '':
+            prev_word = word_normalized
+            frame = coalescer.add(word_clean)
+            if frame:
+                yield frame
+                await asyncio.sleep(config.ANSWER_FRAME_INTERVAL)
+    frame = coalescer.flush()
+    if frame:
+        yield frame
+
+
+def _answer_response(stream, after: int = 0) -> StreamingResponse:
+    """Follow a buffered answer stream from event `after` onwards."""
+    return StreamingResponse(
+        stream.follow(after),
+        media_type="text/event-stream",
+        headers={"X-Stream-ID": stream.stream_id, "Cache-Control": "no-cache"},
+    )
+
+
 @router.get(
     '/check/{video_id}',
     summary="Check transcript availability",
     description="""
-    Checks whether a transcript or FAISS vectorstore already exists for the given video_id.
-    Falls back to a live transcript fetch if neither cache nor vectorstore is found.
-    Returns `{"status": "available"}` or `{"status": "unavailable"}`.
+    Cheap availability probe, safe to call on every video page view. Never downloads
+    a transcript or audio.
+
+    Checks, in order: cached transcript / FAISS index on disk, the availability cache
+    (positive and negative results, with separate TTLs), the caption listing, and
+    video metadata (a playable video can still be transcribed by the Whisper tiers).
+
+    With `CHECK_ENQUEUE_INGESTION` (off by default) or `ingest=true`, an available video
+    that is not yet ingested is prefetched: its transcript and index are built
+    speculatively, behind real questions, so the first question usually finds the index
+    ready. Prefetch only uses captions (`PREFETCH_CAPTIONS_ONLY`), never audio or
+    Whisper. The prefetch queue is bounded and drops stale entries.
+
+    Returns `{"status": "available" | "unavailable", "source": ..., "cached": bool}`,
+    plus `"ingestion": "queued" | "running"` when a prefetch was scheduled.
     """
 )
-def check_transcript_status(video_id: str):
-    transcript = load_transcript(video_id)
-    if transcript:
-        return {"status": "available"}
-
-    vectorstore_path = f"./data/faiss/{video_id}/"
-    if os.path.exists(vectorstore_path):
-        return {"status": "available"}
+def check_transcript_status(video_id: str, ingest: Optional[bool] = None):
+    result = probe_availability(video_id)
 
-    try:
-        transcript = get_transcript(video_id)
-        if transcript:
-            return {"status": "available"}
-    except Exception:
-        pass
+    should_ingest = config.CHECK_ENQUEUE_INGESTION if ingest is None else ingest
+    if should_ingest and result["status"] == "available" and result["source"] != "index":
+        state = prefetch.schedule(video_id, result["source"])
+        if state:
+            result["ingestion"] = state
 
-    return {"status": "unavailable"}
+    return result
 
 
 @router.post(
@@ -88,16 +199,33 @@ def check_transcript_status(video_id: str):
        - Tier 2: Groq Whisper API (audio < 24MB)
        - Tier 3: Local Whisper model (any size)
     3. Chunk transcript → embed → store in per-video FAISS index.
-    4. Run LangChain RetrievalQA (MMR, k=3) → stream answer.
+    4. With `EXTRACTIVE_ENABLED`, short lookup questions ("what tool does he use?") are
+       first scored against the sentences of the retrieved chunks; a confident match is
+       streamed as-is (extractive fast path, no LLM call).
+    5. Otherwise run LangChain RetrievalQA (MMR, k=3) → stream answer.
+
+    **Streaming format:** `id: <stream_id>:<seq>\\ndata: <words>\\n\\n` ... `data: [END]`.
+    Words are coalesced into frames of about `ANSWER_FRAME_MAX_CHARS` characters.
 
-    **Streaming format:** `data: <word>\\n\\n` ... `data: [END]\\n\\n`
+    **Resuming:** the answer is generated in the background and buffered for
+    `ANSWER_STREAM_TTL` seconds. If the connection drops, re-send the same request with
+    `Last-Event-ID: <last id received>` to get the remaining frames without recomputation.
+    If the buffer is gone, a new stream (new `stream_id`) starts from the beginning.
+
+    Returns **429** with `Retry-After` when the Groq queue for the caller (API key, or client
+    address without one) is full.
     """
 )
-async def ask_question_stream(body: AskRequest):
+async def ask_question_stream(
+    body: AskRequest,
+    api_key: str = Depends(scheduler_key),
+    last_event_id: Optional[str] = Header(None),
+):
     video_id = body.video_id
     question = body.question
 
-    logger.info(f"REQ {uuid.uuid4()}: video_id={video_id}, question_len={len(question)}")
+    request_start = time.perf_counter()
+    logger.info(f"REQ {get_request_id()}: video_id={video_id}, question_len={len(question)}", extra={"log_key": "ask"})
 
     if not video_id or not question:
         async def error_stream():
@@ -112,85 +240,268 @@ async def ask_question_stream(body: AskRequest):
             yield "data: [END]\n\n"
         return StreamingResponse(error_stream(), media_type="text/event-stream")
 
+    # Reconnect: replay the buffered answer instead of recomputing it
+    resumed = resume_stream(last_event_id, (video_id, question))
+    if resumed:
+        stream, last_seq = resumed
+        logger.info(f"REQ {get_request_id()}: resuming stream {stream.stream_id} after event {last_seq}")
+        return _answer_response(stream, last_seq)
+
+    # Broad "summarize / overview" questions: answer from the cached summary tree, no LLM call
+    overview = cached_overview_answer(video_id, question)
+    if overview:
+        ASK_REQUESTS_TOTAL.labels(endpoint="ask_stream", vectorstore="summary").inc()
+        ANSWER_TIME_TO_FIRST_FRAME.labels(path="summary").observe(time.perf_counter() - request_start)
+        return _answer_response(start_stream((video_id, question), _answer_frames(overview)))
+
+    ticket = _admit_interactive(api_key)[0]
+    # Take over a speculative prefetch started by /check, if any
+    _, prefetch_job = prefetch.claim(video_id)
+
     try:
-        vectorstore = load_vectorstore_for_video(video_id)
+        vectorstore = await asyncio.to_thread(load_vectorstore_for_video, video_id)
     except FileNotFoundError:
+        ASK_REQUESTS_TOTAL.labels(endpoint="ask_stream", vectorstore="cold").inc()
+
         async def processing_stream():
-            yield "data: 🔄 Processing video...\n\n"
+            yield "🔄 Processing video..."
             await asyncio.sleep(0.2)
 
-            transcript = load_transcript(video_id)
-            if not transcript:
+            vectorstore = None
+            if prefetch_job is not None:
+                await prefetch_job.wait(config.PREFETCH_JOIN_TIMEOUT)
                 try:
-                    transcript = get_transcript(video_id)
-                except Exception as e:
-                    yield f"data: ❌ Could not fetch transcript: {str(e)}\n\n"
-                    yield "data: [END]\n\n"
-                    return
-
-            yield "data: 🧠 Creating embeddings...\n\n"
+                    vectorstore = await asyncio.to_thread(load_vectorstore_for_video, video_id)
+                except FileNotFoundError:
+                    pass
+
+            if vectorstore is None:
+                # Transcript tiers and embedding take seconds to minutes: keep them off the event loop
+                with prefetch.question_ingestion():
+                    transcript = await asyncio.to_thread(load_transcript, video_id)
+                    if not transcript:
+                        try:
+                            transcript = await asyncio.to_thread(get_transcript, video_id)
+                        except Exception as e:
+                            yield f"❌ Could not fetch transcript: {str(e)}"
+                            return
+
+                    yield "🧠 Creating embeddings..."
+                    await asyncio.sleep(0.2)
+
+                    try:
+                        await asyncio.to_thread(index_transcript, video_id, transcript)
+                        vectorstore = await asyncio.to_thread(load_vectorstore_for_video, video_id)
+                    except Exception as e:
+                        yield f"❌ Error creating embeddings: {str(e)}"
+                        return
+
+            yield "✅ Ready!"
             await asyncio.sleep(0.2)
 
             try:
-                create_vectorstore_for_video(video_id, transcript)
-                vectorstore = load_vectorstore_for_video(video_id)
-            except Exception as e:
-                yield f"data: ❌ Error creating embeddings: {str(e)}\n\n"
-                yield "data: [END]\n\n"
-                return
-
-            yield "data: ✅ Ready!\n\n\n"
-            await asyncio.sleep(0.2)
+                answer, extractive = await _generate_answer(vectorstore, question, video_id, ticket)
+                logger.info(f"Answer preview: {answer[:200]}", extra={"log_key": "answer_preview"})
 
-            try:
-                qa_chain = create_qa_chain(llm, vectorstore)
-                result = qa_chain.invoke({"query": question})
-                answer = str(result.get('result', result.get('answer', str(result)))).strip()
-                answer = remove_consecutive_duplicates(answer)
-                logger.info(f"Answer preview: {answer[:200]}")
-
-                words = answer.split()
-                prev_word = None
-                for word in words:
-                    word_clean = word.strip()
-                    word_normalized = re.sub(r'[^\w]', '', word_clean).lower()
-                    if word_normalized != prev_word or word_normalized == '':
-                        yield f"data: {word_clean}\n\n"
-                        await asyncio.sleep(0.04)
-                        prev_word = word_normalized
+                ANSWER_TIME_TO_FIRST_FRAME.labels(path="extractive" if extractive else "cold").observe(
+                    time.perf_counter() - request_start
+                )
+                async for frame in _answer_frames(answer):
+                    yield frame
 
             except Exception as e:
                 logger.error(f"Error generating answer: {str(e)}")
-                yield f"data: ❌ Error generating answer: {str(e)}\n\n"
+                yield f"❌ Error generating answer: {str(e)}"
 
-            yield "data: [END]\n\n"
-
-        return StreamingResponse(processing_stream(), media_type="text/event-stream")
+        stream = start_stream((video_id, question), _release_if_unused(processing_stream(), ticket))
+        return _answer_response(stream)
+    except Exception:
+        get_scheduler().release_unclaimed(ticket)
+        raise
 
     # Vectorstore already exists — query directly
-    qa_chain = create_qa_chain(llm, vectorstore)
+    ASK_REQUESTS_TOTAL.labels(endpoint="ask_stream", vectorstore="warm").inc()
 
     async def event_stream():
         try:
-            result = qa_chain.invoke({"query": question})
-            answer = str(result.get('result', result.get('answer', str(result)))).strip()
-            answer = remove_consecutive_duplicates(answer)
-            logger.info(f"Answer preview: {answer[:200]}")
-
-            words = answer.split()
-            prev_word = None
-            for word in words:
-                word_clean = word.strip()
-                word_normalized = re.sub(r'[^\w]', '', word_clean).lower()
-                if word_normalized != prev_word or word_normalized == '':
-                    yield f"data: {word_clean}\n\n"
-                    await asyncio.sleep(0.04)
-                    prev_word = word_normalized
+            # Lookup questions may be answered from the transcript without the LLM
+            answer, extractive = await _generate_answer(vectorstore, question, video_id, ticket)
+            logger.info(f"Answer preview: {answer[:200]}", extra={"log_key": "answer_preview"})
+
+            ANSWER_TIME_TO_FIRST_FRAME.labels(path="extractive" if extractive else "warm").observe(
+                time.perf_counter() - request_start
+            )
+            async for frame in _answer_frames(answer):
+                yield frame
 
         except Exception as e:
             logger.error(f"Error: {str(e)}")
-            yield f"data: ❌ Error: {str(e)}\n\n"
+            yield f"❌ Error: {str(e)}"
+
+    stream = start_stream((video_id, question), _release_if_unused(event_stream(), ticket))
+    return _answer_response(stream)
+
 
+@router.post(
+    '/ask/batch',
+    summary="Answer several questions about one video via SSE",
+    description="""
+    Answers up to `BATCH_MAX_QUESTIONS` questions about a single video in one request.
+
+    The video's index is loaded (or built) once, all questions are embedded in one
+    batch, retrieval runs as a single vectorized FAISS search, and the Groq calls run
+    concurrently (at most `BATCH_LLM_CONCURRENCY` at a time).
+
+    **Streaming format:** answers arrive in completion order, multiplexed by question id:
+    `event: answer\\ndata: {"id": "q1", "answer": "..."}\\n\\n` ... `data: [END]\\n\\n`.
+    A failed question is reported as `{"id": "q2", "error": "..."}`.
+
+    Returns **429** with `Retry-After` when the caller (API key, or client address without one)
+    cannot queue that many Groq calls.
+    """
+)
+async def ask_batch_stream(body: BatchAskRequest, api_key: str = Depends(scheduler_key)):
+    video_id = body.video_id
+    items = [(q.id, q.question.strip()) for q in body.questions]
+    request_start = time.perf_counter()
+
+    logger.info(f"REQ {get_request_id()}: batch video_id={video_id}, questions={len(items)}")
+
+    if len(items) > config.BATCH_MAX_QUESTIONS:
+        async def error_stream():
+            yield f"data: ❌ At most {config.BATCH_MAX_QUESTIONS} questions per batch\n\n"
+            yield "data: [END]\n\n"
+        return StreamingResponse(error_stream(), media_type="text/event-stream")
+
+    tickets = _admit_interactive(api_key, count=len(items))
+
+    async def batch_stream():
+        try:
+            _, prefetch_job = prefetch.claim(video_id)
+            if prefetch_job is not None:
+                await prefetch_job.wait(config.PREFETCH_JOIN_TIMEOUT)
+            with prefetch.question_ingestion():
+                vectorstore = await asyncio.to_thread(load_or_ingest_vectorstore, video_id)
+        except Exception as e:
+            for ticket in tickets:
+                get_scheduler().release_unclaimed(ticket)
+            yield f"data: ❌ Could not prepare video: {str(e)}\n\n"
+            yield "data: [END]\n\n"
+            return
+
+        first_frame = True
+        async for question_id, answer, error in answer_batch(
+            get_llm(), vectorstore, items, config.BATCH_LLM_CONCURRENCY, tickets
+        ):
+            if first_frame:
+                ANSWER_TIME_TO_FIRST_FRAME.labels(path="batch").observe(time.perf_counter() - request_start)
+                first_frame = False
+            if error:
+                payload = {"id": question_id, "error": error}
+            else:
+                payload = {"id": question_id, "answer": remove_consecutive_duplicates(answer)}
+            yield f"event: answer\ndata: {json.dumps(payload)}\n\n"
+
+        yield "data: [END]\n\n"
+
+    ASK_REQUESTS_TOTAL.labels(endpoint="ask_batch", vectorstore="any").inc()
+    return StreamingResponse(batch_stream(), media_type="text/event-stream")
+
+
+@router.get(
+    '/summary/{video_id}',
+    response_model=SummaryResponse,
+    summary="Summarize a whole video",
+    description="""
+    Returns a summary of the whole video, plus section summaries.
+
+    The first call builds a hierarchical summary tree (map-reduce): each transcript
+    chunk is summarized concurrently, then groups of `SUMMARY_FANOUT` summaries are
+    merged level by level into section and video summaries. The tree is stored next
+    to the video's index, so later calls (and broad "summarize / overview / key points"
+    questions on `/ask/stream`) are answered from disk without any LLM call.
+
+    Returns **429** with `Retry-After` when the Groq queue stays full during the build.
+    """
+)
+async def get_video_summary(video_id: str, api_key: str = Depends(scheduler_key)):
+    logger.info(f"REQ {get_request_id()}: summary video_id={video_id}")
+
+    transcript = load_transcript(video_id)
+    if not transcript:
+        try:
+            transcript = await asyncio.to_thread(get_transcript, video_id)
+        except Exception as e:
+            raise HTTPException(status_code=502, detail=f"Could not fetch transcript: {str(e)}")
+
+    try:
+        tree, cached = await get_or_build_summary_tree(get_llm(), video_id, transcript, api_key)
+    except SchedulerBusy as e:
+        raise HTTPException(status_code=429, detail=e.reason, headers=retry_after_header(e))
+    except Exception as e:
+        logger.error(f"Error building summary for {video_id}: {str(e)}")
+        raise HTTPException(status_code=502, detail=f"Could not summarize video: {str(e)}")
+
+    return SummaryResponse(
+        summary=root_summary(tree),
+        video_id=video_id,
+        transcript_length=len(transcript),
+        sections=section_summaries(tree),
+        cached=cached,
+    )
+
+
+@router.post(
+    '/warm',
+    summary="Bulk warm-up ingestion",
+    description="""
+    Pre-ingests videos we expect to be hot (course playlists, trending lists) so the
+    first user question does not pay for transcript fetching and embedding.
+
+    Accepts `video_ids` and/or a YouTube `playlist_url` (anything else is a **400**;
+    local playlist fixtures are only read by `python -m app.cli.warm`). Videos that
+    already have an index are skipped, and cached transcripts are reused. Up to
+    `parallelism` videos are ingested at once. Requires a valid `X-API-Key`.
+
+    **Streaming format:** one `event: progress` frame per finished video, then an
+    `event: summary` frame with throughput numbers, then `data: [END]`.
+    """
+)
+async def warm_videos_stream(body: WarmRequest, api_key: str = Depends(require_api_key)):
+    if body.playlist_url and not is_youtube_playlist_url(body.playlist_url):
+        raise HTTPException(status_code=400, detail="playlist_url must be a YouTube playlist URL")
+    video_ids = [vid for vid in (extract_video_id(v) for v in body.video_ids) if vid]
+    if body.playlist_url:
+        try:
+            video_ids += await asyncio.to_thread(list_playlist_video_ids, body.playlist_url)
+        except Exception as e:
+            async def error_stream():
+                yield f"data: ❌ Could not list playlist: {str(e)}\n\n"
+                yield "data: [END]\n\n"
+            return StreamingResponse(error_stream(), media_type="text/event-stream")
+
+    video_ids = list(dict.fromkeys(video_ids))[:config.WARM_MAX_VIDEOS]
+    parallelism = body.parallelism or config.WARM_PARALLELISM
+    logger.info(f"REQ {get_request_id()}: warm videos={len(video_ids)}, parallelism={parallelism}")
+
+    async def progress_stream():
+        semaphore = asyncio.Semaphore(parallelism)
+
+        async def run(video_id):
+            async with semaphore:
+                return await asyncio.to_thread(ingest_video, video_id)
+
+        start = time.perf_counter()
+        reports = []
+        for next_done in asyncio.as_completed([run(video_id) for video_id in video_ids]):
+            report = await next_done
+            reports.append(report)
+            progress = {"done": len(reports), "total": len(video_ids), **report}
+            yield f"event: progress\ndata: {json.dumps(progress)}\n\n"
+
+        summary = summarize_warm_run(reports, time.perf_counter() - start)
+        logger.info(f"✓ Warm-up finished: {summary}")
+        yield f"event: summary\ndata: {json.dumps(summary)}\n\n"
         yield "data: [END]\n\n"
 
-    return StreamingResponse(event_stream(), media_type="text/event-stream")
+    return StreamingResponse(progress_stream(), media_type="text/event-stream")
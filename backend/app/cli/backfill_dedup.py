@@ -0,0 +1,65 @@
+# app/cli/backfill_dedup.py
+"""
+Sign indexed videos that have no near-duplicate signature yet.
+
+Videos indexed before dedup existed (or before a DEDUP_NUM_PERM /
+DEDUP_SHINGLE_WORDS change) are invisible to near-duplicate detection until
+their cached transcripts are signed. Run this offline, e.g. after a deploy;
+the API only ever reads the journal. Per-video signature files from older
+releases (./data/dedup/{video_id}.json) are folded into the journal too.
+
+Examples:
+    python -m app.cli.backfill_dedup
+    python -m app.cli.backfill_dedup --dry-run
+"""
+import argparse
+import sys
+
+from app.services.dedup import append_signatures, get_signature_index, journal_path, transcript_signature
+from app.storage.cache import load_transcript
+from app.storage.index_store import list_indexed_videos
+
+BATCH_SIZE = 100  # Signatures appended per journal write
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Backfill near-duplicate signatures for indexed videos.")
+    parser.add_argument("--dry-run", action="store_true", help="Count videos to sign without writing the journal")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    known = set(get_signature_index().signatures)
+
+    pending, counts = {}, {"signed": 0, "no_transcript": 0, "too_short": 0}
+    for video_id in list_indexed_videos(include_aliases=False):
+        if video_id in known:
+            continue
+        transcript = load_transcript(video_id, fetch_remote=False)
+        if not transcript:
+            counts["no_transcript"] += 1
+            continue
+        signature = transcript_signature(transcript)
+        if signature is None:
+            counts["too_short"] += 1
+            continue
+        counts["signed"] += 1
+        pending[video_id] = signature
+        if len(pending) >= BATCH_SIZE and not args.dry_run:
+            append_signatures(pending)
+            pending = {}
+
+    if pending and not args.dry_run:
+        append_signatures(pending)
+
+    action = "Would add" if args.dry_run else "Added"
+    print(
+        f"{action} {counts['signed']} signatures to {journal_path()}; "
+        f"skipped {counts['no_transcript']} without a cached transcript, {counts['too_short']} too short"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
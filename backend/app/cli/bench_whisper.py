@@ -0,0 +1,129 @@
+# app/cli/bench_whisper.py
+"""
+Benchmark local Whisper engines on fixture audio.
+
+Runs every engine over the same files and reports the real-time factor
+(processing seconds / audio seconds, lower is faster), how much audio VAD
+kept as speech, and word overlap with the first engine's transcript as a
+rough quality check. Model load time is excluded (one warm-up file first).
+
+Examples:
+    python -m app.cli.bench_whisper tests/fixtures/audio
+    python -m app.cli.bench_whisper lecture.opus podcast.mp3 --engines openai faster --model small
+    python -m app.cli.bench_whisper tests/fixtures/audio --json
+"""
+import argparse
+import json
+import os
+import re
+import sys
+
+from app.config import config
+from app.services.local_whisper import ENGINES, get_whisper_model, resolve_engine, transcribe_local
+
+AUDIO_EXTENSIONS = (".wav", ".mp3", ".m4a", ".ogg", ".opus", ".flac", ".webm")
+DEFAULT_FIXTURES = "tests/fixtures/audio"
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Compare local Whisper engines' real-time factor on audio files.")
+    parser.add_argument("paths", nargs="*", default=[DEFAULT_FIXTURES], help=f"Audio files or directories (default: {DEFAULT_FIXTURES})")
+    parser.add_argument("--engines", nargs="+", choices=ENGINES, default=["openai", "faster"],
+                        help="Engines to compare; the first is the reference for word overlap")
+    parser.add_argument("--model", default=config.LOCAL_WHISPER_MODEL, help=f"Model size (default: {config.LOCAL_WHISPER_MODEL})")
+    parser.add_argument("--json", action="store_true", help="Print the full report as JSON")
+    return parser.parse_args(argv)
+
+
+def collect_audio(paths: list) -> list:
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files += sorted(
+                os.path.join(path, name) for name in os.listdir(path) if name.lower().endswith(AUDIO_EXTENSIONS)
+            )
+        elif os.path.isfile(path):
+            files.append(path)
+    return files
+
+
+def word_overlap(reference: str, candidate: str) -> float:
+    """Share of the reference's words (as a multiset) that the candidate also contains."""
+    ref = re.findall(r"\w+", reference.lower())
+    if not ref:
+        return 1.0
+    remaining = {}
+    for word in re.findall(r"\w+", candidate.lower()):
+        remaining[word] = remaining.get(word, 0) + 1
+    hits = 0
+    for word in ref:
+        if remaining.get(word):
+            remaining[word] -= 1
+            hits += 1
+    return hits / len(ref)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    files = collect_audio(args.paths)
+    if not files:
+        print(f"No audio files found in {args.paths}.", file=sys.stderr)
+        return 2
+
+    engines = list(dict.fromkeys(resolve_engine(engine) for engine in args.engines))
+    report = {"model": args.model, "files": [], "engines": {}}
+    for engine in engines:
+        print(f"Loading {engine}/{args.model} ...", file=sys.stderr)
+        get_whisper_model(engine, args.model)
+        # Warm-up run so the first measured file doesn't pay for lazy initialisation
+        transcribe_local(files[0], engine=engine, model_size=args.model)
+
+    for path in files:
+        entry = {"file": path, "results": {}}
+        reference_text = None
+        for engine in engines:
+            result = transcribe_local(path, engine=engine, model_size=args.model)
+            if reference_text is None:
+                reference_text = result["text"]
+            entry["results"][engine] = {
+                "seconds": result["seconds"],
+                "audio_seconds": round(result["audio_seconds"], 1),
+                "speech_seconds": round(result["speech_seconds"], 1),
+                "realtime_factor": result["realtime_factor"],
+                "language": result["language"],
+                "task": result["task"],
+                "segments": len(result["segments"]),
+                "word_overlap": round(word_overlap(reference_text, result["text"]), 3),
+            }
+            print(f"{os.path.basename(path)}  {engine:<7} RTF {result['realtime_factor']:.3f}", file=sys.stderr)
+        report["files"].append(entry)
+
+    for engine in engines:
+        results = [entry["results"][engine] for entry in report["files"]]
+        audio = sum(r["audio_seconds"] for r in results)
+        seconds = sum(r["seconds"] for r in results)
+        report["engines"][engine] = {
+            "audio_seconds": round(audio, 1),
+            "seconds": round(seconds, 2),
+            "realtime_factor": round(seconds / audio, 4) if audio else 0.0,
+            "speech_ratio": round(sum(r["speech_seconds"] for r in results) / audio, 3) if audio else 0.0,
+            "mean_word_overlap": round(sum(r["word_overlap"] for r in results) / len(results), 3),
+        }
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        baseline = report["engines"][engines[0]]["realtime_factor"]
+        print(f"\n{len(files)} files, model {args.model}")
+        print(f"{'engine':<8} {'audio s':>9} {'proc s':>9} {'RTF':>8} {'speedup':>8} {'speech':>7} {'overlap':>8}")
+        for engine, totals in report["engines"].items():
+            speedup = baseline / totals["realtime_factor"] if totals["realtime_factor"] else 0.0
+            print(
+                f"{engine:<8} {totals['audio_seconds']:>9} {totals['seconds']:>9} {totals['realtime_factor']:>8} "
+                f"{speedup:>7.1f}x {totals['speech_ratio']:>7} {totals['mean_word_overlap']:>8}"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,93 @@
+# app/cli/convert_indexes.py
+"""
+Convert existing per-video FAISS indexes to another structure or encoding
+and report recall@k against the flat baseline, index size and search latency.
+"auto" picks the type per video from its chunk count, as new indexes do.
+
+Examples:
+    python -m app.cli.convert_indexes --to sq8 --dry-run        # report only
+    python -m app.cli.convert_indexes --to pq dQw4w9WgXcQ
+    python -m app.cli.convert_indexes --to auto                  # hnsw/ivf for long videos
+    python -m app.cli.convert_indexes --to flat --json           # revert everything
+"""
+import argparse
+import json
+import sys
+
+from app.config import config
+from app.services.qa_chain import RETRIEVAL_FETCH_K, RETRIEVAL_K
+from app.storage.index_store import list_indexed_videos
+from app.storage.quantization import AUTO_INDEX, INDEX_TYPES
+from app.storage.vector_store import convert_video_index
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Rebuild per-video FAISS indexes (auto / flat / hnsw / ivf / sq8 / pq).")
+    parser.add_argument("videos", nargs="*", help="Video IDs (default: every indexed video, aliases excluded)")
+    parser.add_argument("--to", choices=(AUTO_INDEX,) + INDEX_TYPES, default=config.INDEX_TYPE,
+                        help=f"Target index type (default: INDEX_TYPE={config.INDEX_TYPE})")
+    parser.add_argument("-k", type=int, default=RETRIEVAL_K, help=f"Recall@k cutoff (default: {RETRIEVAL_K})")
+    parser.add_argument("--fetch-k", type=int, default=RETRIEVAL_FETCH_K,
+                        help=f"PQ candidates re-ranked exactly (default: {RETRIEVAL_FETCH_K})")
+    parser.add_argument("--sample", type=int, default=50, help="Evaluation queries per video (default: 50)")
+    parser.add_argument("--dry-run", action="store_true", help="Measure only; do not publish converted indexes")
+    parser.add_argument("--json", action="store_true", help="Print per-video reports as JSON")
+    return parser.parse_args(argv)
+
+
+def summarize(reports: list[dict]) -> dict:
+    measured = [r for r in reports if "recall_at_k" in r]
+    flat_bytes = sum(r["flat_bytes"] for r in measured)
+    index_bytes = sum(r["index_bytes"] for r in measured)
+    return {
+        "videos": len(reports),
+        "converted": sum(1 for r in reports if r.get("status") == "converted"),
+        "failed": sum(1 for r in reports if r.get("status") == "failed"),
+        "mean_recall_at_k": round(sum(r["recall_at_k"] for r in measured) / len(measured), 4) if measured else None,
+        "flat_bytes": flat_bytes,
+        "index_bytes": index_bytes,
+        "size_ratio": round(index_bytes / flat_bytes, 4) if flat_bytes else None,
+        "mean_flat_search_us": round(sum(r["flat_search_us"] for r in measured) / len(measured), 1) if measured else None,
+        "mean_index_search_us": round(sum(r["index_search_us"] for r in measured) / len(measured), 1) if measured else None,
+    }
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+
+    video_ids = args.videos or list_indexed_videos(include_aliases=False)
+    if not video_ids:
+        print("No indexed videos found.", file=sys.stderr)
+        return 2
+
+    reports = []
+    for n, video_id in enumerate(video_ids, start=1):
+        try:
+            report = convert_video_index(video_id, args.to, args.k, args.fetch_k, args.sample, args.dry_run)
+            print(
+                f"[{n}/{len(video_ids)}] {video_id:<11}  {report['status']:<9}  "
+                f"{report['index']['type']:<4}  recall@{report['k']}={report['recall_at_k']:.3f}  "
+                f"size {report['flat_bytes'] / 1024:.0f}KB -> {report['index_bytes'] / 1024:.0f}KB  "
+                f"search {report['flat_search_us']:.0f}us -> {report['index_search_us']:.0f}us",
+                file=sys.stderr,
+            )
+        except Exception as e:
+            report = {"video_id": video_id, "status": "failed", "error": str(e)}
+            print(f"[{n}/{len(video_ids)}] {video_id:<11}  failed     {str(e)}", file=sys.stderr)
+        reports.append(report)
+
+    summary = summarize(reports)
+    if args.json:
+        print(json.dumps({"summary": summary, "results": reports}, indent=2))
+    else:
+        print(
+            f"\n{summary['videos']} videos -> {args.to}: {summary['converted']} converted, {summary['failed']} failed\n"
+            f"Mean recall@{args.k} vs flat: {summary['mean_recall_at_k']}\n"
+            f"Index size: {summary['flat_bytes']} -> {summary['index_bytes']} bytes (x{summary['size_ratio']})\n"
+            f"Mean search latency: {summary['mean_flat_search_us']}us -> {summary['mean_index_search_us']}us per query"
+        )
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,78 @@
+# app/cli/dispatch.py
+"""
+Run N single-process workers behind the video-affinity dispatcher.
+
+Replaces `uvicorn app.main:app --workers N`: each worker is its own
+`uvicorn app.main:app` on 127.0.0.1:<worker-port + i>, restarted if it
+exits, and app.dispatcher listens on --host/--port and routes every
+video's traffic to the same worker.
+
+Examples:
+    python -m app.cli.dispatch --workers 4
+    python -m app.cli.dispatch --workers 2 --port 8000 --worker-port 8100
+"""
+import argparse
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import uvicorn
+
+from app import dispatcher
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Serve several workers behind the video-affinity dispatcher.")
+    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count() or 2, help="Worker processes (default: CPU count)")
+    parser.add_argument("--host", default="0.0.0.0", help="Dispatcher bind address (default: 0.0.0.0)")
+    parser.add_argument("--port", type=int, default=8000, help="Dispatcher port (default: 8000)")
+    parser.add_argument("--worker-port", type=int, default=8100, help="Port of the first worker (default: 8100)")
+    return parser.parse_args(argv)
+
+
+def _spawn(port: int) -> subprocess.Popen:
+    return subprocess.Popen([
+        sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+    ])
+
+
+def _supervise(processes: dict, stop: threading.Event):
+    """Restart workers that exit; the dispatcher routes around them until they are ready again."""
+    while not stop.wait(1.0):
+        for port, process in list(processes.items()):
+            if process.poll() is not None:
+                logger.warning(f"✗ Worker on port {port} exited with {process.returncode}; restarting")
+                processes[port] = _spawn(port)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    ports = [args.worker_port + i for i in range(max(1, args.workers))]
+    processes = {port: _spawn(port) for port in ports}
+    dispatcher.set_workers([f"http://127.0.0.1:{port}" for port in ports])
+    logger.info(f"✓ Started {len(ports)} workers on ports {ports[0]}-{ports[-1]}")
+
+    stop = threading.Event()
+    threading.Thread(target=_supervise, args=(processes, stop), name="worker-supervisor", daemon=True).start()
+    try:
+        uvicorn.run(dispatcher.app, host=args.host, port=args.port)
+    finally:
+        stop.set()
+        for process in processes.values():
+            process.terminate()
+        deadline = time.monotonic() + 10
+        for process in processes.values():
+            try:
+                process.wait(timeout=max(0.1, deadline - time.monotonic()))
+            except subprocess.TimeoutExpired:
+                process.kill()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
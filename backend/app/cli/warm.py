@@ -0,0 +1,68 @@
+# app/cli/warm.py
+"""
+Bulk warm-up ingestion from the command line.
+
+Examples:
+    python -m app.cli.warm dQw4w9WgXcQ jNQXAC9IVRw
+    python -m app.cli.warm --playlist "https://www.youtube.com/playlist?list=PL..." -p 4
+    python -m app.cli.warm --playlist tests/fixtures/playlist.json --json
+"""
+import argparse
+import json
+import os
+import sys
+
+from app.config import config
+from app.services.ingestion import warm_videos
+from app.services.video_utils import extract_video_id, list_playlist_video_ids, read_playlist_fixture
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Pre-ingest videos so first questions are fast.")
+    parser.add_argument("videos", nargs="*", help="YouTube video IDs or URLs")
+    parser.add_argument("--playlist", help="Playlist URL or local fixture file to expand")
+    parser.add_argument("-p", "--parallelism", type=int, default=config.WARM_PARALLELISM,
+                        help=f"Concurrent ingestions (default: {config.WARM_PARALLELISM})")
+    parser.add_argument("--json", action="store_true", help="Print the final report as JSON")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+
+    video_ids = [vid for vid in (extract_video_id(v) for v in args.videos) if vid]
+    if args.playlist:
+        if os.path.isfile(args.playlist):
+            video_ids += read_playlist_fixture(args.playlist)
+        else:
+            video_ids += list_playlist_video_ids(args.playlist)
+    if not video_ids:
+        print("No video IDs to warm.", file=sys.stderr)
+        return 2
+
+    def on_progress(done, total, report):
+        line = f"[{done}/{total}] {report['video_id']:<11}  {report['status']:<8}  {report['seconds']:6.1f}s"
+        if report["error"]:
+            line += f"  {report['error']}"
+        print(line, file=sys.stderr)
+
+    result = warm_videos(video_ids, args.parallelism, on_progress=on_progress)
+    summary = result["summary"]
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print(
+            f"\nWarmed {summary['total']} videos in {summary['elapsed_seconds']}s: "
+            f"{summary['ingested']} ingested, {summary['skipped']} skipped, {summary['failed']} failed\n"
+            f"Near-duplicates reusing an existing index: {summary['deduplicated']} "
+            f"(dedup ratio {summary['dedup_ratio']})\n"
+            f"Throughput: {summary['videos_per_minute']} videos/min, "
+            f"{summary['transcript_chars_per_second']} transcript chars/s, "
+            f"{summary['mean_ingest_seconds']}s mean per ingested video"
+        )
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -7,6 +7,19 @@ class Settings(BaseSettings):
     # Groq Settings (Best free option)
     GROQ_API_KEY: str
     GROQ_MODEL: str = "llama-3.3-70b-versatile"  # GPT-4 level quality
+    GROQ_BASE_URL: str = ""  # Override the API host, e.g. the load-test fake (python -m loadtest.fake_groq)
+    
+    # Groq client-side scheduling (app/services/groq_scheduler.py)
+    GROQ_RPM: int = 30                  # Chat completions requests/min budget
+    GROQ_TPM: int = 6000                # Chat completions tokens/min budget
+    GROQ_AUDIO_RPM: int = 20            # Whisper transcription requests/min budget
+    GROQ_EST_TOKENS_PER_ANSWER: int = 2000  # Prompt + completion estimate for one RetrievalQA answer
+    GROQ_MAX_CONCURRENCY: int = 8       # Calls in flight at once (also sizes the HTTP pool)
+    GROQ_MAX_QUEUED: int = 64           # Calls queued or in flight across all API keys
+    GROQ_MAX_QUEUED_PER_KEY: int = 20   # ... and per caller (API key, else client address); beyond this /ask/* returns 429
+    GROQ_MAX_RETRIES: int = 3
+    GROQ_BACKOFF_BASE: float = 0.5
+    GROQ_BACKOFF_MAX: float = 8.0
     
     # OpenAI (Backup - if you add credits later)
     OPENAI_API_KEY: str = ""
@@ -17,11 +30,143 @@ class Settings(BaseSettings):
     CHROMA_DB_PATH: str
     CACHE_PATH: str
     
+    # Global FAISS index: adds append segments; a background thread compacts them into the base
+    GLOBAL_COMPACT_SEGMENTS: int = 32         # Compact once this many segments are pending...
+    GLOBAL_COMPACT_MAX_AGE: int = 600         # ...or the oldest pending segment is this many seconds old
+    GLOBAL_COMPACT_CHECK_INTERVAL: int = 30   # Seconds between compaction checks (0 disables the thread)
+    
+    # Per-video FAISS index chosen at build time: "auto" (by chunk count, see below), "flat" (exact),
+    # "hnsw" / "ivf" (approximate, for very long videos), "sq8" (int8, ~4x smaller) or "pq"
+    # (product quantization, exact re-ranking of fetch_k; falls back to sq8 below ~1,200 chunks,
+    # where its codebook outweighs the codes)
+    INDEX_TYPE: str = "auto"
+    INDEX_AUTO_HNSW_CHUNKS: int = 2000      # "auto": flat below this many chunks, hnsw from here...
+    INDEX_AUTO_IVF_CHUNKS: int = 50000      # ...and ivf from here (HNSW build time grows too large)
+    INDEX_HNSW_M: int = 32                  # Graph links per vector
+    INDEX_HNSW_EF_CONSTRUCTION: int = 80
+    INDEX_HNSW_EF_SEARCH: int = 64          # Search breadth; keep >= the retriever's fetch_k
+    INDEX_IVF_NPROBE: int = 16              # Inverted lists scanned per query (~4*sqrt(n) lists)
+    INDEX_PQ_M: int = 48                # PQ sub-quantizers; must divide the 384-dim embedding
+    
+    # Near-duplicate transcripts (app/services/dedup.py): alias an existing index instead of re-embedding
+    DEDUP_ENABLED: bool = True
+    DEDUP_THRESHOLD: float = 0.85    # Estimated Jaccard similarity of word shingles to count as a duplicate
+    DEDUP_NUM_PERM: int = 128        # MinHash signature length
+    DEDUP_BANDS: int = 32            # LSH bands (NUM_PERM / BANDS rows each); more bands = more candidates
+    DEDUP_SHINGLE_WORDS: int = 5
+    DEDUP_MIN_WORDS: int = 200       # Shorter transcripts are always indexed on their own
+    
+    # Normalized question -> query vector LRU shared by every retriever (~1.5 KB per entry)
+    QUERY_EMBEDDING_CACHE_SIZE: int = 5000
+    
+    # Memory governor (app/utils/memory.py): evict indexes, models and caches over an RSS budget
+    MEMORY_BUDGET_MB: int = 0            # Worker RSS budget; 0 only reports (/debug/memory)
+    MEMORY_TARGET_RATIO: float = 0.85    # Once over budget, evict down to this share of it
+    MEMORY_MIN_IDLE: float = 5.0         # Residents used within this many seconds are never evicted
+    MEMORY_CHECK_INTERVAL: float = 10.0  # Seconds between RSS checks (also checked on every registration)
+    
+    # Video-affinity dispatcher (app/dispatcher.py, started by app.cli.dispatch) in front of several workers
+    DISPATCH_WORKERS: str = ""              # Comma-separated worker base URLs (the launcher fills this in)
+    DISPATCH_VNODES: int = 128              # Virtual nodes per worker on the hash ring
+    DISPATCH_MAX_INFLIGHT: int = 32         # Requests in flight before a worker's videos spill to the next one
+    DISPATCH_HEALTH_INTERVAL: float = 2.0   # Seconds between /health/ready checks of every worker
+    DISPATCH_UNHEALTHY_AFTER: int = 2       # Failed checks before a worker leaves the ring
+    DISPATCH_STATS_INTERVAL: float = 15.0   # Seconds between scrapes of the workers' cache hit ratios
+    DISPATCH_TIMEOUT: float = 600.0         # Read timeout for proxied requests (streams, /warm)
+    
+    # Loaded per-video FAISS indexes kept in memory (LRU, validated against MANIFEST.json)
+    VECTORSTORE_CACHE_SIZE: int = 16
+    
+    # Extractive fast path (app/services/extractive.py): answer lookup questions with a transcript span
+    EXTRACTIVE_ENABLED: bool = False           # Off until the thresholds below are calibrated on real questions
+    EXTRACTIVE_MIN_SCORE: float = 0.6          # Blended span score needed to skip the LLM...
+    EXTRACTIVE_MIN_MARGIN: float = 0.05        # ...and its lead over the second-best span
+    EXTRACTIVE_LEXICAL_WEIGHT: float = 0.3     # Share of the score from question keyword overlap
+    EXTRACTIVE_MAX_QUESTION_WORDS: int = 15    # Longer questions always go to the LLM
+    EXTRACTIVE_MAX_SPAN_WORDS: int = 40        # Longer sentences are split into word windows
+    
+    # /ask/stream frames and resumable answer buffers
+    ANSWER_FRAME_MAX_CHARS: int = 48      # Coalesce words into frames of about this size...
+    ANSWER_FRAME_MAX_DELAY: float = 0.25  # ...or flush once the oldest buffered word is this old
+    ANSWER_FRAME_INTERVAL: float = 0.1    # Pacing between answer frames
+    ANSWER_STREAM_TTL: int = 120          # Seconds a finished answer stays resumable (Last-Event-ID)
+    ANSWER_STREAM_MAX: int = 256          # Finished answers buffered per worker
+    
+    # Batch Q&A (/ask/batch)
+    BATCH_MAX_QUESTIONS: int = 20
+    BATCH_LLM_CONCURRENCY: int = 4  # Concurrent Groq calls per batch request
+    
+    # Hierarchical summaries (/summary/{video_id})
+    SUMMARY_CHUNK_CHARS: int = 6000      # Transcript characters per map (leaf) summary
+    SUMMARY_FANOUT: int = 5              # Child summaries merged per reduce call
+    SUMMARY_REDUCE_SENTENCES: int = 8
+    SUMMARY_CONCURRENCY: int = 4         # Concurrent Groq calls per summary build
+    SUMMARY_EST_TOKENS: int = 2500       # Prompt + completion estimate per summary call
+    SUMMARY_ADMIT_ATTEMPTS: int = 5      # Waits on a full Groq queue before the build fails
+    
+    # Bulk warm-up (/warm, python -m app.cli.warm)
+    WARM_PARALLELISM: int = 2
+    WARM_MAX_VIDEOS: int = 200
+    
+    # Audio acquisition for the Whisper tiers
+    # Hedged transcript fetch: start the audio download speculatively if caption discovery
+    # hasn't finished after this many seconds (negative: strictly sequential tiers)
+    TRANSCRIPT_HEDGE_DELAY: float = 3.0
+    AUDIO_MODE: str = "speech"  # "speech" = 16 kHz mono Opus in one ffmpeg pass, "legacy" = 128 kbps MP3
+    AUDIO_BITRATE_KBPS: int = 24
+    AUDIO_SAMPLE_RATE: int = 16000
+    
+    # Local Whisper (tier 3, app/services/local_whisper.py)
+    LOCAL_WHISPER_ENGINE: str = "faster"    # "faster" (CTranslate2 int8 + VAD) or "openai" (PyTorch float32)
+    LOCAL_WHISPER_MODEL: str = "base"
+    LOCAL_WHISPER_COMPUTE_TYPE: str = "int8"  # faster engine weights: int8, int8_float32, float32
+    LOCAL_WHISPER_THREADS: int = 0          # faster engine CPU threads (0 = CTranslate2 default)
+    LOCAL_WHISPER_BEAM_SIZE: int = 1        # 1 = greedy, like openai-whisper's default
+    LOCAL_WHISPER_VAD_MIN_SILENCE_MS: int = 500  # Silence longer than this is cut before decoding
+    
+    # Load-test stand-in for YouTube: resolve transcripts from {dir}/{video_id}.txt (or an
+    # audio file sent to Groq Whisper) instead of captions/yt-dlp. Never set in production.
+    TRANSCRIPT_FIXTURE_DIR: str = ""
+    TRANSCRIPT_FIXTURE_LATENCY: float = 0.0  # Simulated fetch time (seconds)
+    
+    # /check availability probes
+    AVAILABILITY_POSITIVE_TTL: int = 86400  # Seconds to trust an "available" probe
+    AVAILABILITY_NEGATIVE_TTL: int = 900    # Seconds to trust an "unavailable" probe
+    CHECK_ENQUEUE_INGESTION: bool = False   # Speculatively prefetch available, not yet ingested videos
+    
+    # Speculative prefetch after /check (app/services/prefetch.py)
+    PREFETCH_WORKERS: int = 1          # Concurrent speculative ingestions per worker process (0 disables)
+    PREFETCH_QUEUE_SIZE: int = 8       # Videos waiting; the oldest check is dropped beyond this
+    PREFETCH_TTL: int = 300            # Seconds after its last check that an unasked-for prefetch is stale
+    PREFETCH_CAPTIONS_ONLY: bool = True  # Never download audio or run Whisper speculatively
+    PREFETCH_JOIN_TIMEOUT: float = 300.0  # Max seconds a question waits on an in-flight prefetch
+    
+    # Shared artifact store for transcripts and index bundles (multi-node)
+    ARTIFACT_STORE: str = ""                     # "" (disabled), "local" or "s3"
+    ARTIFACT_STORE_PATH: str = "./data/artifacts"  # "local": a directory shared by all nodes (e.g. NFS)
+    ARTIFACT_S3_BUCKET: str = ""
+    ARTIFACT_S3_PREFIX: str = "vidiqai"
+    ARTIFACT_S3_ENDPOINT_URL: str = ""           # e.g. http://localhost:9000 for MinIO; credentials via AWS_* env vars
+    
+    # Startup warm-up (runs after the server starts listening; see /health/ready)
+    WARMUP_EMBEDDINGS: bool = True
+    WARMUP_WHISPER: bool = False        # Load the local Whisper model (LOCAL_WHISPER_ENGINE) up front
+    WARMUP_GLOBAL_INDEX: bool = False   # Load the global FAISS index (base + pending segments)
+    
     # Server Configuration
     APP_HOST: str = "0.0.0.0"
     APP_PORT: int = 8000
     LOG_LEVEL: str = "INFO"
     
+    # Logging (app/utils/logger.py): queued, written by a background thread
+    LOG_FILE: str = "./data/app.log"    # JSON lines; empty disables the file
+    LOG_MAX_BYTES: int = 10 * 1024 * 1024  # Rotate the file at this size...
+    LOG_BACKUP_COUNT: int = 5           # ...keeping this many old files
+    LOG_STDOUT_FORMAT: str = "text"     # "text" or "json"
+    LOG_QUEUE_SIZE: int = 10000         # Records waiting for the writer; beyond this they are dropped
+    LOG_RATE_LIMIT: int = 20            # Keyed (noisy) records per key per second before sampling...
+    LOG_SAMPLE_EVERY: int = 50          # ...then 1 in this many
+    
     class Config:
         env_file = '.env'
 
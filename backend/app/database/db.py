@@ -47,6 +47,3 @@ def clear_session(session_id):
     with get_db() as conn:
         conn.execute("DELETE FROM conversations WHERE session_id = ?", (session_id,))
         conn.commit()
-
-# Initialize the database when this file is imported
-init_db()
@@ -0,0 +1,431 @@
+# app/dispatcher.py
+"""
+Video-affinity front dispatcher for several single-process workers.
+
+With `uvicorn --workers N`, requests for one video land on random workers,
+and each of them loads the same FAISS index, keeps its own caches and
+repeats the ingestion checks. This app sits in front of N independent
+workers instead (`python -m app.cli.dispatch` starts both) and proxies:
+
+    /ask/stream, /ask/batch     by the body's video_id
+    /check/{id}, /summary/{id}  by the path's video_id
+    /warm                       split per owning worker, progress merged
+    anything else               to the least loaded worker
+
+The owner of a video is found on a consistent-hash ring (DISPATCH_VNODES
+virtual nodes per worker), so adding or removing a worker only moves
+~1/N of the videos. Workers join the ring once `/health/ready` answers
+and leave after DISPATCH_UNHEALTHY_AFTER failed checks (or a refused
+connection). A worker with DISPATCH_MAX_INFLIGHT requests in flight is
+skipped for the next one on the ring ("spill"), then for the least loaded
+worker ("overflow").
+
+klypse_dispatch_requests_total{route} gives the affinity hit rate, and the
+workers' cache hit ratios (scraped from their /metrics) are re-exported as
+klypse_dispatch_worker_cache_hit_ratio. `/dispatch/stats` shows both.
+"""
+import asyncio
+import bisect
+import hashlib
+import json
+import re
+import time
+from contextlib import asynccontextmanager
+from typing import List, Optional
+
+import httpx
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+from prometheus_client.parser import text_string_to_metric_families
+
+from app.config import config
+from app.services.video_utils import extract_video_id
+from app.services.warm_report import summarize_warm_run
+from app.utils.logger import get_logger
+from app.utils.metrics import (
+    DISPATCH_REBALANCE_TOTAL, DISPATCH_REQUESTS_TOTAL, DISPATCH_WORKER_CACHE_HIT_RATIO, DISPATCH_WORKER_IN_FLIGHT,
+    render_metrics,
+)
+
+logger = get_logger(__name__)
+
+PATH_KEY_PATTERN = re.compile(r"^/(check|summary)/([^/]+)$")
+BODY_KEY_PATHS = ("/ask/stream", "/ask/batch")
+# Not forwarded in either direction (hop-by-hop, or recomputed by the client library)
+HOP_HEADERS = {"host", "connection", "keep-alive", "transfer-encoding", "te", "upgrade", "content-length"}
+
+
+class HashRing:
+    """Consistent-hash ring of worker URLs with virtual nodes."""
+
+    def __init__(self, vnodes: int):
+        self.vnodes = max(1, vnodes)
+        self.nodes = set()
+        self._points: List[int] = []
+        self._owners: List[str] = []
+
+    @staticmethod
+    def _hash(value: str) -> int:
+        return int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "big")
+
+    def _rebuild(self):
+        points = sorted((self._hash(f"{node}#{i}"), node) for node in self.nodes for i in range(self.vnodes))
+        self._points = [point for point, _ in points]
+        self._owners = [node for _, node in points]
+
+    def add(self, node: str):
+        if node not in self.nodes:
+            self.nodes.add(node)
+            self._rebuild()
+
+    def remove(self, node: str):
+        if node in self.nodes:
+            self.nodes.discard(node)
+            self._rebuild()
+
+    def preference(self, key: str) -> List[str]:
+        """Distinct nodes clockwise from the key: the owner first, then its successors."""
+        if not self._points:
+            return []
+        start = bisect.bisect(self._points, self._hash(key))
+        nodes = []
+        for i in range(len(self._owners)):
+            node = self._owners[(start + i) % len(self._owners)]
+            if node not in nodes:
+                nodes.append(node)
+                if len(nodes) == len(self.nodes):
+                    break
+        return nodes
+
+    def shares(self) -> dict:
+        """Fraction of the key space each node owns."""
+        if not self._points:
+            return {}
+        space = 2 ** 64
+        shares = dict.fromkeys(self.nodes, 0)
+        for i, point in enumerate(self._points):
+            previous = self._points[i - 1] if i else self._points[-1] - space
+            shares[self._owners[i]] += point - previous
+        return {node: round(share / space, 4) for node, share in shares.items()}
+
+
+class Worker:
+    """A backend process behind the dispatcher."""
+
+    def __init__(self, url: str):
+        self.url = url.rstrip("/")
+        self.healthy = False
+        self.failures = 0
+        self.in_flight = 0
+        self.served = 0
+        self.cache_hit_ratio = {}
+
+    def acquire(self):
+        self.in_flight += 1
+        self.served += 1
+        DISPATCH_WORKER_IN_FLIGHT.labels(worker=self.url).set(self.in_flight)
+
+    def release(self):
+        self.in_flight -= 1
+        DISPATCH_WORKER_IN_FLIGHT.labels(worker=self.url).set(self.in_flight)
+
+
+_workers: dict = {}
+_ring = HashRing(config.DISPATCH_VNODES)
+_client: Optional[httpx.AsyncClient] = None
+_routes: dict = {}
+
+
+def set_workers(urls: List[str]):
+    """Workers to dispatch to (before startup); they join the ring once healthy."""
+    _workers.clear()
+    for url in urls:
+        if url.strip():
+            worker = Worker(url.strip())
+            _workers[worker.url] = worker
+
+
+def _join(worker: Worker):
+    worker.failures = 0
+    if not worker.healthy:
+        worker.healthy = True
+        _ring.add(worker.url)
+        DISPATCH_REBALANCE_TOTAL.labels(event="join").inc()
+        logger.info(f"✓ Worker {worker.url} joined; owns {_ring.shares().get(worker.url, 0):.0%} of videos")
+
+
+def _leave(worker: Worker, reason: str):
+    if worker.healthy:
+        worker.healthy = False
+        _ring.remove(worker.url)
+        DISPATCH_REBALANCE_TOTAL.labels(event="leave").inc()
+        logger.warning(f"✗ Worker {worker.url} left the ring ({reason}); {len(_ring.nodes)} workers remain")
+
+
+def _failed(worker: Worker, reason: str):
+    worker.failures += 1
+    if worker.failures >= config.DISPATCH_UNHEALTHY_AFTER:
+        _leave(worker, reason)
+
+
+async def _scrape_cache_ratios(worker: Worker):
+    """Per-cache hit ratio from the worker's klypse_cache_requests_total."""
+    response = await _client.get(f"{worker.url}/metrics", timeout=5.0)
+    counts = {}
+    for family in text_string_to_metric_families(response.text):
+        if family.name != "klypse_cache_requests":
+            continue
+        for sample in family.samples:
+            if sample.name.endswith("_total"):
+                cache = counts.setdefault(sample.labels["cache"], {"hit": 0.0, "miss": 0.0})
+                cache[sample.labels["result"]] = cache.get(sample.labels["result"], 0.0) + sample.value
+    worker.cache_hit_ratio = {}
+    for cache, count in counts.items():
+        total = count["hit"] + count["miss"]
+        if total:
+            worker.cache_hit_ratio[cache] = round(count["hit"] / total, 4)
+            DISPATCH_WORKER_CACHE_HIT_RATIO.labels(worker=worker.url, cache=cache).set(count["hit"] / total)
+
+
+async def _health_loop():
+    last_scrape = 0.0
+    while True:
+        scrape = time.monotonic() - last_scrape >= config.DISPATCH_STATS_INTERVAL
+        for worker in list(_workers.values()):
+            try:
+                response = await _client.get(f"{worker.url}/health/ready", timeout=2.0)
+                if response.status_code == 200:
+                    _join(worker)
+                else:
+                    _failed(worker, f"readiness {response.status_code}")
+                if scrape and worker.healthy:
+                    await _scrape_cache_ratios(worker)
+            except Exception as e:
+                _failed(worker, type(e).__name__)
+        if scrape:
+            last_scrape = time.monotonic()
+        await asyncio.sleep(config.DISPATCH_HEALTH_INTERVAL)
+
+
+def _least_loaded() -> Optional[Worker]:
+    healthy = [worker for worker in _workers.values() if worker.healthy]
+    return min(healthy, key=lambda worker: worker.in_flight) if healthy else None
+
+
+def _candidates(video_id: Optional[str]) -> List[tuple]:
+    """(worker, route) in the order to try them."""
+    if video_id is None:
+        worker = _least_loaded()
+        return [(worker, "unkeyed")] if worker else []
+
+    candidates = []
+    for position, url in enumerate(_ring.preference(video_id)):
+        worker = _workers[url]
+        if worker.in_flight < config.DISPATCH_MAX_INFLIGHT:
+            candidates.append((worker, "affinity" if position == 0 else "spill"))
+    if not candidates:
+        worker = _least_loaded()
+        if worker:
+            candidates.append((worker, "overflow"))
+    return candidates
+
+
+def routing_key(path: str, body: bytes) -> Optional[str]:
+    """The video a request is about, if it is one the dispatcher routes by affinity."""
+    match = PATH_KEY_PATTERN.match(path)
+    if match:
+        return extract_video_id(match.group(2)) or match.group(2)
+    if path in BODY_KEY_PATHS and body:
+        try:
+            video_id = json.loads(body).get("video_id")
+        except (ValueError, AttributeError):
+            return None
+        if isinstance(video_id, str) and video_id:
+            return extract_video_id(video_id) or video_id
+    return None
+
+
+def _forward_headers(headers) -> dict:
+    return {name: value for name, value in headers.items() if name.lower() not in HOP_HEADERS}
+
+
+def _request_headers(request: Request) -> dict:
+    """Headers for the worker, with the client address appended to X-Forwarded-For."""
+    headers = _forward_headers(request.headers)
+    headers.pop("x-forwarded-for", None)
+    forwarded = request.headers.get("x-forwarded-for")
+    client = request.client.host if request.client else "unknown"
+    headers["x-forwarded-for"] = f"{forwarded}, {client}" if forwarded else client
+    return headers
+
+
+async def _send(worker: Worker, method: str, path: str, query: str, headers: dict, body: bytes) -> httpx.Response:
+    request = _client.build_request(
+        method, f"{worker.url}{path}", params=query or None, headers=headers, content=body,
+    )
+    return await _client.send(request, stream=True)
+
+
+async def _relay(upstream: httpx.Response, worker: Worker):
+    try:
+        async for chunk in upstream.aiter_raw():
+            yield chunk
+    finally:
+        await upstream.aclose()
+        worker.release()
+
+
+async def _proxy(request: Request, body: bytes, video_id: Optional[str]) -> Response:
+    headers = _request_headers(request)
+    for worker, route in _candidates(video_id):
+        worker.acquire()
+        try:
+            upstream = await _send(worker, request.method, request.url.path, request.url.query, headers, body)
+        except httpx.ConnectError:
+            # Nothing reached the worker: take it out of the ring and try the next one
+            worker.release()
+            _leave(worker, "connection refused")
+            continue
+        except Exception:
+            worker.release()
+            raise
+        DISPATCH_REQUESTS_TOTAL.labels(route=route).inc()
+        _routes[route] = _routes.get(route, 0) + 1
+        return StreamingResponse(
+            _relay(upstream, worker),
+            status_code=upstream.status_code,
+            headers=_forward_headers(upstream.headers),
+        )
+
+    DISPATCH_REQUESTS_TOTAL.labels(route="unavailable").inc()
+    return JSONResponse({"detail": "No healthy worker available"}, status_code=503, headers={"Retry-After": "1"})
+
+
+async def _warm(request: Request, body: bytes) -> Response:
+    """Split /warm by owning worker so each video is ingested where its questions will go."""
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        payload = None
+    if not isinstance(payload, dict):
+        # Not a warm request the dispatcher can split; the worker answers it (422)
+        return await _proxy(request, body, None)
+    video_ids = [vid for vid in (extract_video_id(v) for v in payload.get("video_ids") or []) if vid]
+    video_ids = list(dict.fromkeys(video_ids))[:config.WARM_MAX_VIDEOS]
+    if payload.get("playlist_url") or not video_ids or len(_ring.nodes) < 2:
+        return await _proxy(request, body, None)
+
+    shards = {}
+    for video_id in video_ids:
+        shards.setdefault(_ring.preference(video_id)[0], []).append(video_id)
+    headers = _request_headers(request)
+
+    async def merged_stream():
+        events: asyncio.Queue = asyncio.Queue()
+
+        async def run_shard(url: str, ids: List[str]):
+            worker = _workers[url]
+            worker.acquire()
+            reported = set()
+            error = "worker ended the stream early"
+            try:
+                shard_body = json.dumps({**payload, "video_ids": ids}).encode("utf-8")
+                upstream = await _send(worker, "POST", "/warm", "", headers, shard_body)
+                buffer = ""
+                try:
+                    async for text in upstream.aiter_text():
+                        buffer += text
+                        while "\n\n" in buffer:
+                            frame, buffer = buffer.split("\n\n", 1)
+                            if frame.startswith("event: progress\ndata: "):
+                                report = json.loads(frame.split("data: ", 1)[1])
+                                reported.add(report.get("video_id"))
+                                await events.put(report)
+                finally:
+                    await upstream.aclose()
+            except Exception as e:
+                error = str(e)
+            finally:
+                worker.release()
+            # Every video gets a report, or the merged stream would wait forever
+            for video_id in ids:
+                if video_id not in reported:
+                    await events.put({"video_id": video_id, "status": "failed", "seconds": 0.0, "error": f"dispatch: {error}"})
+
+        start = time.perf_counter()
+        for _ in shards:
+            DISPATCH_REQUESTS_TOTAL.labels(route="affinity").inc()
+        tasks = [asyncio.create_task(run_shard(url, ids)) for url, ids in shards.items()]
+        reports = []
+        while len(reports) < len(video_ids):
+            report = await events.get()
+            report.pop("done", None)
+            report.pop("total", None)
+            reports.append(report)
+            progress = {"done": len(reports), "total": len(video_ids), **report}
+            yield f"event: progress\ndata: {json.dumps(progress)}\n\n"
+        await asyncio.gather(*tasks)
+        summary = summarize_warm_run(reports, time.perf_counter() - start)
+        yield f"event: summary\ndata: {json.dumps(summary)}\n\n"
+        yield "data: [END]\n\n"
+
+    return StreamingResponse(merged_stream(), media_type="text/event-stream")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global _client
+    if not _workers:
+        set_workers(config.DISPATCH_WORKERS.split(","))
+    _client = httpx.AsyncClient(
+        timeout=httpx.Timeout(config.DISPATCH_TIMEOUT, connect=2.0),
+        limits=httpx.Limits(max_connections=None, max_keepalive_connections=64),
+    )
+    health_task = asyncio.create_task(_health_loop())
+    yield
+    health_task.cancel()
+    await _client.aclose()
+
+
+app = FastAPI(lifespan=lifespan, title="Klypse dispatcher", docs_url=None, redoc_url=None, openapi_url=None)
+
+
+@app.get("/dispatch/stats")
+def dispatch_stats():
+    """Ring shares, per-worker load and cache hit ratios, and the affinity hit rate."""
+    keyed = sum(count for route, count in _routes.items() if route != "unkeyed")
+    return {
+        "routes": dict(_routes),
+        "affinity_hit_rate": round(_routes.get("affinity", 0) / keyed, 4) if keyed else None,
+        "ring": _ring.shares(),
+        "workers": [
+            {
+                "url": worker.url,
+                "healthy": worker.healthy,
+                "in_flight": worker.in_flight,
+                "served": worker.served,
+                "cache_hit_ratio": worker.cache_hit_ratio,
+            }
+            for worker in _workers.values()
+        ],
+    }
+
+
+@app.get("/health/ready")
+def dispatch_ready():
+    ready = bool(_ring.nodes)
+    return JSONResponse({"ready": ready, "workers": len(_ring.nodes)}, status_code=200 if ready else 503)
+
+
+@app.get("/metrics")
+def dispatch_metrics():
+    payload, content_type = render_metrics()
+    return Response(content=payload, media_type=content_type)
+
+
+@app.api_route("/{path:path}", methods=["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS", "HEAD"])
+async def dispatch(request: Request, path: str):
+    body = await request.body()
+    if request.url.path == "/warm" and request.method == "POST":
+        return await _warm(request, body)
+    return await _proxy(request, body, routing_key(request.url.path, body))
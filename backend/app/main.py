@@ -1,10 +1,78 @@
 # app/main.py
-from fastapi import FastAPI
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import Depends, FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
-from app.api import endpoints
-from app.config import config
+from fastapi.responses import JSONResponse
+from app.utils.startup import startup_report
+
+with startup_report.phase("import:config"):
+    from app.config import config
+with startup_report.phase("import:api"):
+    from app.api import endpoints
+from app.api.auth import require_api_key
+from app.utils import memory
+from app.utils.logger import get_logger
+from app.utils.metrics import render_metrics
+from app.utils.tracing import new_request_id
+
+logger = get_logger(__name__)
+
+
+def warm_up():
+    """
+    Staged warm-up, run in a worker thread after the server starts listening.
+
+    Each stage is timed in the startup report; the worker reports ready only
+    once all enabled stages have finished.
+    """
+    from app.database.db import init_db
+
+    with startup_report.phase("warmup:database"):
+        init_db()
+
+    if config.WARMUP_EMBEDDINGS:
+        from app.services.embeddings import get_embeddings
+
+        with startup_report.phase("warmup:embeddings"):
+            # First encode also pays for tokenizer/kernel initialisation
+            get_embeddings().embed_query("warm-up")
+
+    with startup_report.phase("warmup:llm_client"):
+        from app.api.deps import get_llm
+
+        get_llm()
+
+    if config.WARMUP_WHISPER:
+        from app.services.local_whisper import get_whisper_model
+
+        with startup_report.phase("warmup:whisper"):
+            get_whisper_model()
+
+    if config.WARMUP_GLOBAL_INDEX:
+        from app.storage.vector_store import get_vectorstore
+
+        with startup_report.phase("warmup:global_index"):
+            get_vectorstore()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    async def run_warm_up():
+        try:
+            await asyncio.to_thread(warm_up)
+            startup_report.mark_ready()
+        except Exception as e:
+            startup_report.mark_ready(error=str(e))
+
+    # Don't block startup: liveness is immediate, readiness follows warm-up
+    warm_up_task = asyncio.create_task(run_warm_up())
+    yield
+    warm_up_task.cancel()
+
 
 app = FastAPI(
+    lifespan=lifespan,
     title="Klypse API",
     description="""
 ## Klypse — YouTube Video Intelligence Engine
@@ -18,8 +86,13 @@ A production-grade AI backend that enables real-time Q&A on any YouTube video.
 - **Deployment**: Dockerized, AWS EC2 compatible with documented local fallback strategy
 
 ### Endpoints
+- `GET /health/ready` — Readiness (warm-up finished) with a startup timing report
 - `GET /check/{video_id}` — Check transcript/vectorstore availability
 - `POST /ask/stream` — Stream AI answer via Server-Sent Events
+- `POST /ask/batch` — Answer many questions about one video with shared retrieval
+- `POST /warm` — Bulk warm-up ingestion for video lists and playlists (requires `X-API-Key`)
+- `GET /metrics` — Prometheus metrics (per-stage latency, transcript tiers, cache hit rates, LLM TTFT)
+- `GET /debug/memory` — Worker RSS and per-resident memory breakdown (memory governor; requires `X-API-Key`)
     """,
     version="1.0.0",
     contact={"name": "Dev Jhawar", "url": "https://github.com/DEVJHAWAR11/VidiqAI"},
@@ -33,8 +106,39 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Request-ID", "X-Stream-ID", "Retry-After"],
 )
 
+class RequestIdMiddleware:
+    """
+    Binds a request id to the request context so every span and log line
+    emitted while serving it (including inside streamed responses) can be
+    correlated. Honors an incoming `X-Request-ID` and echoes it back.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        incoming = dict(scope.get("headers") or []).get(b"x-request-id")
+        request_id = new_request_id(incoming.decode("latin-1") if incoming else None)
+
+        async def send_with_request_id(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"x-request-id", request_id.encode("latin-1")))
+                message["headers"] = headers
+            await send(message)
+
+        await self.app(scope, receive, send_with_request_id)
+
+
+app.add_middleware(RequestIdMiddleware)
+
 # Include API routes
 app.include_router(endpoints.router)
 
@@ -42,6 +146,24 @@ app.include_router(endpoints.router)
 def root():
     return {"message": "Klypse API", "version": "1.0.0", "docs": "/docs"}
 
-@app.get("/health", summary="Health Check", description="Returns service health status.")
+@app.get("/health", summary="Health Check", description="Liveness: returns healthy as soon as the process is serving. Also reports readiness.")
 def health():
-    return {"status": "healthy"}
+    return {"status": "healthy", "ready": startup_report.ready}
+
+@app.get("/health/live", summary="Liveness", description="Returns 200 while the process is up.")
+def health_live():
+    return {"status": "alive"}
+
+@app.get("/health/ready", summary="Readiness", description="Returns 200 once warm-up has finished, 503 before that. Includes the startup timing report.")
+def health_ready():
+    report = startup_report.as_dict()
+    return JSONResponse(report, status_code=200 if report["ready"] else 503)
+
+@app.get("/debug/memory", summary="Memory breakdown", description="Worker RSS, the memory budget (MEMORY_BUDGET_MB) and every registered resident (indexes, models, caches) with its size, rebuild cost and idle time. Requires a valid X-API-Key.")
+def debug_memory(api_key: str = Depends(require_api_key)):
+    return memory.report()
+
+@app.get("/metrics", summary="Prometheus metrics", description="Exposes pipeline latency histograms and counters in Prometheus text format.")
+def metrics():
+    payload, content_type = render_metrics()
+    return Response(content=payload, media_type=content_type)
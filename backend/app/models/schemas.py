@@ -5,6 +5,30 @@ class AskRequest(BaseModel):
     video_id: str
     question: str
 
+class BatchQuestion(BaseModel):
+    """One question inside a batch request"""
+    id: str = Field(..., description="Client-chosen id used to match streamed answers to questions")
+    question: str = Field(..., min_length=1, description="User's question")
+
+class BatchAskRequest(BaseModel):
+    """Request model for answering several questions about one video"""
+    video_id: str = Field(..., description="YouTube video ID")
+    questions: list[BatchQuestion] = Field(..., min_length=1, description="Questions to answer")
+
+    @field_validator('questions')
+    def validate_unique_ids(cls, v):
+        """Question ids multiplex the stream, so they must be unique"""
+        ids = [q.id for q in v]
+        if len(ids) != len(set(ids)):
+            raise ValueError("question ids must be unique")
+        return v
+
+class WarmRequest(BaseModel):
+    """Request model for bulk warm-up ingestion"""
+    video_ids: list[str] = Field(default_factory=list, description="YouTube video IDs or URLs")
+    playlist_url: Optional[str] = Field(None, description="YouTube playlist URL to expand")
+    parallelism: Optional[int] = Field(None, ge=1, le=16, description="Concurrent ingestions (defaults to WARM_PARALLELISM)")
+
 class ProcessVideoRequest(BaseModel):
     """Request model for processing a video"""
     video_url: str = Field(..., description="YouTube video URL or video ID")
@@ -46,6 +70,8 @@ class SummaryResponse(BaseModel):
     summary: str
     video_id: str
     transcript_length: int
+    sections: list[str] = Field(default_factory=list, description="Section summaries, in video order")
+    cached: bool = Field(False, description="Served from the persisted summary tree")
 
 class ErrorResponse(BaseModel):
     """Standard error response"""
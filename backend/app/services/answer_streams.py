@@ -0,0 +1,182 @@
+# app/services/answer_streams.py
+"""
+Resumable SSE answer streams.
+
+Each `/ask/stream` answer is produced by a background task that appends
+events to a short-lived in-memory buffer; the HTTP response only follows
+that buffer. Every frame carries `id: <stream_id>:<seq>`, so a client whose
+connection dropped can re-send the request with `Last-Event-ID` and get the
+remaining events without re-running ingestion or the Groq call.
+
+Buffers are kept for ANSWER_STREAM_TTL seconds after the answer finishes.
+They live in the worker's memory: a reconnect that lands on another worker
+(or arrives after expiry) simply starts a new stream with a new id.
+
+Answer words are coalesced into frames (FrameCoalescer) instead of one
+`data:` frame per word, which cuts frames, bytes and write syscalls per answer.
+"""
+import asyncio
+import time
+import uuid
+from collections import OrderedDict
+from typing import AsyncIterator, Optional
+
+from app.config import config
+from app.utils import memory
+from app.utils.logger import get_logger
+from app.utils.metrics import ANSWER_STREAM_FRAMES, ANSWER_STREAM_RESUMES_TOTAL
+
+logger = get_logger(__name__)
+
+END_EVENT = "[END]"
+
+
+class FrameCoalescer:
+    """
+    Group words into SSE frames by size or age.
+
+    `add()` returns a frame once the buffered text reaches `max_chars` or the
+    oldest buffered word is `max_delay` seconds old; `flush()` returns the rest.
+    """
+
+    def __init__(self, max_chars: int, max_delay: float):
+        self.max_chars = max_chars
+        self.max_delay = max_delay
+        self._words = []
+        self._chars = 0
+        self._since = None
+
+    def add(self, word: str) -> Optional[str]:
+        if not self._words:
+            self._since = time.monotonic()
+        self._words.append(word)
+        self._chars += len(word) + 1
+        if self._chars >= self.max_chars or time.monotonic() - self._since >= self.max_delay:
+            return self.flush()
+        return None
+
+    def flush(self) -> Optional[str]:
+        if not self._words:
+            return None
+        frame = " ".join(self._words)
+        self._words = []
+        self._chars = 0
+        return frame
+
+
+class AnswerStream:
+    """Buffered events of one answer; seq numbers start at 1."""
+
+    def __init__(self, stream_id: str, key: tuple):
+        self.stream_id = stream_id
+        self.key = key  # (video_id, question): a resume must ask the same thing
+        self.events = []
+        self.done = False
+        self.finished_at = None
+        self.task = None
+        self._changed = asyncio.Event()
+
+    def _notify(self):
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    def append(self, data: str):
+        self.events.append(data)
+        self._notify()
+
+    def finish(self):
+        if not self.events or self.events[-1] != END_EVENT:
+            self.events.append(END_EVENT)
+        self.done = True
+        self.finished_at = time.monotonic()
+        ANSWER_STREAM_FRAMES.observe(len(self.events))
+        self._notify()
+
+    async def follow(self, after: int = 0) -> AsyncIterator[str]:
+        """Yield SSE frames for events with seq > `after`, waiting for new ones until done."""
+        seq = after
+        while True:
+            while seq < len(self.events):
+                seq += 1
+                yield f"id: {self.stream_id}:{seq}\ndata: {self.events[seq - 1]}\n\n"
+            if self.done:
+                return
+            changed = self._changed
+            await changed.wait()
+
+
+_streams: "OrderedDict[str, AnswerStream]" = OrderedDict()
+
+
+def _streams_nbytes() -> int:
+    return sum(sum(len(event) for event in stream.events) + 500 for stream in list(_streams.values()))
+
+
+# Reported only: buffers belong to the event loop and are already bounded by TTL and count
+memory.register("answer_streams", kind="cache", size=_streams_nbytes)
+
+
+def _sweep():
+    """Drop expired finished streams, and the oldest finished ones beyond the cap."""
+    now = time.monotonic()
+    for stream_id, stream in list(_streams.items()):
+        if stream.done and now - stream.finished_at > config.ANSWER_STREAM_TTL:
+            del _streams[stream_id]
+    finished = [s for s in _streams.values() if s.done]
+    excess = len(_streams) - config.ANSWER_STREAM_MAX
+    for stream in finished[:max(0, excess)]:
+        del _streams[stream.stream_id]
+
+
+async def _produce(stream: AnswerStream, events: AsyncIterator[str]):
+    try:
+        async for data in events:
+            stream.append(data)
+    except Exception as e:
+        logger.error(f"✗ Answer stream {stream.stream_id} failed: {str(e)}")
+        stream.append(f"❌ Error: {str(e)}")
+    finally:
+        stream.finish()
+
+
+def start_stream(key: tuple, events: AsyncIterator[str]) -> AnswerStream:
+    """
+    Run `events` (an async iterator of `data:` payloads) in the background.
+
+    The task keeps going if the client disconnects, so the buffered answer
+    is there when it reconnects.
+    """
+    _sweep()
+    stream = AnswerStream(uuid.uuid4().hex, key)
+    _streams[stream.stream_id] = stream
+    stream.task = asyncio.create_task(_produce(stream, events))
+    return stream
+
+
+def parse_last_event_id(value: Optional[str]) -> Optional[tuple]:
+    """'<stream_id>:<seq>' -> (stream_id, seq), or None if absent or malformed."""
+    if not value:
+        return None
+    stream_id, _, seq = value.strip().rpartition(":")
+    if not stream_id or not seq.isdigit():
+        return None
+    return stream_id, int(seq)
+
+
+def resume_stream(last_event_id: Optional[str], key: tuple) -> Optional[tuple]:
+    """
+    Find the buffered stream a reconnecting client was reading.
+
+    Returns:
+        (stream, last_seq) to continue from, or None (start a new stream)
+    """
+    parsed = parse_last_event_id(last_event_id)
+    if parsed is None:
+        return None
+    _sweep()
+    stream = _streams.get(parsed[0])
+    if stream is None or stream.key != key:
+        ANSWER_STREAM_RESUMES_TOTAL.labels(result="miss").inc()
+        return None
+    ANSWER_STREAM_RESUMES_TOTAL.labels(result="hit").inc()
+    return stream, min(parsed[1], len(stream.events))
@@ -1,19 +1,137 @@
-import yt_dlp
+# app/services/audio_utils.py
+"""
+Audio acquisition for the Whisper tiers.
+
+Speech recognition only needs 16 kHz mono, so the default "speech" mode asks
+yt-dlp for the smallest audio stream and converts it to low-bitrate Opus in a
+single ffmpeg pass. A 1-hour video comes out around 10 MB instead of ~55 MB
+of 128 kbps MP3, which keeps far more videos under the Groq upload limit.
+"legacy" mode keeps the old 128 kbps MP3 behaviour.
+
+Every download goes into its own temporary directory, removed by
+`downloaded_audio` on success and failure alike. A download can be cancelled
+through a `threading.Event` (the hedged transcript path does this when
+captions win the race); yt-dlp stops at its next progress callback.
+"""
 import os
+import shutil
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import Optional
 
-def download_audio(video_url, output_dir="./data/audio"):
-    os.makedirs(output_dir, exist_ok=True)
-    ydl_opts = {
-        'format': 'bestaudio/best',
+import yt_dlp
+from yt_dlp.utils import DownloadCancelled
+
+from app.config import config
+from app.utils.logger import get_logger
+from app.utils.tracing import stage
+
+logger = get_logger(__name__)
+
+AUDIO_DIR = "./data/audio"
+
+# FFmpegExtractAudio codec -> file extension it produces
+_CODEC_EXTENSIONS = {"opus": "opus", "mp3": "mp3", "vorbis": "ogg", "aac": "m4a", "flac": "flac", "wav": "wav"}
+
+
+def _ydl_options(output_dir: str, mode: str) -> tuple[dict, str]:
+    if mode == "legacy":
+        codec = "mp3"
+        opts = {
+            'format': 'bestaudio/best',
+            'postprocessors': [{
+                'key': 'FFmpegExtractAudio',
+                'preferredcodec': codec,
+                'preferredquality': '128',
+            }],
+        }
+    else:
+        codec = "opus"
+        opts = {
+            # Smallest audio-only stream first; speech survives low bitrates fine
+            'format': 'worstaudio[acodec=opus]/worstaudio/bestaudio/best',
+            'postprocessors': [{
+                'key': 'FFmpegExtractAudio',
+                'preferredcodec': codec,
+                'preferredquality': str(config.AUDIO_BITRATE_KBPS),
+            }],
+            # Downmix + resample in the same ffmpeg pass as the encode
+            'postprocessor_args': {
+                'extractaudio': ['-ac', '1', '-ar', str(config.AUDIO_SAMPLE_RATE)],
+            },
+        }
+
+    opts.update({
         'outtmpl': f'{output_dir}/%(id)s.%(ext)s',
-        'postprocessors': [{
-            'key': 'FFmpegExtractAudio',
-            'preferredcodec': 'mp3',
-            'preferredquality': '192',
-        }],
         'quiet': True,
-    }
+        'no_warnings': True,
+    })
+    return opts, _CODEC_EXTENSIONS[codec]
+
+
+def _cancel_hook(cancel: threading.Event):
+    def hook(_progress):
+        if cancel.is_set():
+            raise DownloadCancelled("audio download cancelled")
+    return hook
+
+
+def download_audio(video_url: str, output_dir: str = AUDIO_DIR, mode: str = None, cancel: Optional[threading.Event] = None) -> str:
+    """
+    Download a video's audio track, ready for transcription.
+
+    Args:
+        video_url: YouTube URL
+        output_dir: Directory the audio file is written to
+        mode: "speech" (16 kHz mono Opus) or "legacy" (128 kbps MP3);
+              defaults to config.AUDIO_MODE
+        cancel: Set to abort the download (raises DownloadCancelled)
+
+    Returns:
+        Path to the audio file
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    ydl_opts, ext = _ydl_options(output_dir, mode or config.AUDIO_MODE)
+    if cancel is not None:
+        if cancel.is_set():
+            raise DownloadCancelled("audio download cancelled")
+        ydl_opts['progress_hooks'] = [_cancel_hook(cancel)]
+        ydl_opts['postprocessor_hooks'] = [_cancel_hook(cancel)]
+
     with yt_dlp.YoutubeDL(ydl_opts) as ydl:
         info = ydl.extract_info(video_url, download=True)
-        audio_path = os.path.join(output_dir, f"{info['id']}.mp3")
+        audio_path = os.path.join(output_dir, f"{info['id']}.{ext}")
+        logger.info(f"✓ Downloaded audio: {audio_path}")
         return audio_path
+
+
+@contextmanager
+def downloaded_audio(video_url: str, mode: str = None, cancel: Optional[threading.Event] = None):
+    """
+    Download audio into a private temp directory and always clean it up.
+
+    Partial downloads (`.part`), the pre-conversion original and the final
+    file are all removed when the block exits, including on exceptions and
+    cancellation.
+    """
+    os.makedirs(AUDIO_DIR, exist_ok=True)
+    work_dir = tempfile.mkdtemp(prefix="dl-", dir=AUDIO_DIR)
+    try:
+        with stage("transcript.download_audio", mode=mode or config.AUDIO_MODE):
+            audio_path = download_audio(video_url, output_dir=work_dir, mode=mode, cancel=cancel)
+        yield audio_path
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def upload_filename(audio_path: str) -> str:
+    """
+    Filename to send to transcription APIs.
+
+    `.opus` files are Ogg containers; APIs that validate by extension accept
+    them as `.ogg`.
+    """
+    name = os.path.basename(audio_path)
+    root, ext = os.path.splitext(name)
+    return f"{root}.ogg" if ext == ".opus" else name
@@ -0,0 +1,152 @@
+# app/services/availability.py
+"""
+Cheap transcript-availability probes for `/check/{video_id}`.
+
+The extension calls `/check` on every video page view, so it must never
+trigger a transcript download or Whisper run. Probes, cheapest first:
+
+    1. Local state: a cached transcript or a per-video index on disk, then
+       the shared artifact store (existence check only)
+    2. Availability cache (in-memory, then on-disk JSON) with separate TTLs
+       for positive and negative results
+    3. Caption listing (one metadata request, no transcript download)
+    4. Video metadata via yt-dlp (no download) — a playable video with audio
+       can still be transcribed by the Whisper tiers
+"""
+import json
+import os
+import threading
+import time
+from typing import Optional
+
+from app.config import config
+from app.storage.artifacts import has_remote_transcript
+from app.storage.atomic import atomic_write_json
+from app.storage.cache import load_transcript
+from app.storage.index_store import index_exists
+from app.services.video_utils import is_valid_video_id
+from app.utils.logger import get_logger
+from app.utils.metrics import record_cache
+from app.utils.tracing import stage
+
+logger = get_logger(__name__)
+
+AVAILABILITY_DIR = "./data/availability"
+
+_memory: dict = {}
+_lock = threading.Lock()
+
+
+def _cache_path(video_id: str) -> str:
+    return os.path.join(AVAILABILITY_DIR, f"{video_id}.json")
+
+
+def _ttl_for(record: dict) -> int:
+    if record["status"] == "available":
+        return config.AVAILABILITY_POSITIVE_TTL
+    return config.AVAILABILITY_NEGATIVE_TTL
+
+
+def _get_cached(video_id: str) -> Optional[dict]:
+    now = time.time()
+    with _lock:
+        record = _memory.get(video_id)
+    if record is None:
+        try:
+            with open(_cache_path(video_id), "r", encoding="utf-8") as f:
+                record = json.load(f)
+        except (OSError, ValueError):
+            return None
+    if now - record["checked_at"] > _ttl_for(record):
+        return None
+    with _lock:
+        _memory[video_id] = record
+    return record
+
+
+def _put_cached(record: dict):
+    with _lock:
+        _memory[record["video_id"]] = record
+    try:
+        atomic_write_json(_cache_path(record["video_id"]), record)
+    except OSError as e:
+        logger.warning(f"Could not persist availability for {record['video_id']}: {str(e)}")
+
+
+def invalidate(video_id: str):
+    """Forget a cached probe result (e.g. after ingestion fails)."""
+    with _lock:
+        _memory.pop(video_id, None)
+    try:
+        os.remove(_cache_path(video_id))
+    except OSError:
+        pass
+
+
+def _probe_captions(video_id: str) -> Optional[dict]:
+    from youtube_transcript_api import YouTubeTranscriptApi
+
+    try:
+        transcripts = list(YouTubeTranscriptApi().list(video_id))
+    except Exception as e:
+        logger.info(f"✗ Caption listing failed for {video_id}: {str(e)}")
+        return None
+    if not transcripts:
+        return None
+    return {"source": "captions", "languages": sorted({t.language_code for t in transcripts})}
+
+
+def _probe_metadata(video_id: str) -> Optional[dict]:
+    import yt_dlp
+
+    ydl_opts = {'quiet': True, 'no_warnings': True, 'skip_download': True}
+    try:
+        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            info = ydl.extract_info(f"https://www.youtube.com/watch?v={video_id}", download=False, process=False)
+    except Exception as e:
+        logger.info(f"✗ Metadata probe failed for {video_id}: {str(e)}")
+        return None
+    if not info or info.get("is_live"):
+        return None
+    return {"source": "audio", "duration": info.get("duration")}
+
+
+def probe_availability(video_id: str) -> dict:
+    """
+    Report whether a transcript can be produced for `video_id`, cheaply.
+
+    Returns:
+        {"video_id", "status": "available"|"unavailable", "source", "cached", "checked_at", ...}
+        where source is one of: transcript_cache, index, artifact_store, captions, audio, invalid, none
+    """
+    now = time.time()
+
+    if not is_valid_video_id(video_id):
+        return {"video_id": video_id, "status": "unavailable", "source": "invalid", "cached": False, "checked_at": now}
+
+    # 1. Local state is authoritative and free to check
+    if load_transcript(video_id, fetch_remote=False) is not None:
+        return {"video_id": video_id, "status": "available", "source": "transcript_cache", "cached": False, "checked_at": now}
+    if index_exists(video_id):
+        return {"video_id": video_id, "status": "available", "source": "index", "cached": False, "checked_at": now}
+    # Another node already ingested it (existence check only, nothing is downloaded)
+    if has_remote_transcript(video_id):
+        return {"video_id": video_id, "status": "available", "source": "artifact_store", "cached": False, "checked_at": now}
+
+    # 2. Recent probe result
+    cached = _get_cached(video_id)
+    record_cache("availability", cached is not None)
+    if cached is not None:
+        return {**cached, "cached": True}
+
+    # 3./4. Remote metadata probes
+    with stage("check.probe", video_id=video_id):
+        found = _probe_captions(video_id) or _probe_metadata(video_id)
+
+    record = {"video_id": video_id, "checked_at": now}
+    if found:
+        record.update(status="available", **found)
+    else:
+        record.update(status="unavailable", source="none")
+    _put_cached(record)
+    return {**record, "cached": False}
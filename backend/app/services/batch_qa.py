@@ -0,0 +1,130 @@
+# app/services/batch_qa.py
+"""
+Multi-question answering over a single per-video index.
+
+Instead of building one RetrievalQA chain per question, the batch path:
+    1. embeds every question in one model call (repeat questions come from
+       the shared query-embedding LRU)
+    2. searches the FAISS index for all query vectors in one `index.search`
+    3. applies MMR per question on the fetched candidates (exact vectors
+       for PQ indexes, see app/storage/quantization.py)
+    4. sends the LLM calls concurrently under a semaphore, each through the
+       Groq scheduler with a ticket admitted by the endpoint
+"""
+import asyncio
+from typing import AsyncIterator, List, Sequence, Tuple
+
+import numpy as np
+from langchain_community.vectorstores.utils import maximal_marginal_relevance
+from langchain_core.documents import Document
+
+from app.services.groq_scheduler import Ticket, get_scheduler
+from app.services.qa_chain import QA_PROMPT, RETRIEVAL_FETCH_K, RETRIEVAL_K
+from app.storage.quantization import candidate_vectors
+from app.utils.logger import get_logger
+from app.utils.tracing import StageTimingCallback, stage
+
+logger = get_logger(__name__)
+
+MMR_LAMBDA = 0.5  # LangChain's default lambda_mult for MMR retrievers
+
+
+def retrieve_batch(
+    vectorstore,
+    questions: Sequence[str],
+    k: int = RETRIEVAL_K,
+    fetch_k: int = RETRIEVAL_FETCH_K,
+) -> List[List[Document]]:
+    """
+    Retrieve MMR context for many questions against one FAISS vectorstore.
+
+    Args:
+        vectorstore: LangChain FAISS store for a single video
+        questions: Question texts, in order
+        k: Chunks returned per question
+        fetch_k: Candidates fetched per question before MMR re-ranking
+
+    Returns:
+        One list of Documents per question, aligned with `questions`
+    """
+    if not questions:
+        return []
+
+    with stage("batch.embed", questions=len(questions)):
+        query_vectors = np.asarray(
+            vectorstore.embeddings.embed_queries(list(questions)), dtype=np.float32
+        )
+
+    fetch_k = min(fetch_k, vectorstore.index.ntotal)
+    with stage("batch.retrieval", questions=len(questions), fetch_k=fetch_k):
+        # Single vectorized search for every query
+        _, indices = vectorstore.index.search(query_vectors, fetch_k)
+
+        results = []
+        for query_vector, row in zip(query_vectors, indices):
+            candidate_ids = [int(i) for i in row if i != -1]
+            if not candidate_ids:
+                results.append([])
+                continue
+            candidates = candidate_vectors(vectorstore, candidate_ids)
+            selected = maximal_marginal_relevance(
+                query_vector, candidates, k=min(k, len(candidate_ids)), lambda_mult=MMR_LAMBDA
+            )
+            results.append([
+                vectorstore.docstore.search(vectorstore.index_to_docstore_id[candidate_ids[j]])
+                for j in selected
+            ])
+    return results
+
+
+async def _answer_one(llm, question_id: str, question: str, docs: List[Document], semaphore: asyncio.Semaphore, ticket: Ticket) -> Tuple[str, str, str | None]:
+    # Same "stuff" formatting RetrievalQA uses: page contents joined by blank lines
+    context = "\n\n".join(doc.page_content for doc in docs)
+    prompt = QA_PROMPT.format(context=context, question=question)
+    try:
+        async with semaphore:
+            message = await get_scheduler().arun(
+                lambda: llm.ainvoke(prompt, config={"callbacks": [StageTimingCallback()]}),
+                ticket,
+            )
+    except Exception as e:
+        logger.error(f"Batch answer failed for {question_id}: {str(e)}")
+        return question_id, "", str(e)
+    return question_id, str(getattr(message, "content", message)).strip(), None
+
+
+async def answer_batch(
+    llm,
+    vectorstore,
+    items: Sequence[Tuple[str, str]],
+    max_concurrency: int,
+    tickets: Sequence[Ticket],
+) -> AsyncIterator[Tuple[str, str, str | None]]:
+    """
+    Answer `(question_id, question)` pairs, yielding results as they complete.
+
+    `tickets` are scheduler admissions, one per item. Any that are never
+    used (retrieval failure, client disconnect) are released here.
+
+    Yields:
+        (question_id, answer, error) — exactly one of answer/error is meaningful
+    """
+    tasks = []
+    try:
+        questions = [question for _, question in items]
+        contexts = await asyncio.to_thread(retrieve_batch, vectorstore, questions)
+
+        semaphore = asyncio.Semaphore(max(1, max_concurrency))
+        tasks = [
+            asyncio.create_task(_answer_one(llm, question_id, question, docs, semaphore, ticket))
+            for (question_id, question), docs, ticket in zip(items, contexts, tickets)
+        ]
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        # Client went away mid-stream: stop paying for answers nobody will read
+        for task in tasks:
+            task.cancel()
+        scheduler = get_scheduler()
+        for ticket in tickets:
+            scheduler.release_unclaimed(ticket)
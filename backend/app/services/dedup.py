@@ -0,0 +1,256 @@
+# app/services/dedup.py
+"""
+Near-duplicate transcript detection (MinHash + LSH).
+
+The same content is often uploaded under many video IDs (mirrors,
+re-uploads). At ingestion time, once a transcript is known, its MinHash
+signature is looked up in an LSH index over the signatures of already
+indexed videos. If an existing video's transcript is similar enough
+(estimated Jaccard similarity of word shingles >= DEDUP_THRESHOLD), the new
+video gets an alias to that video's index instead of being embedded again.
+
+    shingles    lowercased DEDUP_SHINGLE_WORDS-word windows of the transcript
+    signature   DEDUP_NUM_PERM min-hashes (32-bit, universal hashing mod 2^61-1)
+    LSH         DEDUP_BANDS bands of (DEDUP_NUM_PERM / DEDUP_BANDS) rows; videos
+                sharing any band bucket are candidates, then verified by the
+                signature agreement (the Jaccard estimate)
+
+Signatures are appended to one journal, ./data/dedup/signatures.jsonl, so
+every worker (and restarts) see the same index. Each lookup reads only the
+journal bytes written since the previous one (one stat() when nothing
+changed), so picking up other workers' signatures stays O(new videos).
+Videos indexed before dedup existed are signed offline by
+`python -m app.cli.backfill_dedup`, never on the request path.
+"""
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from typing import Optional
+
+import numpy as np
+
+from app.config import config
+from app.storage.atomic import file_lock
+from app.storage.index_store import alias_target, index_exists
+from app.utils.logger import get_logger
+from app.utils.metrics import DEDUP_CHECKS_TOTAL
+
+logger = get_logger(__name__)
+
+SIGNATURE_DIR = "./data/dedup"
+JOURNAL_NAME = "signatures.jsonl"
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+_BLOCK = 4096  # Shingles hashed per vectorized step (bounds memory to BLOCK x NUM_PERM)
+
+_index = None
+_index_lock = threading.Lock()
+_journal = {"inode": None, "offset": 0}
+
+
+def _permutations(num_perm: int):
+    """Fixed (seeded) hash parameters, so signatures are comparable across processes."""
+    rng = np.random.RandomState(1)
+    a = rng.randint(1, 1 << 32, size=num_perm, dtype=np.uint64)
+    b = rng.randint(0, 1 << 32, size=num_perm, dtype=np.uint64)
+    return a, b
+
+
+def _shingle_hashes(text: str, k: int) -> np.ndarray:
+    words = re.findall(r"\w+", text.lower())
+    shingles = {" ".join(words[i:i + k]) for i in range(max(1, len(words) - k + 1))} if words else set()
+    return np.fromiter(
+        (int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=4).digest(), "little") for s in shingles),
+        dtype=np.uint64,
+        count=len(shingles),
+    )
+
+
+def transcript_signature(transcript: str) -> Optional[np.ndarray]:
+    """
+    MinHash signature of a transcript, or None if it is too short to compare
+    (fewer than DEDUP_MIN_WORDS words).
+    """
+    if len(re.findall(r"\w+", transcript)) < config.DEDUP_MIN_WORDS:
+        return None
+    hashes = _shingle_hashes(transcript, config.DEDUP_SHINGLE_WORDS)
+    a, b = _permutations(config.DEDUP_NUM_PERM)
+    signature = np.full(config.DEDUP_NUM_PERM, _MAX_HASH, dtype=np.uint64)
+    for start in range(0, len(hashes), _BLOCK):
+        block = hashes[start:start + _BLOCK]
+        # a, x < 2^32 so a*x + b < 2^64: no uint64 overflow before the modulo
+        permuted = (np.outer(block, a) + b) % _MERSENNE_PRIME & _MAX_HASH
+        signature = np.minimum(signature, permuted.min(axis=0))
+    return signature.astype(np.uint32)
+
+
+def similarity(sig_a: np.ndarray, sig_b: np.ndarray) -> float:
+    """Estimated Jaccard similarity: the fraction of agreeing min-hashes."""
+    return float(np.mean(sig_a == sig_b))
+
+
+class SignatureIndex:
+    """In-memory LSH buckets over persisted signatures."""
+
+    def __init__(self, num_perm: int, bands: int):
+        self.num_perm = num_perm
+        self.bands = max(1, min(bands, num_perm))
+        self.rows = num_perm // self.bands
+        self.signatures = {}
+        self.buckets = {}
+
+    def _band_keys(self, signature: np.ndarray):
+        for band in range(self.bands):
+            yield band, signature[band * self.rows:(band + 1) * self.rows].tobytes()
+
+    def add(self, video_id: str, signature: np.ndarray):
+        if video_id in self.signatures:
+            self.remove(video_id)
+        self.signatures[video_id] = signature
+        for key in self._band_keys(signature):
+            self.buckets.setdefault(key, set()).add(video_id)
+
+    def remove(self, video_id: str):
+        signature = self.signatures.pop(video_id, None)
+        if signature is None:
+            return
+        for key in self._band_keys(signature):
+            bucket = self.buckets.get(key)
+            if bucket:
+                bucket.discard(video_id)
+
+    def query(self, signature: np.ndarray) -> list:
+        """Candidates sharing a band with `signature`, as (video_id, similarity), most similar first."""
+        candidates = set()
+        for key in self._band_keys(signature):
+            candidates |= self.buckets.get(key, set())
+        scored = [(video_id, similarity(signature, self.signatures[video_id])) for video_id in candidates]
+        return sorted(scored, key=lambda item: item[1], reverse=True)
+
+
+def journal_path() -> str:
+    return os.path.join(SIGNATURE_DIR, JOURNAL_NAME)
+
+
+def _parse_record(line: bytes) -> Optional[tuple]:
+    """(video_id, signature) of a journal line, or None if unreadable or computed with other parameters."""
+    try:
+        record = json.loads(line)
+    except ValueError:
+        return None
+    # Signatures computed with other parameters are not comparable
+    if record.get("num_perm") != config.DEDUP_NUM_PERM or record.get("shingle_words") != config.DEDUP_SHINGLE_WORDS:
+        return None
+    return record["video_id"], np.asarray(record["signature"], dtype=np.uint32)
+
+
+def append_signatures(signatures: dict):
+    """Append {video_id: signature} to the journal in a single write."""
+    lines = "".join(
+        json.dumps({
+            "video_id": video_id,
+            "num_perm": config.DEDUP_NUM_PERM,
+            "shingle_words": config.DEDUP_SHINGLE_WORDS,
+            "signature": signature.tolist(),
+            "created_at": time.time(),
+        }) + "\n"
+        for video_id, signature in signatures.items()
+    )
+    if not lines:
+        return
+    os.makedirs(SIGNATURE_DIR, exist_ok=True)
+    # O_APPEND plus the lock keeps concurrent workers' lines whole
+    with file_lock("dedup-journal", exclusive=True):
+        fd = os.open(journal_path(), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, lines.encode("utf-8"))
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+
+def _sync(index: SignatureIndex):
+    """Add signatures appended since the last lookup (e.g. by other workers). Caller holds _index_lock."""
+    try:
+        status = os.stat(journal_path())
+    except FileNotFoundError:
+        return
+    if status.st_ino != _journal["inode"] or status.st_size < _journal["offset"]:
+        # First read, or the journal was replaced: start over
+        index.signatures.clear()
+        index.buckets.clear()
+        _journal.update(inode=status.st_ino, offset=0)
+    if status.st_size == _journal["offset"]:
+        return
+
+    with open(journal_path(), "rb") as f:
+        f.seek(_journal["offset"])
+        data = f.read(status.st_size - _journal["offset"])
+    # Stop at the last complete line; a line being appended is read next time
+    end = data.rfind(b"\n") + 1
+    for line in data[:end].splitlines():
+        parsed = _parse_record(line)
+        if parsed is not None:
+            index.add(*parsed)
+    _journal["offset"] += end
+
+
+def get_signature_index() -> SignatureIndex:
+    """Shared signature index, loaded on first use and synced with the journal on every call."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = SignatureIndex(config.DEDUP_NUM_PERM, config.DEDUP_BANDS)
+            _journal.update(inode=None, offset=0)
+        _sync(_index)
+        return _index
+
+
+def find_duplicate(video_id: str, signature: Optional[np.ndarray]) -> Optional[tuple]:
+    """
+    Best indexed near-duplicate of a transcript signature.
+
+    Args:
+        video_id: Video being ingested (never matched against itself)
+        signature: Its transcript_signature(), or None if too short to compare
+
+    Returns:
+        (video_id, similarity) of a video with a real index and similarity
+        >= DEDUP_THRESHOLD, or None
+    """
+    if signature is None:
+        _record("skipped")
+        return None
+
+    index = get_signature_index()
+    with _index_lock:
+        candidates = index.query(signature)
+
+    for candidate, score in candidates:
+        if score < config.DEDUP_THRESHOLD:
+            break
+        if candidate == video_id:
+            continue
+        # Only real indexes are alias targets (a signature can outlive a deleted index)
+        if index_exists(candidate) and alias_target(candidate) is None:
+            _record("duplicate")
+            return candidate, score
+    _record("unique")
+    return None
+
+
+def remember(video_id: str, signature: Optional[np.ndarray]):
+    """Persist the signature of a video that now has its own index."""
+    if signature is None:
+        return
+    append_signatures({video_id: signature})
+    # The next sync reads it back from the journal
+    get_signature_index()
+
+
+def _record(result: str):
+    DEDUP_CHECKS_TOTAL.labels(result=result).inc()
@@ -1,12 +1,130 @@
+import re
+import threading
+from collections import OrderedDict
+from typing import List
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
 from app.config import config
-from langchain_huggingface import HuggingFaceEmbeddings
+from app.utils import memory
+from app.utils.metrics import record_cache
+
+EMBEDDING_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+
+_embeddings = None
+_lock = threading.Lock()
+
+
+def normalize_query(text: str) -> str:
+    """Cache key for a question: MiniLM is uncased, so case and spacing don't change the vector."""
+    return re.sub(r"\s+", " ", text).strip().casefold()
+
+
+class CachedQueryEmbeddings(Embeddings):
+    """
+    Wraps the embedding model with an LRU of normalized question -> query vector.
+
+    Every per-video vectorstore (and so every retriever built by
+    create_qa_chain) shares this one instance, so a question repeated across
+    videos or sessions ("what are the main points?") skips MiniLM inference.
+    Documents are never cached: chunk text is embedded once per index build.
+    Vectors are kept as float32 arrays (~1.5 KB each for 384 dims).
+    """
+
+    def __init__(self, model: Embeddings, max_entries: int):
+        self.model = model
+        self.max_entries = max_entries
+        self._cache: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+
+    def _lookup(self, key: str):
+        with self._cache_lock:
+            vector = self._cache.get(key)
+            if vector is not None:
+                self._cache.move_to_end(key)
+        record_cache("query_embedding", vector is not None)
+        return vector
+
+    def _store(self, key: str, vector):
+        if self.max_entries <= 0:
+            return
+        with self._cache_lock:
+            self._cache[key] = np.asarray(vector, dtype=np.float32)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+
+    def embed_query(self, text: str) -> List[float]:
+        key = normalize_query(text)
+        vector = self._lookup(key)
+        if vector is None:
+            vector = self.model.embed_query(key)
+            self._store(key, vector)
+            return list(vector)
+        return vector.tolist()
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """Batch form of embed_query: only cache misses go to the model, in one call."""
+        keys = [normalize_query(text) for text in texts]
+        vectors = [self._lookup(key) for key in keys]
+        missing = list(dict.fromkeys(key for key, vector in zip(keys, vectors) if vector is None))
+        if missing:
+            computed = dict(zip(missing, self.model.embed_documents(missing)))
+            for key, vector in computed.items():
+                self._store(key, vector)
+            vectors = [vector if vector is not None else np.asarray(computed[key], dtype=np.float32)
+                       for key, vector in zip(keys, vectors)]
+        return [vector.tolist() for vector in vectors]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.model.embed_documents(texts)
+
+    def clear(self):
+        with self._cache_lock:
+            self._cache.clear()
+
+    def nbytes(self) -> int:
+        with self._cache_lock:
+            return sum(vector.nbytes + 100 for vector in self._cache.values())
+
 
 def get_embeddings():
-    """Return embeddings model based on provider."""
-    if config.LLM_PROVIDER == "groq":
-        # Use free local embeddings (no API key needed)
-        return HuggingFaceEmbeddings(
-            model_name="sentence-transformers/all-MiniLM-L6-v2",
-            model_kwargs={'device': 'cpu'},
-            encode_kwargs={'normalize_embeddings': True}
-        )
\ No newline at end of file
+    """
+    Return the shared embeddings model based on provider.
+
+    The model (and torch/sentence-transformers behind it) is loaded on first
+    use rather than at import, so importing the app stays cheap; warm-up in
+    the lifespan hook calls this before the worker reports ready.
+
+    Query embeddings go through a shared LRU (QUERY_EMBEDDING_CACHE_SIZE).
+    """
+    global _embeddings
+    if _embeddings is None:
+        with _lock:
+            if _embeddings is None and config.LLM_PROVIDER == "groq":
+                from langchain_huggingface import HuggingFaceEmbeddings
+
+                # Use free local embeddings (no API key needed)
+                model = HuggingFaceEmbeddings(
+                    model_name=EMBEDDING_MODEL_NAME,
+                    model_kwargs={'device': 'cpu'},
+                    encode_kwargs={'normalize_embeddings': True}
+                )
+                _embeddings = CachedQueryEmbeddings(model, config.QUERY_EMBEDDING_CACHE_SIZE)
+                # The model is pinned: every loaded vectorstore holds a reference to it
+                memory.register("embeddings", kind="model", size=_model_nbytes(model))
+                memory.register("query_embedding_cache", kind="cache", size=_embeddings.nbytes,
+                                evict=_embeddings.clear, cost=0.5)
+    return _embeddings
+
+
+MINILM_NBYTES = 91 * 1024 * 1024  # all-MiniLM-L6-v2 float32 weights
+
+
+def _model_nbytes(model) -> int:
+    """Parameter bytes of the sentence-transformers model behind the embeddings."""
+    try:
+        return sum(p.numel() * p.element_size() for p in model.client.parameters())
+    except Exception:
+        return MINILM_NBYTES
@@ -0,0 +1,206 @@
+# app/services/extractive.py
+"""
+Extractive fast path for simple lookup questions.
+
+Questions like "what tool does he use" or "what's the price mentioned" are
+usually answered verbatim by one sentence of the transcript. Before the
+RetrievalQA + Groq round trip, `extractive_answer` retrieves the same MMR
+chunks the chain would, splits them into sentence spans and scores every
+span against the question:
+
+    semantic   cosine similarity of MiniLM vectors (query vector comes from
+               the shared LRU, span vectors are memoized per chunk)
+    lexical    share of the question's content words found in the span
+
+    score = (1 - EXTRACTIVE_LEXICAL_WEIGHT) * semantic + EXTRACTIVE_LEXICAL_WEIGHT * lexical
+
+The best span is returned as the answer (a grounded quote, no generation)
+when its score reaches EXTRACTIVE_MIN_SCORE and beats the runner-up by
+EXTRACTIVE_MIN_MARGIN. Anything else, and every question that asks for an
+explanation rather than a fact (why / how does / explain / compare ...),
+falls back to the LLM; the chunks already retrieved are handed to it, so a
+fallback costs only the span scoring.
+
+The stage is off by default (EXTRACTIVE_ENABLED): answers are raw transcript
+text, and the thresholds should be calibrated on real questions first, using
+the scores logged for every attempt.
+
+klypse_extractive_answers_total gives the fast-path rate, and
+klypse_extractive_latency_saved_seconds the LLM time avoided, estimated from
+a moving average of recent chain latencies.
+"""
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from app.config import config
+from app.services.batch_qa import retrieve_batch
+from app.utils import memory
+from app.utils.logger import get_logger
+from app.utils.metrics import EXTRACTIVE_ANSWERS_TOTAL, EXTRACTIVE_LATENCY_SAVED_SECONDS, record_cache
+from app.utils.tracing import stage
+
+logger = get_logger(__name__)
+
+# Factual lookups: the answer is a name, number, place, time or short fact
+LOOKUP_PATTERN = re.compile(
+    r"^\s*(what|which|who|whom|whose|when|where|how (much|many|long|old|often|big)|"
+    r"name|list|is there|does (he|she|they|it) (use|mention|recommend))\b",
+    re.IGNORECASE,
+)
+# Questions that need reasoning or synthesis over the context
+EXPLANATION_PATTERN = re.compile(
+    r"\b(why|explain|describe|compare|difference|differences|summar\w*|overview|opinion|think|"
+    r"pros|cons|steps|how (do|does|did|to|can|should|would|is|are))\b",
+    re.IGNORECASE,
+)
+STOPWORDS = frozenset(
+    "a an the is are was were be been being do does did of in on at to for from by with about as "
+    "what which who whom whose when where how much many long old often big name list there this that "
+    "these those it its he she they them his her their him you your i me my we our us video mentioned "
+    "mention mentions say says said talk talks talking use uses used and or but if so not no".split()
+)
+SPAN_CHUNK_WORDS = 25  # Unpunctuated caption text is cut into windows of this many words
+SPAN_CACHE_SIZE = 1024  # Chunks whose spans and span vectors are memoized
+
+_span_cache: "OrderedDict[str, tuple]" = OrderedDict()
+_lock = threading.Lock()
+_llm_seconds: Optional[float] = None  # Moving average of RetrievalQA latency
+
+
+def _span_cache_nbytes() -> int:
+    with _lock:
+        return sum(vectors.nbytes + sum(len(span) for span in spans) for spans, vectors in _span_cache.values())
+
+
+def _clear_span_cache():
+    with _lock:
+        _span_cache.clear()
+
+
+memory.register("extractive_spans", kind="cache", size=_span_cache_nbytes, evict=_clear_span_cache, cost=0.5)
+
+
+def is_lookup_question(question: str) -> bool:
+    """Short factual questions only; anything asking for reasoning goes to the LLM."""
+    if len(question.split()) > config.EXTRACTIVE_MAX_QUESTION_WORDS:
+        return False
+    return bool(LOOKUP_PATTERN.search(question)) and not EXPLANATION_PATTERN.search(question)
+
+
+def _content_words(text: str) -> set:
+    return {word for word in re.findall(r"\w+", text.lower()) if word not in STOPWORDS and len(word) > 1}
+
+
+def split_spans(text: str) -> List[str]:
+    """Sentences of a chunk; long unpunctuated runs (auto captions) become fixed word windows."""
+    spans = []
+    for sentence in re.split(r"(?<=[.!?])\s+", text.strip()):
+        words = sentence.split()
+        if len(words) <= config.EXTRACTIVE_MAX_SPAN_WORDS:
+            if len(words) >= 3:
+                spans.append(sentence.strip())
+            continue
+        for start in range(0, len(words), SPAN_CHUNK_WORDS):
+            window = words[start:start + SPAN_CHUNK_WORDS]
+            if len(window) >= 3:
+                spans.append(" ".join(window))
+    return spans
+
+
+def _chunk_spans(embeddings, text: str) -> tuple:
+    """(spans, span vectors) of a retrieved chunk, embedded once per chunk text."""
+    with _lock:
+        cached = _span_cache.get(text)
+        if cached is not None:
+            _span_cache.move_to_end(text)
+    record_cache("extractive_spans", cached is not None)
+    if cached is not None:
+        return cached
+
+    spans = split_spans(text)
+    vectors = np.asarray(embeddings.embed_documents(spans), dtype=np.float32) if spans else np.zeros((0, 0), dtype=np.float32)
+    with _lock:
+        _span_cache[text] = (spans, vectors)
+        while len(_span_cache) > SPAN_CACHE_SIZE:
+            _span_cache.popitem(last=False)
+    return spans, vectors
+
+
+def score_spans(question: str, query_vector: np.ndarray, spans: List[str], vectors: np.ndarray) -> np.ndarray:
+    """Blend of semantic (cosine; vectors are normalized) and lexical match, per span."""
+    semantic = vectors @ query_vector
+    keywords = _content_words(question)
+    if keywords:
+        lexical = np.asarray([len(keywords & _content_words(span)) / len(keywords) for span in spans], dtype=np.float32)
+    else:
+        lexical = np.zeros(len(spans), dtype=np.float32)
+    weight = config.EXTRACTIVE_LEXICAL_WEIGHT
+    return (1 - weight) * semantic + weight * lexical
+
+
+def extractive_answer(vectorstore, question: str, video_id: str = "") -> Tuple[Optional[dict], Optional[list]]:
+    """
+    Answer a lookup question with a transcript span, if confident enough.
+
+    Args:
+        vectorstore: Loaded per-video FAISS store
+        question: User question
+        video_id: For logging only
+
+    Returns:
+        (answer, documents): answer is {"answer", "score", "margin", "seconds"}
+        when the fast path answers, otherwise None (the caller runs the LLM);
+        documents are the MMR chunks retrieved on the way (None if retrieval
+        did not run), to be passed to the LLM instead of retrieving again
+    """
+    if not config.EXTRACTIVE_ENABLED:
+        return None, None
+    if not is_lookup_question(question):
+        EXTRACTIVE_ANSWERS_TOTAL.labels(result="skipped").inc()
+        return None, None
+
+    start = time.perf_counter()
+    with stage("qa.extractive", video_id=video_id):
+        documents = retrieve_batch(vectorstore, [question])[0]
+        spans, vectors = [], []
+        for document in documents:
+            chunk_spans, chunk_vectors = _chunk_spans(vectorstore.embeddings, document.page_content)
+            if chunk_spans:
+                spans += chunk_spans
+                vectors.append(chunk_vectors)
+        if not spans:
+            EXTRACTIVE_ANSWERS_TOTAL.labels(result="fallback").inc()
+            return None, documents
+
+        query_vector = np.asarray(vectorstore.embeddings.embed_query(question), dtype=np.float32)
+        scores = score_spans(question, query_vector, spans, np.vstack(vectors))
+        order = np.argsort(scores)[::-1]
+        best = float(scores[order[0]])
+        margin = best - float(scores[order[1]]) if len(order) > 1 else best
+    elapsed = time.perf_counter() - start
+
+    if best < config.EXTRACTIVE_MIN_SCORE or margin < config.EXTRACTIVE_MIN_MARGIN:
+        EXTRACTIVE_ANSWERS_TOTAL.labels(result="fallback").inc()
+        logger.info(f"Extractive fallback for {video_id}: score {best:.3f}, margin {margin:.3f}")
+        return None, documents
+
+    EXTRACTIVE_ANSWERS_TOTAL.labels(result="answered").inc()
+    with _lock:
+        llm_seconds = _llm_seconds
+    if llm_seconds is not None:
+        EXTRACTIVE_LATENCY_SAVED_SECONDS.observe(max(0.0, llm_seconds - elapsed))
+    logger.info(f"✓ Extractive answer for {video_id}: score {best:.3f}, margin {margin:.3f}, {elapsed * 1000:.0f}ms")
+    answer = {"answer": spans[order[0]], "score": round(best, 4), "margin": round(margin, 4), "seconds": round(elapsed, 4)}
+    return answer, documents
+
+
+def record_llm_seconds(seconds: float):
+    """Feed the moving average of RetrievalQA latency used to estimate the time saved."""
+    global _llm_seconds
+    with _lock:
+        _llm_seconds = seconds if _llm_seconds is None else 0.9 * _llm_seconds + 0.1 * seconds
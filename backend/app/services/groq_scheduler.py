@@ -0,0 +1,514 @@
+# app/services/groq_scheduler.py
+"""
+Client-side scheduler for every call we make to Groq.
+
+Interactive answers (`/ask/*`) and background Whisper transcription share
+one pooled HTTP client and one queue:
+
+    - Admission control: each caller (API key, or client address without
+      one) may have at most GROQ_MAX_QUEUED_PER_KEY calls queued or in
+      flight (GROQ_MAX_QUEUED overall). Beyond that,
+      `admit` raises SchedulerBusy with a Retry-After estimate so the
+      endpoint can return a fast 429 instead of an SSE error later.
+    - Priority: waiting calls run in (priority, arrival) order, so an
+      interactive answer jumps ahead of queued background jobs.
+    - Budgets: token buckets for requests/min and tokens/min per endpoint
+      group ("chat", "audio"). Configured limits set the refill rate; the
+      x-ratelimit-* response headers pull the buckets down when Groq says
+      we have less headroom than we think, and Retry-After on a 429 blocks
+      the group until it expires.
+    - Retries: 429s, 5xx and connection errors are retried with full-jitter
+      exponential backoff, re-queueing behind higher-priority work.
+
+Blocking callers (`run`) wait on a threading.Condition; async callers
+(`arun`) wait on an asyncio.Event woken from `_notify`, so a queued answer
+never holds a thread of the default executor.
+"""
+import asyncio
+import heapq
+import itertools
+import math
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import httpx
+
+from app.config import config
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+INTERACTIVE = 0
+BACKGROUND = 1
+
+ANONYMOUS_KEY = "anonymous"
+
+_RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+class SchedulerBusy(Exception):
+    """Raised at admission time when the queue for a key (or overall) is full."""
+
+    def __init__(self, retry_after: float, reason: str):
+        super().__init__(reason)
+        self.retry_after = retry_after
+        self.reason = reason
+
+
+def parse_duration(value: Optional[str]) -> Optional[float]:
+    """
+    Parse Groq reset/retry durations into seconds.
+
+    Accepts plain seconds ("7", "0.5") and Go-style durations ("2m59.56s", "120ms").
+    """
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    total = 0.0
+    matched = False
+    for amount, unit in re.findall(r"([\d.]+)(ms|h|m|s)", value):
+        matched = True
+        total += float(amount) * {"h": 3600, "m": 60, "s": 1, "ms": 0.001}[unit]
+    return total if matched else None
+
+
+class TokenBucket:
+    """Classic token bucket refilled continuously at `rate` per second."""
+
+    def __init__(self, capacity: float, rate: float):
+        self.capacity = capacity
+        self.rate = rate
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, amount: float, now: float) -> float:
+        """Seconds until `amount` tokens are available (0 if available now)."""
+        self._refill(now)
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        amount = min(amount, self.capacity)  # oversized requests wait for a full bucket, not forever
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate if self.rate > 0 else 1.0
+
+    def take(self, amount: float, now: float):
+        self._refill(now)
+        self.tokens -= min(amount, self.capacity)
+
+    def sync(self, remaining: Optional[float], reset_seconds: Optional[float], limit: Optional[float] = None):
+        """Correct the bucket from server-reported headroom."""
+        now = time.monotonic()
+        self._refill(now)
+        if limit:
+            self.capacity = limit
+        if remaining is not None:
+            self.tokens = min(self.tokens, remaining)
+            if remaining <= 0 and reset_seconds:
+                self.blocked_until = max(self.blocked_until, now + reset_seconds)
+
+    def block_for(self, seconds: float):
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+
+@dataclass(order=True, unsafe_hash=True)
+class Ticket:
+    priority: int
+    seq: int
+    group: str = field(compare=False)
+    api_key: str = field(compare=False)
+    est_tokens: int = field(compare=False, default=0)
+    claimed: bool = field(compare=False, default=False)
+    released: bool = field(compare=False, default=False)
+
+
+class GroqScheduler:
+    def __init__(
+        self,
+        budgets: Dict[str, Dict[str, float]],
+        max_concurrency: int,
+        max_queued: int,
+        max_queued_per_key: int,
+        max_retries: int,
+        backoff_base: float,
+        backoff_max: float,
+    ):
+        self._requests = {g: TokenBucket(b["rpm"], b["rpm"] / 60.0) for g, b in budgets.items()}
+        self._tokens = {g: TokenBucket(b["tpm"], b["tpm"] / 60.0) for g, b in budgets.items() if b.get("tpm")}
+        self.max_concurrency = max_concurrency
+        self.max_queued = max_queued
+        self.max_queued_per_key = max_queued_per_key
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self._cond = threading.Condition()
+        self._async_waiters = set()  # (loop, asyncio.Event) of arun calls waiting for a turn
+        self._waiting: List[Ticket] = []
+        self._in_flight = 0
+        self._admitted_per_key: Dict[str, int] = {}
+        self._admitted = 0
+        self._seq = itertools.count()
+
+    # -- Admission ---------------------------------------------------------------
+    def admit(self, priority: int, api_key: Optional[str] = None, group: str = "chat", est_tokens: int = 0, count: int = 1) -> List[Ticket]:
+        """
+        Reserve `count` queue slots for `api_key`, or raise SchedulerBusy.
+
+        The tickets must be handed to `run`/`arun` (which release them) or
+        released with `release_unclaimed` if the call never happens.
+        """
+        api_key = api_key or ANONYMOUS_KEY
+        with self._cond:
+            per_key = self._admitted_per_key.get(api_key, 0)
+            if per_key + count > self.max_queued_per_key:
+                raise SchedulerBusy(self._retry_after_estimate(group), f"too many queued Groq calls for this API key ({per_key})")
+            if self._admitted + count > self.max_queued:
+                raise SchedulerBusy(self._retry_after_estimate(group), "Groq queue is full")
+            self._admitted_per_key[api_key] = per_key + count
+            self._admitted += count
+            return [Ticket(priority, next(self._seq), group, api_key, est_tokens) for _ in range(count)]
+
+    def release(self, ticket: Ticket):
+        with self._cond:
+            if ticket.released:
+                return
+            ticket.released = True
+            self._admitted -= 1
+            remaining = self._admitted_per_key.get(ticket.api_key, 1) - 1
+            if remaining > 0:
+                self._admitted_per_key[ticket.api_key] = remaining
+            else:
+                self._admitted_per_key.pop(ticket.api_key, None)
+            self._notify()
+
+    def release_unclaimed(self, ticket: Ticket):
+        """Give back an admission whose call never reached `run`/`arun`."""
+        if not ticket.claimed:
+            self.release(ticket)
+
+    def _retry_after_estimate(self, group: str) -> float:
+        # Roughly how long until the current backlog drains at the request budget
+        rate = self._requests[group].rate or 1.0
+        return max(1.0, self._admitted / rate)
+
+    # -- Turn-taking ---------------------------------------------------------------
+    def _bucket_delay(self, ticket: Ticket, now: float) -> float:
+        delay = self._requests[ticket.group].delay(1, now)
+        tokens = self._tokens.get(ticket.group)
+        if tokens is not None and ticket.est_tokens:
+            delay = max(delay, tokens.delay(ticket.est_tokens, now))
+        return delay
+
+    def _turn_delay(self, ticket: Ticket, now: float) -> Optional[float]:
+        """0 if `ticket` may run now, seconds to wait, or None to wait for a notify."""
+        if self._in_flight >= self.max_concurrency:
+            return None
+        for other in sorted(self._waiting):
+            if other is ticket:
+                break
+            # A better-placed call that could run right now goes first
+            if self._bucket_delay(other, now) == 0:
+                return None
+        return self._bucket_delay(ticket, now)
+
+    def _notify(self):
+        """Wake every waiter to re-check its turn (call with the lock held)."""
+        self._cond.notify_all()
+        for loop, wake in self._async_waiters:
+            try:
+                loop.call_soon_threadsafe(wake.set)
+            except RuntimeError:
+                pass  # Loop already closed
+
+    def _poll_turn(self, ticket: Ticket) -> tuple:
+        """
+        Take the turn if it is `ticket`'s (call with the lock held).
+
+        Returns (True, None) once taken, else (False, seconds to wait or None for a notify).
+        """
+        now = time.monotonic()
+        delay = self._turn_delay(ticket, now)
+        if delay != 0:
+            return False, delay
+        self._unqueue(ticket)
+        self._requests[ticket.group].take(1, now)
+        if ticket.group in self._tokens and ticket.est_tokens:
+            self._tokens[ticket.group].take(ticket.est_tokens, now)
+        self._in_flight += 1
+        # The next eligible waiter may have been held back only by this ticket
+        self._notify()
+        return True, None
+
+    def _unqueue(self, ticket: Ticket):
+        if ticket in self._waiting:
+            self._waiting.remove(ticket)
+            heapq.heapify(self._waiting)
+
+    def _wait_turn(self, ticket: Ticket):
+        """Block the calling thread until `ticket` may call Groq."""
+        with self._cond:
+            heapq.heappush(self._waiting, ticket)
+            try:
+                while True:
+                    taken, delay = self._poll_turn(ticket)
+                    if taken:
+                        return
+                    self._cond.wait(timeout=delay)
+            finally:
+                self._unqueue(ticket)
+
+    async def _await_turn(self, ticket: Ticket):
+        """Wait for a turn on the event loop; cancelling simply leaves the queue."""
+        waiter = (asyncio.get_running_loop(), asyncio.Event())
+        wake = waiter[1]
+        with self._cond:
+            heapq.heappush(self._waiting, ticket)
+            self._async_waiters.add(waiter)
+        try:
+            while True:
+                with self._cond:
+                    taken, delay = self._poll_turn(ticket)
+                    if taken:
+                        return
+                    # Cleared under the lock: any state change after this check sets it again
+                    wake.clear()
+                try:
+                    await asyncio.wait_for(wake.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            with self._cond:
+                self._async_waiters.discard(waiter)
+                if ticket in self._waiting:
+                    self._unqueue(ticket)
+                    self._notify()
+
+    def _finish_call(self):
+        with self._cond:
+            self._in_flight -= 1
+            self._notify()
+
+    # -- Retries -------------------------------------------------------------------
+    def _retry_delay(self, error: Exception, attempt: int, group: str) -> Optional[float]:
+        """Backoff before the next attempt, or None if `error` is not retryable."""
+        response = getattr(error, "response", None)
+        status = getattr(error, "status_code", None) or getattr(response, "status_code", None)
+        transient = type(error).__name__ in ("APIConnectionError", "APITimeoutError") or isinstance(error, httpx.TransportError)
+        if status not in _RETRYABLE_STATUS and not transient:
+            return None
+        if attempt >= self.max_retries:
+            return None
+
+        backoff = random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+        if status == 429:
+            headers = getattr(response, "headers", None) or {}
+            retry_after = parse_duration(headers.get("retry-after"))
+            if retry_after:
+                with self._cond:
+                    self._requests[group].block_for(retry_after)
+                backoff = max(backoff, retry_after)
+        return backoff
+
+    def run(self, fn: Callable[[], Any], ticket: Ticket) -> Any:
+        """Run a blocking Groq call for an admitted ticket, with retries."""
+        ticket.claimed = True
+        try:
+            attempt = 0
+            while True:
+                self._wait_turn(ticket)
+                try:
+                    return fn()
+                except Exception as e:
+                    delay = self._retry_delay(e, attempt, ticket.group)
+                    if delay is None:
+                        raise
+                    logger.warning(f"Groq call failed ({str(e)}); retry {attempt + 1} in {delay:.2f}s")
+                finally:
+                    self._finish_call()
+                time.sleep(delay)
+                attempt += 1
+        finally:
+            self.release(ticket)
+
+    async def arun(self, fn: Callable[[], Awaitable[Any]], ticket: Ticket) -> Any:
+        """Async counterpart of `run`; waiting happens off the event loop."""
+        ticket.claimed = True
+        try:
+            attempt = 0
+            while True:
+                await self._await_turn(ticket)
+                try:
+                    return await fn()
+                except Exception as e:
+                    delay = self._retry_delay(e, attempt, ticket.group)
+                    if delay is None:
+                        raise
+                    logger.warning(f"Groq call failed ({str(e)}); retry {attempt + 1} in {delay:.2f}s")
+                finally:
+                    self._finish_call()
+                await asyncio.sleep(delay)
+                attempt += 1
+        finally:
+            self.release(ticket)
+
+    def call(self, fn: Callable[[], Any], priority: int, api_key: Optional[str] = None, group: str = "chat", est_tokens: int = 0) -> Any:
+        """Admit and run in one step (for callers without an endpoint to 429 from)."""
+        ticket = self.admit(priority, api_key, group, est_tokens)[0]
+        return self.run(fn, ticket)
+
+    # -- Header feedback -----------------------------------------------------------
+    def observe_response(self, response: httpx.Response):
+        """Feed x-ratelimit-* headers from any Groq response back into the buckets."""
+        headers = response.headers
+        if "x-ratelimit-remaining-requests" not in headers and "retry-after" not in headers:
+            return
+        group = "audio" if "/audio/" in response.request.url.path else "chat"
+
+        def number(name):
+            try:
+                return float(headers[name]) if name in headers else None
+            except ValueError:
+                return None
+
+        with self._cond:
+            self._requests[group].sync(
+                number("x-ratelimit-remaining-requests"),
+                parse_duration(headers.get("x-ratelimit-reset-requests")),
+            )
+            if group in self._tokens:
+                self._tokens[group].sync(
+                    number("x-ratelimit-remaining-tokens"),
+                    parse_duration(headers.get("x-ratelimit-reset-tokens")),
+                    limit=number("x-ratelimit-limit-tokens"),
+                )
+            if response.status_code == 429:
+                retry_after = parse_duration(headers.get("retry-after"))
+                if retry_after:
+                    self._requests[group].block_for(retry_after)
+            self._notify()
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "in_flight": self._in_flight,
+                "waiting": len(self._waiting),
+                "admitted": self._admitted,
+                "per_key": dict(self._admitted_per_key),
+            }
+
+
+_scheduler: Optional[GroqScheduler] = None
+_http_client: Optional[httpx.Client] = None
+_async_http_client: Optional[httpx.AsyncClient] = None
+_groq_client = None
+_async_groq_client = None
+_init_lock = threading.RLock()
+
+
+def get_scheduler() -> GroqScheduler:
+    global _scheduler
+    if _scheduler is None:
+        with _init_lock:
+            if _scheduler is None:
+                _scheduler = GroqScheduler(
+                    budgets={
+                        "chat": {"rpm": config.GROQ_RPM, "tpm": config.GROQ_TPM},
+                        "audio": {"rpm": config.GROQ_AUDIO_RPM},
+                    },
+                    max_concurrency=config.GROQ_MAX_CONCURRENCY,
+                    max_queued=config.GROQ_MAX_QUEUED,
+                    max_queued_per_key=config.GROQ_MAX_QUEUED_PER_KEY,
+                    max_retries=config.GROQ_MAX_RETRIES,
+                    backoff_base=config.GROQ_BACKOFF_BASE,
+                    backoff_max=config.GROQ_BACKOFF_MAX,
+                )
+    return _scheduler
+
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=config.GROQ_MAX_CONCURRENCY * 2,
+        max_keepalive_connections=config.GROQ_MAX_CONCURRENCY,
+    )
+
+
+def get_http_client() -> httpx.Client:
+    """Pooled sync HTTP client shared by every Groq SDK/LangChain client."""
+    global _http_client
+    if _http_client is None:
+        with _init_lock:
+            if _http_client is None:
+                _http_client = httpx.Client(
+                    limits=_limits(),
+                    timeout=httpx.Timeout(60.0, connect=10.0),
+                    event_hooks={"response": [lambda r: get_scheduler().observe_response(r)]},
+                )
+    return _http_client
+
+
+def get_async_http_client() -> httpx.AsyncClient:
+    """Pooled async HTTP client (used by `llm.ainvoke`)."""
+    global _async_http_client
+    if _async_http_client is None:
+        async def observe(response):
+            get_scheduler().observe_response(response)
+
+        with _init_lock:
+            if _async_http_client is None:
+                _async_http_client = httpx.AsyncClient(
+                    limits=_limits(),
+                    timeout=httpx.Timeout(60.0, connect=10.0),
+                    event_hooks={"response": [observe]},
+                )
+    return _async_http_client
+
+
+def get_groq_client():
+    """Shared Groq SDK client; retries are left to the scheduler."""
+    global _groq_client
+    if _groq_client is None:
+        from groq import Groq
+
+        with _init_lock:
+            if _groq_client is None:
+                _groq_client = Groq(
+                    api_key=config.GROQ_API_KEY,
+                    base_url=config.GROQ_BASE_URL or None,
+                    http_client=get_http_client(),
+                    max_retries=0,
+                )
+    return _groq_client
+
+
+def get_async_groq_client():
+    """Shared AsyncGroq SDK client on the pooled async HTTP client (for `llm.ainvoke`)."""
+    global _async_groq_client
+    if _async_groq_client is None:
+        from groq import AsyncGroq
+
+        with _init_lock:
+            if _async_groq_client is None:
+                _async_groq_client = AsyncGroq(
+                    api_key=config.GROQ_API_KEY,
+                    base_url=config.GROQ_BASE_URL or None,
+                    http_client=get_async_http_client(),
+                    max_retries=0,
+                )
+    return _async_groq_client
+
+
+def retry_after_header(error: SchedulerBusy) -> Dict[str, str]:
+    return {"Retry-After": str(math.ceil(error.retry_after))}
@@ -0,0 +1,158 @@
+# app/services/ingestion.py
+"""
+Video ingestion: transcript → per-video FAISS index.
+
+Shared by the question endpoints (ingest on first question), speculative
+prefetch after `/check` (app/services/prefetch.py) and the bulk warm-up path
+(`POST /warm`, `python -m app.cli.warm`), which pre-ingests videos we expect
+to be hot.
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Iterable, Optional
+
+from app.config import config
+from app.storage.artifacts import publish_index_alias
+from app.storage.cache import load_transcript
+from app.storage.index_store import index_exists, publish_alias
+from app.storage.vector_store import create_vectorstore_for_video, load_vectorstore_for_video
+from app.services.dedup import find_duplicate, remember, transcript_signature
+from app.services.transcripts import get_transcript
+from app.services.warm_report import summarize_warm_run
+from app.utils.logger import get_logger
+from app.utils.tracing import stage
+
+logger = get_logger(__name__)
+
+
+def index_transcript(video_id: str, transcript: str) -> Optional[str]:
+    """
+    Give `video_id` an index for `transcript`.
+
+    If an indexed video's transcript is a near-duplicate (DEDUP_THRESHOLD),
+    `video_id` becomes an alias of that index and nothing is embedded.
+
+    Returns:
+        The video ID whose index was reused, or None if a new index was built
+    """
+    signature = None
+    if config.DEDUP_ENABLED:
+        with stage("ingest.dedup", video_id=video_id):
+            signature = transcript_signature(transcript)
+            match = find_duplicate(video_id, signature)
+        if match:
+            target, similarity = match
+            publish_index_alias(video_id, publish_alias(video_id, target, {"similarity": round(similarity, 4)}))
+            logger.info(f"✓ {video_id} is a near-duplicate of {target} (similarity {similarity:.2f}); reusing its index")
+            return target
+
+    with stage("ingest.index", video_id=video_id):
+        create_vectorstore_for_video(video_id, transcript)
+    remember(video_id, signature)
+    return None
+
+
+def ingest_video(video_id: str, should_continue: Optional[Callable[[], bool]] = None, captions_only: bool = False) -> dict:
+    """
+    Make sure `video_id` has a per-video index.
+
+    Videos that already have an index are skipped. A cached transcript is
+    reused, so only the embedding step runs for those.
+
+    Args:
+        video_id: Video to ingest
+        should_continue: Called (and may block) between fetching the transcript
+            and building the index; returning False abandons the build. The
+            fetched transcript stays cached.
+        captions_only: Fail instead of falling back to the audio/Whisper tiers
+
+    Returns:
+        Report dict: video_id, status ('skipped' / 'ingested' / 'cancelled' / 'failed'),
+        transcript_cached, transcript_length, deduplicated_from (the video whose
+        index was reused, if any), seconds and error (if failed)
+    """
+    start = time.perf_counter()
+    report = {
+        "video_id": video_id,
+        "status": "skipped",
+        "transcript_cached": False,
+        "transcript_length": 0,
+        "deduplicated_from": None,
+        "seconds": 0.0,
+        "error": None,
+    }
+
+    if index_exists(video_id):
+        report["seconds"] = time.perf_counter() - start
+        return report
+
+    try:
+        transcript = load_transcript(video_id)
+        report["transcript_cached"] = transcript is not None
+        if not transcript:
+            transcript = get_transcript(video_id, captions_only=captions_only)
+        report["transcript_length"] = len(transcript)
+
+        if should_continue is not None and not should_continue():
+            report["status"] = "cancelled"
+            report["seconds"] = time.perf_counter() - start
+            return report
+
+        report["deduplicated_from"] = index_transcript(video_id, transcript)
+        report["status"] = "ingested"
+    except Exception as e:
+        logger.warning(f"✗ Ingestion failed for {video_id}: {str(e)}")
+        report["status"] = "failed"
+        report["error"] = str(e)
+
+    report["seconds"] = time.perf_counter() - start
+    return report
+
+
+def load_or_ingest_vectorstore(video_id: str):
+    """Load the per-video index, ingesting the video first if it has none."""
+    try:
+        return load_vectorstore_for_video(video_id)
+    except FileNotFoundError:
+        report = ingest_video(video_id)
+        if report["status"] == "failed":
+            raise RuntimeError(report["error"])
+        return load_vectorstore_for_video(video_id)
+
+
+def warm_videos(
+    video_ids: Iterable[str],
+    parallelism: int,
+    on_progress: Optional[Callable[[int, int, dict], None]] = None,
+) -> dict:
+    """
+    Ingest many videos with up to `parallelism` running at once.
+
+    Args:
+        video_ids: Video IDs to warm (duplicates are ignored)
+        parallelism: Number of concurrent ingestions
+        on_progress: Called as on_progress(done, total, report) after each video
+
+    Returns:
+        {"summary": {...}, "results": [report, ...]}
+    """
+    unique_ids = list(dict.fromkeys(video_ids))
+    total = len(unique_ids)
+    reports = []
+    start = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=max(1, parallelism)) as pool:
+        futures = [pool.submit(ingest_video, video_id) for video_id in unique_ids]
+        for future in as_completed(futures):
+            report = future.result()
+            reports.append(report)
+            logger.info(
+                f"[{len(reports)}/{total}] {report['video_id']} {report['status']} "
+                f"in {report['seconds']:.1f}s"
+            )
+            if on_progress:
+                on_progress(len(reports), total, report)
+
+    summary = summarize_warm_run(reports, time.perf_counter() - start)
+    logger.info(f"✓ Warm-up finished: {summary}")
+    return {"summary": summary, "results": reports}
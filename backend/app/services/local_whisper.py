@@ -0,0 +1,196 @@
+# app/services/local_whisper.py
+"""
+Local (tier 3) Whisper transcription engines.
+
+    openai   Reference `openai-whisper` on PyTorch, float32 on CPU, over the
+             whole file (music and silence included)
+    faster   `faster-whisper` (CTranslate2) with int8 weights
+             (LOCAL_WHISPER_COMPUTE_TYPE), and Silero voice activity
+             detection so only speech is decoded (default)
+
+Both engines detect the spoken language first and only run Whisper's
+`translate` task when it is not English; English audio is transcribed
+as-is. Both return the same result dict, including timed segments.
+
+`python -m app.cli.bench_whisper` compares real-time factors on fixture audio.
+"""
+import threading
+import time
+from typing import Optional
+
+from app.config import config
+from app.utils import memory
+from app.utils.logger import get_logger
+from app.utils.metrics import LOCAL_WHISPER_REALTIME_FACTOR
+
+logger = get_logger(__name__)
+
+ENGINES = ("faster", "openai")
+SAMPLE_RATE = 16000  # Both engines decode audio to 16 kHz mono
+
+# Parameters per model size (millions), for the memory governor's size estimate
+MODEL_PARAMS_M = {"tiny": 39, "base": 74, "small": 244, "medium": 769, "large": 1550, "turbo": 809}
+
+_models = {}
+_models_lock = threading.Lock()
+
+
+def resolve_engine(engine: Optional[str] = None) -> str:
+    """
+    Engine to use: `engine`, else LOCAL_WHISPER_ENGINE.
+
+    "faster" falls back to "openai" when faster-whisper is not installed.
+    """
+    engine = engine or config.LOCAL_WHISPER_ENGINE
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown local Whisper engine {engine!r}; expected one of {ENGINES}")
+    if engine == "faster":
+        try:
+            import faster_whisper  # noqa: F401
+        except ImportError:
+            logger.warning("✗ faster-whisper is not installed; using the openai-whisper engine")
+            return "openai"
+    return engine
+
+
+def _model_nbytes(engine: str, model_size: str) -> int:
+    params = MODEL_PARAMS_M.get(model_size.split(".")[0].split("-")[0], 244) * 1_000_000
+    # int8 CTranslate2 weights take ~1 byte per parameter, PyTorch float32 four
+    per_param = 1 if engine == "faster" and "int8" in config.LOCAL_WHISPER_COMPUTE_TYPE else 4
+    return params * per_param
+
+
+def _evict_model(key: tuple):
+    with _models_lock:
+        _models.pop(key, None)
+
+
+def get_whisper_model(engine: Optional[str] = None, model_size: Optional[str] = None):
+    """Load (once) and return a local Whisper model for `engine`."""
+    engine = resolve_engine(engine)
+    model_size = model_size or config.LOCAL_WHISPER_MODEL
+    key = (engine, model_size)
+    if key not in _models:
+        with _models_lock:
+            if key not in _models:
+                start = time.perf_counter()
+                if engine == "faster":
+                    from faster_whisper import WhisperModel
+
+                    _models[key] = WhisperModel(
+                        model_size,
+                        device="cpu",
+                        compute_type=config.LOCAL_WHISPER_COMPUTE_TYPE,
+                        cpu_threads=config.LOCAL_WHISPER_THREADS,
+                    )
+                else:
+                    # Importing whisper pulls in torch
+                    import whisper
+
+                    _models[key] = whisper.load_model(model_size, device="cpu")
+                logger.info(f"✓ Loaded local Whisper model: {engine}/{model_size}")
+                memory.register(
+                    f"whisper:{engine}/{model_size}",
+                    kind="model",
+                    size=_model_nbytes(engine, model_size),
+                    evict=lambda: _evict_model(key),
+                    cost=time.perf_counter() - start,
+                )
+    memory.touch(f"whisper:{engine}/{model_size}")
+    return _models[key]
+
+
+def _task_for(language: Optional[str]) -> str:
+    return "transcribe" if language in (None, "en") else "translate"
+
+
+def _transcribe_faster(model, audio_path: str) -> dict:
+    vad_parameters = {"min_silence_duration_ms": config.LOCAL_WHISPER_VAD_MIN_SILENCE_MS}
+    options = {
+        "beam_size": config.LOCAL_WHISPER_BEAM_SIZE,
+        "vad_filter": True,
+        "vad_parameters": vad_parameters,
+    }
+
+    # Segments are generated lazily: this call only decodes, runs VAD and detects the language
+    segments, info = model.transcribe(audio_path, task="transcribe", **options)
+    task = _task_for(info.language)
+    if task == "translate":
+        segments, info = model.transcribe(audio_path, task=task, language=info.language, **options)
+
+    timed = [{"start": round(s.start, 2), "end": round(s.end, 2), "text": s.text.strip()} for s in segments]
+    return {
+        "language": info.language,
+        "task": task,
+        "audio_seconds": info.duration,
+        "speech_seconds": getattr(info, "duration_after_vad", info.duration),
+        "segments": timed,
+    }
+
+
+def _transcribe_openai(model, audio_path: str) -> dict:
+    import whisper
+
+    audio = whisper.load_audio(audio_path)
+    mel = whisper.log_mel_spectrogram(whisper.pad_or_trim(audio)).to(model.device)
+    _, probs = model.detect_language(mel)
+    language = max(probs, key=probs.get)
+    task = _task_for(language)
+
+    result = model.transcribe(audio, task=task, language=language, fp16=False)
+    timed = [
+        {"start": round(s["start"], 2), "end": round(s["end"], 2), "text": s["text"].strip()}
+        for s in result["segments"]
+    ]
+    duration = len(audio) / SAMPLE_RATE
+    return {
+        "language": language,
+        "task": task,
+        "audio_seconds": duration,
+        "speech_seconds": duration,
+        "segments": timed,
+    }
+
+
+def transcribe_local(audio_path: str, engine: Optional[str] = None, model_size: Optional[str] = None) -> dict:
+    """
+    Transcribe an audio file with a local Whisper engine.
+
+    Args:
+        audio_path: Audio file (anything ffmpeg can decode)
+        engine: "faster" or "openai"; defaults to LOCAL_WHISPER_ENGINE
+        model_size: Whisper model size; defaults to LOCAL_WHISPER_MODEL
+
+    Returns:
+        {"text", "segments": [{"start", "end", "text"}], "language",
+         "task" ("transcribe" / "translate"), "engine", "model",
+         "audio_seconds", "speech_seconds", "seconds", "realtime_factor"}
+    """
+    engine = resolve_engine(engine)
+    model_size = model_size or config.LOCAL_WHISPER_MODEL
+    model = get_whisper_model(engine, model_size)
+
+    start = time.perf_counter()
+    if engine == "faster":
+        result = _transcribe_faster(model, audio_path)
+    else:
+        result = _transcribe_openai(model, audio_path)
+    elapsed = time.perf_counter() - start
+    # Long transcriptions must not leave the model looking idle to the memory governor
+    memory.touch(f"whisper:{engine}/{model_size}")
+
+    realtime_factor = elapsed / result["audio_seconds"] if result["audio_seconds"] else 0.0
+    LOCAL_WHISPER_REALTIME_FACTOR.labels(engine=engine).observe(realtime_factor)
+    result.update(
+        text=" ".join(segment["text"] for segment in result["segments"]),
+        engine=engine,
+        model=model_size,
+        seconds=round(elapsed, 2),
+        realtime_factor=round(realtime_factor, 4),
+    )
+    logger.info(
+        f"✓ Local Whisper ({engine}/{model_size}): {result['audio_seconds']:.0f}s audio, "
+        f"{result['speech_seconds']:.0f}s speech, language={result['language']}, task={result['task']}, "
+        f"RTF {result['realtime_factor']}"
+    )
+    return result
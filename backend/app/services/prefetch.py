@@ -0,0 +1,260 @@
+# app/services/prefetch.py
+"""
+Speculative ingestion of videos the extension has just checked.
+
+The extension calls `/check/{video_id}` when a video page opens, usually
+seconds before the first question. For an available video without an
+index, `/check` calls `schedule()` and a few prefetch workers fetch the
+transcript and build the index in the meantime.
+
+    - Bounded: at most PREFETCH_QUEUE_SIZE videos wait. The most recent
+      page view is served first, and the oldest waiting video is dropped
+      when the queue is full
+    - Behind real questions: a worker neither starts a video nor moves on
+      to the embedding step while a question-driven ingestion is running
+      (`question_ingestion()`). Whisper calls already go through the Groq
+      scheduler at BACKGROUND priority
+    - Stale work is cancelled: a video nobody asked about is dropped once its
+      last check is older than PREFETCH_TTL; a running one is abandoned
+      before its index build (the fetched transcript stays cached). Checks
+      by other users never make a video stale
+    - Captions only (PREFETCH_CAPTIONS_ONLY): speculative work never
+      downloads audio or spends Whisper time; videos without captions wait
+      for their first question
+    - The first question for a video claims it (`claim()`): a waiting entry
+      is taken off the queue, and a running one is awaited (`wait()`, on the
+      event loop) instead of ingesting the video twice
+
+Whether prefetch beat the first question is counted in
+klypse_prefetch_first_question_total.
+"""
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Optional
+
+from app.config import config
+from app.services.availability import invalidate
+from app.services.ingestion import ingest_video
+from app.utils.logger import get_logger
+from app.utils.metrics import PREFETCH_FIRST_QUESTION_TOTAL, PREFETCH_LEAD_SECONDS, PREFETCH_TOTAL
+
+logger = get_logger(__name__)
+
+# Prefetched videos remembered until their first question (older ones count as unused)
+MAX_REMEMBERED = 1024
+
+
+class PrefetchJob:
+    """One speculative ingestion; `done` is set when it finishes either way."""
+
+    def __init__(self, video_id: str):
+        self.video_id = video_id
+        self.checked_at = time.monotonic()
+        self.claimed = False  # A question is waiting for it: never cancel or pause
+        self.report = None
+        self.done = threading.Event()
+        self._waiters = []  # (loop, asyncio.Event) of questions awaiting the job
+
+    async def wait(self, timeout: float) -> bool:
+        """Wait on the event loop until the job finishes; False on timeout."""
+        waiter = (asyncio.get_running_loop(), asyncio.Event())
+        with _cond:
+            if self.done.is_set():
+                return True
+            self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter[1].wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            with _cond:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+
+    def _finish(self, report: dict):
+        """Publish the report and wake every waiter (caller holds _cond)."""
+        self.report = report
+        self.done.set()
+        for loop, event in self._waiters:
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                pass  # Loop already closed
+
+
+_cond = threading.Condition()
+_queue: "OrderedDict[str, PrefetchJob]" = OrderedDict()  # Waiting, oldest check first
+_running: dict = {}
+_prefetched: "OrderedDict[str, float]" = OrderedDict()  # video_id -> finished_at
+_questions_ingesting = 0
+_workers: list = []
+
+
+def _is_stale(job: PrefetchJob) -> bool:
+    return not job.claimed and time.monotonic() - job.checked_at > config.PREFETCH_TTL
+
+
+def _next_job() -> PrefetchJob:
+    """Block until a job may start (caller holds _cond); newest check first."""
+    while True:
+        for video_id, job in list(_queue.items()):
+            if _is_stale(job):
+                del _queue[video_id]
+                PREFETCH_TOTAL.labels(outcome="stale").inc()
+        if _queue and _questions_ingesting == 0:
+            video_id, job = _queue.popitem(last=True)
+            _running[video_id] = job
+            return job
+        _cond.wait(timeout=1.0)
+
+
+def _may_continue(job: PrefetchJob) -> bool:
+    """Before the index build: wait out question-driven ingestions, then check for staleness."""
+    with _cond:
+        while _questions_ingesting > 0 and not job.claimed and not _is_stale(job):
+            _cond.wait(timeout=1.0)
+        return not _is_stale(job)
+
+
+def _run(job: PrefetchJob):
+    report = {"status": "failed", "error": "prefetch worker error"}
+    try:
+        report = ingest_video(
+            job.video_id,
+            should_continue=lambda: _may_continue(job),
+            captions_only=config.PREFETCH_CAPTIONS_ONLY,
+        )
+    except Exception as e:
+        report["error"] = str(e)
+    finally:
+        with _cond:
+            _running.pop(job.video_id, None)
+            if report["status"] == "ingested" and not job.claimed:
+                _prefetched[job.video_id] = time.monotonic()
+                while len(_prefetched) > MAX_REMEMBERED:
+                    _prefetched.popitem(last=False)
+                    PREFETCH_TOTAL.labels(outcome="unused").inc()
+            job._finish(report)
+
+    PREFETCH_TOTAL.labels(outcome=report["status"]).inc()
+    if report["status"] == "failed":
+        # The probe said "available" but ingestion disagrees; re-probe next time
+        invalidate(job.video_id)
+        logger.warning(f"✗ Prefetch failed for {job.video_id}: {report.get('error')}")
+    else:
+        logger.info(f"Prefetch {job.video_id}: {report['status']} in {report.get('seconds', 0.0):.1f}s")
+
+
+def _worker():
+    while True:
+        with _cond:
+            job = _next_job()
+        _run(job)
+
+
+def _ensure_workers():
+    """Start the prefetch workers on first use (caller holds _cond)."""
+    while len(_workers) < config.PREFETCH_WORKERS:
+        thread = threading.Thread(target=_worker, name=f"prefetch-{len(_workers)}", daemon=True)
+        thread.start()
+        _workers.append(thread)
+
+
+def schedule(video_id: str, source: Optional[str] = None) -> Optional[str]:
+    """
+    Queue speculative ingestion of a video that was just checked.
+
+    A video that is already waiting moves to the front (it was viewed again).
+
+    Args:
+        video_id: Checked video
+        source: Availability source from the probe; "audio" (no captions)
+            is not prefetched with PREFETCH_CAPTIONS_ONLY
+
+    Returns:
+        "queued" or "running", or None if prefetch is disabled or skipped
+    """
+    if config.PREFETCH_WORKERS <= 0 or config.PREFETCH_QUEUE_SIZE <= 0:
+        return None
+    if source == "audio" and config.PREFETCH_CAPTIONS_ONLY:
+        return None
+
+    with _cond:
+        _ensure_workers()
+        if video_id in _running:
+            _running[video_id].checked_at = time.monotonic()
+            return "running"
+
+        job = _queue.pop(video_id, None)
+        if job is None:
+            job = PrefetchJob(video_id)
+            PREFETCH_TOTAL.labels(outcome="queued").inc()
+        job.checked_at = time.monotonic()
+        _queue[video_id] = job
+
+        while len(_queue) > config.PREFETCH_QUEUE_SIZE:
+            _queue.popitem(last=False)
+            PREFETCH_TOTAL.labels(outcome="dropped").inc()
+        _cond.notify()
+    return "queued"
+
+
+def claim(video_id: str) -> tuple[str, Optional[PrefetchJob]]:
+    """
+    Record a question for `video_id` and take over any prefetch of it.
+
+    Returns:
+        (state, job) where state is
+            "ready"    prefetch built the index before the first question
+            "running"  prefetch in progress: `await job.wait(...)` rather than ingest again
+            "queued"   not started yet: taken off the queue, the question ingests it
+            "none"     not prefetched (or not the first question); job is None
+    """
+    now = time.monotonic()
+    with _cond:
+        job = _running.get(video_id)
+        if job is not None:
+            job.claimed = True
+            _cond.notify_all()
+            state = "running"
+        elif _queue.pop(video_id, None) is not None:
+            state = "queued"
+        elif video_id in _prefetched:
+            PREFETCH_LEAD_SECONDS.observe(now - _prefetched.pop(video_id))
+            state = "ready"
+        else:
+            state = "none"
+
+    if state != "none":
+        PREFETCH_FIRST_QUESTION_TOTAL.labels(result=state).inc()
+        logger.info(f"First question for {video_id}: prefetch {state}")
+    return state, job
+
+
+@contextmanager
+def question_ingestion():
+    """Mark a question-driven ingestion as running; prefetch workers hold off meanwhile."""
+    global _questions_ingesting
+    with _cond:
+        _questions_ingesting += 1
+    try:
+        yield
+    finally:
+        with _cond:
+            _questions_ingesting -= 1
+            _cond.notify_all()
+
+
+def stats() -> dict:
+    with _cond:
+        return {
+            "queued": list(_queue),
+            "running": list(_running),
+            "prefetched_unasked": len(_prefetched),
+            "questions_ingesting": _questions_ingesting,
+            "workers": len(_workers),
+        }
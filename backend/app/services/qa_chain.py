@@ -2,26 +2,12 @@
 
 from langchain.chains import RetrievalQA
 from langchain.prompts import PromptTemplate
-import logging
 
-logger = logging.getLogger(__name__)
+from app.utils.logger import get_logger
 
-def create_qa_chain(llm, vectorstore):
-    """
-    Creates a LangChain RetrievalQA chain over a per-video FAISS vectorstore.
-
-    Retrieval Strategy:
-        - search_type: 'mmr' (Maximum Marginal Relevance)
-          Ensures retrieved chunks are both relevant AND diverse,
-          avoiding redundant context when multiple similar segments exist.
-        - k=3: Return top 3 chunks for answer generation
-        - fetch_k=10: Fetch 10 candidates before MMR re-ranking
+logger = get_logger(__name__)
 
-    Prompt:
-        Custom prompt enforces grounded, non-repetitive answers
-        anchored strictly to the video transcript context.
-    """
-    prompt_template = """You are an AI assistant analyzing a YouTube video transcript. Use the context below to answer the question accurately and concisely.
+QA_PROMPT_TEMPLATE = """You are an AI assistant analyzing a YouTube video transcript. Use the context below to answer the question accurately and concisely.
 
 Context from video transcript:
 {context}
@@ -38,21 +24,42 @@ IMPORTANT INSTRUCTIONS:
 
 Your Answer:"""
 
-    PROMPT = PromptTemplate(
-        template=prompt_template,
-        input_variables=["context", "question"]
-    )
+# Shared with the batch endpoint, which formats prompts itself instead of going through RetrievalQA
+QA_PROMPT = PromptTemplate(
+    template=QA_PROMPT_TEMPLATE,
+    input_variables=["context", "question"]
+)
+
+# MMR retrieval parameters used by every retriever over a per-video index
+RETRIEVAL_K = 3
+RETRIEVAL_FETCH_K = 10
 
+
+def create_qa_chain(llm, vectorstore):
+    """
+    Creates a LangChain RetrievalQA chain over a per-video FAISS vectorstore.
+
+    Retrieval Strategy:
+        - search_type: 'mmr' (Maximum Marginal Relevance)
+          Ensures retrieved chunks are both relevant AND diverse,
+          avoiding redundant context when multiple similar segments exist.
+        - k=3: Return top 3 chunks for answer generation
+        - fetch_k=10: Fetch 10 candidates before MMR re-ranking
+
+    Prompt:
+        Custom prompt enforces grounded, non-repetitive answers
+        anchored strictly to the video transcript context.
+    """
     return RetrievalQA.from_chain_type(
         llm=llm,
         chain_type="stuff",
         retriever=vectorstore.as_retriever(
             search_type="mmr",       # Maximum Marginal Relevance for diverse retrieval
             search_kwargs={
-                "k": 3,              # Return top 3 most relevant + diverse chunks
-                "fetch_k": 10        # Fetch 10 candidates, MMR re-ranks to top 3
+                "k": RETRIEVAL_K,              # Return top 3 most relevant + diverse chunks
+                "fetch_k": RETRIEVAL_FETCH_K   # Fetch 10 candidates, MMR re-ranks to top 3
             }
         ),
         return_source_documents=False,
-        chain_type_kwargs={"prompt": PROMPT}
+        chain_type_kwargs={"prompt": QA_PROMPT}
     )
@@ -0,0 +1,275 @@
+# app/services/summaries.py
+"""
+Hierarchical (map-reduce) video summaries.
+
+`/ask/stream` only ever sees RETRIEVAL_K chunks, which is the wrong tool for
+"summarize this video". Instead, a summary tree is built once per video:
+
+    level 0   one summary per transcript chunk        (map, concurrent)
+    level 1   one summary per SUMMARY_FANOUT chunks   (reduce: sections)
+    ...       repeated until a single root            (the video summary)
+
+The tree is persisted next to the video's index as SUMMARY.json, keyed by
+the transcript's sha256, so later `/summary` calls and broad "overview"
+questions are served from disk without any LLM call.
+"""
+import asyncio
+import hashlib
+import json
+import re
+import time
+from typing import List, Optional
+
+from langchain.prompts import PromptTemplate
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+from app.config import config
+from app.services.groq_scheduler import BACKGROUND, SchedulerBusy, get_scheduler
+from app.storage.atomic import atomic_write_json
+from app.storage.index_store import sidecar_path
+from app.storage.vector_store import clean_transcript
+from app.utils.logger import get_logger
+from app.utils.metrics import record_cache
+from app.utils.tracing import StageTimingCallback, stage
+
+logger = get_logger(__name__)
+
+SUMMARY_FILE = "SUMMARY.json"
+SUMMARY_FORMAT = 1
+
+MAP_PROMPT = PromptTemplate(
+    template="""You are summarizing part of a YouTube video transcript.
+
+Transcript excerpt:
+{text}
+
+Write a concise summary (3-5 sentences) of what is said in this excerpt. Keep names, numbers and key claims. Do not add information that is not in the excerpt.
+
+Summary:""",
+    input_variables=["text"]
+)
+
+REDUCE_PROMPT = PromptTemplate(
+    template="""Below are summaries of consecutive parts of a YouTube video, in order.
+
+{text}
+
+Combine them into one coherent summary of this portion of the video (at most {sentences} sentences). Keep the order of topics, avoid repetition, and do not add information that is not in the summaries.
+
+Summary:""",
+    input_variables=["text", "sentences"]
+)
+
+# Questions that ask about the whole video rather than a detail in it
+OVERVIEW_PATTERN = re.compile(
+    r"\b(summar(y|ise|ize|ized|ised)|overview|tl;?dr|gist|recap|main (points?|ideas?|topics?)|"
+    r"key (points?|takeaways?|ideas?)|what is (this|the) video about|what's (this|the) video about)\b",
+    re.IGNORECASE,
+)
+# Words that may surround the overview phrase without making it a question about a detail
+OVERVIEW_FILLER = frozenset(
+    "a an the this that it its of in on for me us please can could would you give provide write make "
+    "tell what whats what's is are was were do does be video clip whole entire overall quick short brief "
+    "few some simple sentences words bullet bullets list all so far".split()
+)
+
+_build_locks: dict = {}
+
+
+def transcript_digest(transcript: str) -> str:
+    return hashlib.sha256(transcript.encode("utf-8")).hexdigest()
+
+
+def load_summary_tree(video_id: str, transcript: Optional[str] = None) -> Optional[dict]:
+    """
+    Cached summary tree for `video_id`, or None.
+
+    If `transcript` is given, a tree built from a different transcript is ignored.
+    """
+    try:
+        with open(sidecar_path(video_id, SUMMARY_FILE), "r", encoding="utf-8") as f:
+            tree = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if tree.get("format") != SUMMARY_FORMAT:
+        return None
+    if transcript is not None and tree.get("transcript_sha256") != transcript_digest(transcript):
+        return None
+    return tree
+
+
+async def _summarize(llm, prompt: str, api_key: Optional[str], semaphore: asyncio.Semaphore) -> str:
+    """One LLM call through the Groq scheduler (background priority: /ask goes first)."""
+    scheduler = get_scheduler()
+    async with semaphore:
+        for attempt in range(config.SUMMARY_ADMIT_ATTEMPTS):
+            try:
+                ticket = scheduler.admit(BACKGROUND, api_key, est_tokens=config.SUMMARY_EST_TOKENS)[0]
+                break
+            except SchedulerBusy as e:
+                if attempt == config.SUMMARY_ADMIT_ATTEMPTS - 1:
+                    raise
+                await asyncio.sleep(e.retry_after)
+        try:
+            message = await scheduler.arun(
+                lambda: llm.ainvoke(prompt, config={"callbacks": [StageTimingCallback()]}),
+                ticket,
+            )
+        finally:
+            scheduler.release_unclaimed(ticket)
+    return str(getattr(message, "content", message)).strip()
+
+
+async def _reduce_level(llm, nodes: List[dict], api_key: Optional[str], semaphore: asyncio.Semaphore) -> List[dict]:
+    """Merge each run of SUMMARY_FANOUT nodes into one parent node."""
+    fanout = max(2, config.SUMMARY_FANOUT)
+    groups = [nodes[i:i + fanout] for i in range(0, len(nodes), fanout)]
+
+    async def reduce_group(group: List[dict]) -> str:
+        if len(group) == 1:
+            return group[0]["summary"]
+        text = "\n\n".join(f"Part {i + 1}: {node['summary']}" for i, node in enumerate(group))
+        prompt = REDUCE_PROMPT.format(text=text, sentences=config.SUMMARY_REDUCE_SENTENCES)
+        return await _summarize(llm, prompt, api_key, semaphore)
+
+    summaries = await asyncio.gather(*(reduce_group(group) for group in groups))
+    return [
+        {"start": group[0]["start"], "end": group[-1]["end"], "children": len(group), "summary": summary}
+        for group, summary in zip(groups, summaries)
+    ]
+
+
+async def build_summary_tree(llm, video_id: str, transcript: str, api_key: Optional[str] = None) -> dict:
+    """
+    Map-reduce `transcript` into a summary tree and persist it.
+
+    Args:
+        llm: Chat model (async `ainvoke`)
+        video_id: Video the transcript belongs to
+        transcript: Raw transcript text
+        api_key: Caller key (API key or client address), for per-caller Groq queue limits
+
+    Returns:
+        The tree: {"levels": [[chunk nodes], [section nodes], ..., [root]], ...}
+        where each node is {"start", "end", "summary"} with character offsets
+        into the cleaned transcript
+    """
+    cleaned = clean_transcript(transcript)
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=config.SUMMARY_CHUNK_CHARS,
+        chunk_overlap=0,
+        length_function=len,
+        add_start_index=True,
+    )
+    documents = splitter.create_documents([cleaned])
+    if not documents:
+        raise ValueError("Transcript is empty")
+
+    semaphore = asyncio.Semaphore(max(1, config.SUMMARY_CONCURRENCY))
+    start = time.perf_counter()
+
+    with stage("summary.map", video_id=video_id, chunks=len(documents)):
+        summaries = await asyncio.gather(*(
+            _summarize(llm, MAP_PROMPT.format(text=doc.page_content), api_key, semaphore)
+            for doc in documents
+        ))
+    level = [
+        {
+            "start": doc.metadata["start_index"],
+            "end": doc.metadata["start_index"] + len(doc.page_content),
+            "summary": summary,
+        }
+        for doc, summary in zip(documents, summaries)
+    ]
+    levels = [level]
+
+    with stage("summary.reduce", video_id=video_id):
+        while len(levels[-1]) > 1:
+            levels.append(await _reduce_level(llm, levels[-1], api_key, semaphore))
+
+    tree = {
+        "format": SUMMARY_FORMAT,
+        "video_id": video_id,
+        "transcript_sha256": transcript_digest(transcript),
+        "transcript_length": len(transcript),
+        "model": config.GROQ_MODEL,
+        "chunk_chars": config.SUMMARY_CHUNK_CHARS,
+        "fanout": config.SUMMARY_FANOUT,
+        "created_at": time.time(),
+        "build_seconds": round(time.perf_counter() - start, 2),
+        "levels": levels,
+    }
+    atomic_write_json(sidecar_path(video_id, SUMMARY_FILE), tree)
+    logger.info(
+        f"✓ Built summary tree for {video_id}: {len(documents)} chunks, "
+        f"{len(levels)} levels in {tree['build_seconds']}s"
+    )
+    return tree
+
+
+async def get_or_build_summary_tree(llm, video_id: str, transcript: str, api_key: Optional[str] = None) -> tuple[dict, bool]:
+    """
+    Cached tree if it matches `transcript`, otherwise build it.
+
+    Concurrent requests for the same video in this worker share one build.
+
+    Returns:
+        (tree, cached)
+    """
+    tree = load_summary_tree(video_id, transcript)
+    record_cache("summary", tree is not None)
+    if tree is not None:
+        return tree, True
+
+    lock = _build_locks.setdefault(video_id, asyncio.Lock())
+    async with lock:
+        tree = load_summary_tree(video_id, transcript)
+        if tree is not None:
+            return tree, True
+        try:
+            return await build_summary_tree(llm, video_id, transcript, api_key), False
+        finally:
+            _build_locks.pop(video_id, None)
+
+
+def root_summary(tree: dict) -> str:
+    return tree["levels"][-1][0]["summary"]
+
+
+def section_summaries(tree: dict) -> List[str]:
+    """Summaries one level below the root (the whole video if it had a single chunk)."""
+    levels = tree["levels"]
+    return [node["summary"] for node in levels[-2]] if len(levels) > 1 else []
+
+
+def is_overview_question(question: str) -> bool:
+    """
+    Bare overview requests only ("summarize this video", "what are the key points?").
+
+    "key points about battery life" names a topic beyond the overview phrase,
+    so it goes to retrieval instead of getting the whole-video summary.
+    """
+    if not OVERVIEW_PATTERN.search(question):
+        return False
+    rest = re.findall(r"[a-z']+", OVERVIEW_PATTERN.sub(" ", question).lower())
+    return all(word in OVERVIEW_FILLER for word in rest)
+
+
+def cached_overview_answer(video_id: str, question: str) -> Optional[str]:
+    """
+    Answer a broad "summarize / overview / key points" question from the cached tree.
+
+    Returns None (use RetrievalQA) for detail questions or when no tree exists yet;
+    the ask path never triggers a build.
+    """
+    if not is_overview_question(question):
+        return None
+    tree = load_summary_tree(video_id)
+    record_cache("summary_overview", tree is not None)
+    if tree is None:
+        return None
+    answer = root_summary(tree)
+    sections = section_summaries(tree)
+    if sections and re.search(r"\b(points?|takeaways?|topics?|ideas?)\b", question, re.IGNORECASE):
+        answer += "\n" + "\n".join(f"• {section}" for section in sections)
+    return answer
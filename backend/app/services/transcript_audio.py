@@ -1,6 +1,4 @@
-import whisper
+def transcribe_audio(audio_path, model_size=None):
+    from app.services.local_whisper import transcribe_local
 
-def transcribe_audio(audio_path, model_size="base"):
-    model = whisper.load_model(model_size)
-    result = model.transcribe(audio_path)
-    return result["text"]
+    return transcribe_local(audio_path, model_size=model_size)["text"]
@@ -1,13 +1,20 @@
 import os
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+from typing import Optional
 from youtube_transcript_api import YouTubeTranscriptApi, _errors
 from app.storage.cache import save_transcript, load_transcript
 from app.storage.vector_store import add_to_vectorstore
 from app.services.processing import chunk_text, clean_text
+from app.services.audio_utils import DownloadCancelled, downloaded_audio, upload_filename
 from app.utils.logger import get_logger
-import yt_dlp
-from groq import Groq
+from app.utils.metrics import TRANSCRIPT_HEDGE_TOTAL, record_cache, record_transcript_tier
+from app.utils.tracing import stage
+from app.services.groq_scheduler import BACKGROUND, get_groq_client, get_scheduler
+from app.services.local_whisper import transcribe_local
 from app.config import config
-import whisper
 
 logger = get_logger(__name__)
 
@@ -15,114 +22,241 @@ class TranscriptError(Exception):
     """Custom exception for transcript errors"""
     pass
 
-def download_audio(video_url: str, output_dir: str = "./data/audio") -> str:
-    os.makedirs(output_dir, exist_ok=True)
-    ydl_opts = {
-        'format': 'bestaudio/best',
-        'outtmpl': f'{output_dir}/%(id)s.%(ext)s',
-        'postprocessors': [{
-            'key': 'FFmpegExtractAudio',
-            'preferredcodec': 'mp3',
-            'preferredquality': '128',
-        }],
-        'quiet': True,
-        'no_warnings': True,
-    }
-    
-    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-        info = ydl.extract_info(video_url, download=True)
-        audio_path = os.path.join(output_dir, f"{info['id']}.mp3")
-        logger.info(f"✓ Downloaded audio: {audio_path}")
-        return audio_path
-
 def transcribe_with_groq(audio_path: str) -> str:
-    client = Groq(api_key=config.GROQ_API_KEY)
+    client = get_groq_client()
     with open(audio_path, "rb") as file:
-        transcription = client.audio.transcriptions.create(
-            file=(os.path.basename(audio_path), file.read()),
+        audio_bytes = file.read()
+    # Background priority: queued interactive answers go first
+    transcription = get_scheduler().call(
+        lambda: client.audio.transcriptions.create(
+            file=(upload_filename(audio_path), audio_bytes),
             model="whisper-large-v3",
             response_format="text",
             temperature=0.0,
-        )
+        ),
+        priority=BACKGROUND,
+        group="audio",
+    )
     logger.info("✓ Groq transcription complete")
     return transcription
 
-def transcribe_with_local_whisper(audio_path, model_size="base"):
-    model = whisper.load_model(model_size)
-    # Force English translation for non-English audio
-    result = model.transcribe(audio_path, task="translate")
-    print("[DEBUG] Whisper transcript after translation:", result["text"][:200])
-    return result["text"]
+def _transcribe_downloaded_audio(video_id: str, audio_path: str) -> str:
+    """Tiers 2 and 3: Groq Whisper for small files, local Whisper otherwise."""
+    file_size_mb = os.path.getsize(audio_path) / (1024 * 1024)
+    logger.info(f"Audio file size: {file_size_mb:.2f} MB")
+    
+    if file_size_mb <= 24:
+        start = time.perf_counter()
+        try:
+            with stage("transcript.groq_whisper", video_id=video_id, size_mb=f"{file_size_mb:.2f}"):
+                grq_txt = transcribe_with_groq(audio_path)
+            # FIXED: Clean after Groq transcription
+            grq_txt = clean_text(grq_txt)
+            save_transcript(video_id, grq_txt)
+            record_transcript_tier("groq_whisper", "success", time.perf_counter() - start)
+            return grq_txt
+        except Exception as groq_error:
+            record_transcript_tier("groq_whisper", "error", time.perf_counter() - start)
+            logger.warning(f"Groq failed: {str(groq_error)}")
+    else:
+        record_transcript_tier("groq_whisper", "skipped")
+        logger.warning("Audio file too large for Groq fallback; trying local Whisper")
+    
+    # Step 4: Local Whisper fallback (any file size)
+    start = time.perf_counter()
+    with stage("transcript.local_whisper", video_id=video_id, size_mb=f"{file_size_mb:.2f}"):
+        result = transcribe_local(audio_path)
+    w_txt = result["text"]
+    # FIXED: Clean after Whisper transcription
+    w_txt = clean_text(w_txt)
+    save_transcript(video_id, w_txt)
+    record_transcript_tier("local_whisper", "success", time.perf_counter() - start)
+    return w_txt
+
+FIXTURE_AUDIO_EXTENSIONS = (".opus", ".ogg", ".mp3", ".m4a", ".wav")
+
+def _fixture_transcript(video_id: str) -> str:
+    """
+    Load-test stand-in for YouTube (TRANSCRIPT_FIXTURE_DIR).
+
+    Looks for {video_id}.txt, then an audio file for the Groq Whisper tier,
+    then the same names for "default".
+    """
+    time.sleep(config.TRANSCRIPT_FIXTURE_LATENCY)
+    for name in (video_id, "default"):
+        text_path = os.path.join(config.TRANSCRIPT_FIXTURE_DIR, f"{name}.txt")
+        if os.path.exists(text_path):
+            with open(text_path, "r", encoding="utf-8") as f:
+                transcript_text = clean_text(f.read())
+            save_transcript(video_id, transcript_text)
+            record_transcript_tier("fixture", "success")
+            return transcript_text
+        for ext in FIXTURE_AUDIO_EXTENSIONS:
+            audio_path = os.path.join(config.TRANSCRIPT_FIXTURE_DIR, f"{name}{ext}")
+            if os.path.exists(audio_path):
+                return _transcribe_downloaded_audio(video_id, audio_path)
+    record_transcript_tier("fixture", "empty")
+    raise TranscriptError(f"No fixture transcript or audio for {video_id}")
 
-def get_transcript(video_id: str, video_url: str = None):
+def get_transcript(video_id: str, video_url: str = None, captions_only: bool = False):
     # Step 1: Try transcript cache
-    cached = load_transcript(video_id)
+    with stage("transcript.cache", video_id=video_id):
+        cached = load_transcript(video_id)
+    record_cache("transcript", bool(cached))
     if cached:
         logger.info(f"✓ Using cached transcript for: {video_id}")
         return cached
     
-    # Step 2: Try all likely transcript languages
-    languages = [
-        'en', 'hi', 'es', 'fr', 'de', 'ru', 'ar', 'bn', 'id', 'auto'
-    ]
+    if config.TRANSCRIPT_FIXTURE_DIR:
+        with stage("transcript.fixture", video_id=video_id):
+            return _fixture_transcript(video_id)
     
-    for lang in languages:
-        try:
-            logger.info(f"Trying transcript for language: {lang}")
-            transcript_data = YouTubeTranscriptApi().fetch(video_id, languages=[lang])
-            transcript_data = transcript_data.to_raw_data()
-            transcript_text = " ".join([entry['text'] for entry in transcript_data])
-            
-            # FIXED: Clean transcript immediately after fetching
-            transcript_text = clean_text(transcript_text)
-            
-            save_transcript(video_id, transcript_text)
-            logger.info(f"✓ Got transcript ({lang}, {len(transcript_text)} chars)")
-            return transcript_text
-        
-        except _errors.NoTranscriptFound as e:
-            logger.info(f"✗ No transcript in {lang}: {str(e)}")
-        except Exception as e:
-            logger.info(f"✗ Other error for lang {lang}: {str(e)}")
-            continue
+    if captions_only:
+        # Speculative callers: never download audio or spend Whisper time
+        transcript_text = _fetch_captions(video_id)
+        if not transcript_text:
+            raise TranscriptError(f"No captions for {video_id} (audio tiers skipped)")
+        return transcript_text
+    
+    if not video_url:
+        video_url = f"https://www.youtube.com/watch?v={video_id}"
+    
+    if config.TRANSCRIPT_HEDGE_DELAY >= 0:
+        return _hedged_transcript(video_id, video_url)
+    
+    # Step 2: Try all likely transcript languages
+    transcript_text = _fetch_captions(video_id)
+    if transcript_text:
+        return transcript_text
     
     # Step 3: Groq fallback for short videos only (<25MB audio)
     logger.info("No transcript found for any language. Trying Groq Whisper API...")
+    tier = "audio"
     try:
-        if not video_url:
-            video_url = f"https://www.youtube.com/watch?v={video_id}"
-        
-        audio_path = download_audio(video_url)
-        file_size_mb = os.path.getsize(audio_path) / (1024 * 1024)
-        logger.info(f"Audio file size: {file_size_mb:.2f} MB")
+        # The temp directory (including partial downloads) is removed on every exit path
+        with _timed_download(video_url) as audio_path:
+            tier = "local_whisper"  # Groq Whisper errors fall through to local Whisper
+            return _transcribe_downloaded_audio(video_id, audio_path)
         
-        if file_size_mb <= 24:
+    except Exception as whisper_error:
+        raise _all_tiers_failed(whisper_error, tier)
+
+CAPTION_LANGUAGES = [
+    'en', 'hi', 'es', 'fr', 'de', 'ru', 'ar', 'bn', 'id', 'auto'
+]
+
+def _fetch_captions(video_id: str) -> Optional[str]:
+    """Tier 1: YouTube captions, trying CAPTION_LANGUAGES in order. None if there are none."""
+    start = time.perf_counter()
+    with stage("transcript.captions", video_id=video_id):
+        for lang in CAPTION_LANGUAGES:
             try:
-                grq_txt = transcribe_with_groq(audio_path)
-                # FIXED: Clean after Groq transcription
-                grq_txt = clean_text(grq_txt)
-                save_transcript(video_id, grq_txt)
-                os.remove(audio_path)
-                return grq_txt
-            except Exception as groq_error:
-                logger.warning(f"Groq failed: {str(groq_error)}")
-        else:
-            logger.warning("Audio file too large for Groq fallback; trying local Whisper")
-        
-        # Step 4: Local Whisper fallback (any file size)
-        w_txt = transcribe_with_local_whisper(audio_path)
-        # FIXED: Clean after Whisper transcription
-        w_txt = clean_text(w_txt)
-        save_transcript(video_id, w_txt)
-        os.remove(audio_path)
-        return w_txt
-        
+                logger.info(f"Trying transcript for language: {lang}", extra={"log_key": "captions.lang"})
+                transcript_data = YouTubeTranscriptApi().fetch(video_id, languages=[lang])
+                transcript_data = transcript_data.to_raw_data()
+                transcript_text = " ".join([entry['text'] for entry in transcript_data])
+                
+                # FIXED: Clean transcript immediately after fetching
+                transcript_text = clean_text(transcript_text)
+                
+                save_transcript(video_id, transcript_text)
+                logger.info(f"✓ Got transcript ({lang}, {len(transcript_text)} chars)")
+                record_transcript_tier("captions", "success", time.perf_counter() - start)
+                return transcript_text
+            
+            except _errors.NoTranscriptFound as e:
+                logger.info(f"✗ No transcript in {lang}: {str(e)}", extra={"log_key": "captions.lang"})
+            except Exception as e:
+                logger.info(f"✗ Other error for lang {lang}: {str(e)}", extra={"log_key": "captions.lang"})
+                continue
+    record_transcript_tier("captions", "empty", time.perf_counter() - start)
+    return None
+
+@contextmanager
+def _timed_download(video_url: str, cancel: threading.Event = None):
+    """downloaded_audio() that records the download as the "audio" tier (success / cancelled)."""
+    start = time.perf_counter()
+    downloaded = False
+    try:
+        with downloaded_audio(video_url, cancel=cancel) as audio_path:
+            downloaded = True
+            record_transcript_tier("audio", "success", time.perf_counter() - start)
+            yield audio_path
+    except DownloadCancelled:
+        if not downloaded:
+            record_transcript_tier("audio", "cancelled", time.perf_counter() - start)
+        raise
+
+def _all_tiers_failed(error: Exception, tier: str) -> TranscriptError:
+    # Download ("audio") or local Whisper failed — no tier left to try
+    record_transcript_tier(tier, "error")
+    logger.error(f"All approaches failed: {str(error)}")
+    return TranscriptError(
+        "No transcript could be retrieved for this video (even with local Whisper fallback). "
+        "This may be a platform restriction or severe audio download error. Contact admin if this is unexpected."
+    )
+
+def _hedged_transcript(video_id: str, video_url: str) -> str:
+    """
+    Captions and audio raced instead of serialized.
+
+    Caption discovery runs here; if it hasn't finished after
+    TRANSCRIPT_HEDGE_DELAY seconds, a background thread starts downloading the
+    audio speculatively. Captions that succeed win: the download is cancelled
+    (its temp directory removed) and nothing is transcribed. If captions come
+    up empty, the download already in flight feeds the Whisper tiers. The
+    audio is only transcribed once captions have failed, so a hedge never
+    spends Groq quota or local Whisper time on a video that has captions.
+    """
+    captions_done = threading.Event()
+    cancel = threading.Event()
+    state = {"captions": None, "download_started": False, "tier": "audio"}
+    audio_result = Future()
+
+    def audio_tier():
+        try:
+            # Captions that finish within the delay (either way) decide without a download
+            if captions_done.wait(config.TRANSCRIPT_HEDGE_DELAY) and state["captions"]:
+                audio_result.set_result(None)
+                return
+            state["download_started"] = True
+            with stage("transcript.hedge_audio", video_id=video_id):
+                with _timed_download(video_url, cancel=cancel) as audio_path:
+                    captions_done.wait()
+                    if state["captions"]:
+                        # Captions won while downloading; the temp directory goes with the context
+                        audio_result.set_result(None)
+                        return
+                    state["tier"] = "local_whisper"
+                    audio_result.set_result(_transcribe_downloaded_audio(video_id, audio_path))
+        except DownloadCancelled:
+            audio_result.set_result(None)
+        except Exception as e:
+            audio_result.set_exception(e)
+
+    threading.Thread(target=audio_tier, name=f"hedge-audio-{video_id}", daemon=True).start()
+
+    try:
+        state["captions"] = _fetch_captions(video_id)
+    finally:
+        if state["captions"]:
+            cancel.set()
+        captions_done.set()
+
+    if state["captions"]:
+        result = "captions_won" if state["download_started"] else "captions_before_hedge"
+        TRANSCRIPT_HEDGE_TOTAL.labels(result=result).inc()
+        return state["captions"]
+
+    TRANSCRIPT_HEDGE_TOTAL.labels(result="audio").inc()
+    logger.info("No transcript found for any language. Using the speculative audio download...")
+    try:
+        transcript_text = audio_result.result()
     except Exception as whisper_error:
-        logger.error(f"All approaches failed: {str(whisper_error)}")
-        raise TranscriptError(
-            "No transcript could be retrieved for this video (even with local Whisper fallback). "
-            "This may be a platform restriction or severe audio download error. Contact admin if this is unexpected."
-        )
+        raise _all_tiers_failed(whisper_error, state["tier"])
+    if not transcript_text:
+        raise _all_tiers_failed(RuntimeError("audio download was cancelled"), "audio")
+    return transcript_text
 
 def process_video(video_id: str, video_url: str = None) -> dict:
     logger.info(f"Starting video processing for: {video_id}")
@@ -130,7 +264,7 @@ def process_video(video_id: str, video_url: str = None) -> dict:
     cleaned = clean_text(transcript)
     chunks = chunk_text(cleaned, chunk_size=500)
     add_to_vectorstore(chunks, video_id=video_id)
-    logger.info(f"✓ Processed {len(chunks)} chunks into video-specific vector store")
+    logger.info(f"✓ Processed {len(chunks)} chunks into the global vector store")
     
     return {
         "video_id": video_id,
@@ -1,5 +1,7 @@
+import json
 import re
-from typing import Optional
+from typing import List, Optional
+from urllib.parse import parse_qs, urlparse
 
 def extract_video_id(video_input: str) -> Optional[str]:
     """
@@ -23,4 +25,56 @@ def extract_video_id(video_input: str) -> Optional[str]:
     return None
 
 def is_valid_video_id(video_id: str) -> bool:
-    return bool(re.fullmatch(r'[A-Za-z0-9_-]{11}', video_id))
\ No newline at end of file
+    return bool(re.fullmatch(r'[A-Za-z0-9_-]{11}', video_id))
+
+YOUTUBE_HOSTS = {"youtube.com", "www.youtube.com", "m.youtube.com", "music.youtube.com"}
+
+def is_youtube_playlist_url(url: str) -> bool:
+    """An http(s) YouTube URL carrying a `list=` playlist ID."""
+    parsed = urlparse(url.strip())
+    if parsed.scheme not in ("http", "https") or (parsed.hostname or "").lower() not in YOUTUBE_HOSTS:
+        return False
+    playlist_ids = parse_qs(parsed.query).get("list", [])
+    return bool(playlist_ids) and bool(re.fullmatch(r'[A-Za-z0-9_-]+', playlist_ids[0]))
+
+def _entry_video_ids(entries) -> List[str]:
+    video_ids = []
+    for entry in entries:
+        candidate = (entry.get("id") or entry.get("url", "")) if isinstance(entry, dict) else str(entry)
+        video_id = extract_video_id(candidate) if candidate else None
+        if video_id:
+            video_ids.append(video_id)
+    return video_ids
+
+def list_playlist_video_ids(playlist_url: str) -> List[str]:
+    """
+    Resolve a YouTube playlist URL to its video IDs (listed with yt-dlp
+    without downloading anything).
+
+    Only YouTube playlist URLs are accepted, since the URL may come straight
+    from an HTTP request; local fixture files go through `read_playlist_fixture`.
+    """
+    if not is_youtube_playlist_url(playlist_url):
+        raise ValueError("Not a YouTube playlist URL")
+
+    import yt_dlp
+
+    ydl_opts = {'extract_flat': 'in_playlist', 'quiet': True, 'no_warnings': True}
+    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+        info = ydl.extract_info(playlist_url, download=False)
+    return _entry_video_ids(info.get("entries") or [])
+
+def read_playlist_fixture(path: str) -> List[str]:
+    """
+    Video IDs from a local playlist fixture (CLI and tests only).
+
+    Fixtures may be yt-dlp's flat-playlist JSON (`{"entries": [{"id": ...}, ...]}`),
+    a JSON list of IDs/URLs, or a text file with one ID/URL per line.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        raw = f.read()
+    try:
+        data = json.loads(raw)
+    except json.JSONDecodeError:
+        data = [line.strip() for line in raw.splitlines() if line.strip() and not line.startswith("#")]
+    return _entry_video_ids(data.get("entries", []) if isinstance(data, dict) else data)
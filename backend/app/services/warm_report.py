@@ -0,0 +1,26 @@
+# app/services/warm_report.py
+"""
+Throughput summary of a warm-up run.
+
+Kept free of the ingestion stack (LangChain, FAISS, embeddings) so the
+dispatcher can summarize merged /warm streams without importing it.
+"""
+
+
+def summarize_warm_run(reports: list[dict], elapsed: float) -> dict:
+    """Throughput summary for a batch of ingestion reports."""
+    ingested = [r for r in reports if r["status"] == "ingested"]
+    deduplicated = sum(1 for r in ingested if r.get("deduplicated_from"))
+    chars = sum(r["transcript_length"] for r in ingested)
+    return {
+        "total": len(reports),
+        "ingested": len(ingested),
+        "deduplicated": deduplicated,
+        "dedup_ratio": round(deduplicated / len(ingested), 4) if ingested else 0.0,
+        "skipped": sum(1 for r in reports if r["status"] == "skipped"),
+        "failed": sum(1 for r in reports if r["status"] == "failed"),
+        "elapsed_seconds": round(elapsed, 2),
+        "videos_per_minute": round(len(ingested) / elapsed * 60, 2) if elapsed > 0 else 0.0,
+        "transcript_chars_per_second": round(chars / elapsed, 1) if elapsed > 0 else 0.0,
+        "mean_ingest_seconds": round(sum(r["seconds"] for r in ingested) / len(ingested), 2) if ingested else 0.0,
+    }
@@ -0,0 +1,326 @@
+# app/storage/artifacts.py
+"""
+Shared artifact store for transcripts and per-video index bundles.
+
+Local disk (CACHE_PATH, ./data/faiss) stays the node-local read-through
+cache; the artifact store is the shared copy, so a video ingested on one node
+is fetched by the others instead of being transcribed and embedded again.
+
+Layout (same for every backend):
+
+    blobs/sha256/ab/abcdef...          content-addressed, immutable
+    refs/transcripts/{video_id}.json   -> {"sha256": ..., "size": ...}
+    refs/indexes/{video_id}.json       -> index MANIFEST.json (files -> sha256),
+                                          or an alias manifest ({"alias_of": ...})
+
+Blobs are written before the ref that points at them, and every fetched blob
+is verified against its hash, so a reader never trusts a partial upload.
+
+Backends (ARTIFACT_STORE):
+    ""      disabled (single node)
+    "local" a directory, e.g. a shared NFS mount (ARTIFACT_STORE_PATH)
+    "s3"    any S3-compatible service: AWS S3, MinIO, R2... (ARTIFACT_S3_*)
+"""
+import abc
+import hashlib
+import json
+import os
+import threading
+from typing import Optional
+
+from app.config import config
+from app.storage.atomic import atomic_write_bytes
+from app.storage.index_store import index_version, publish_alias, publish_index
+from app.utils.logger import get_logger
+from app.utils.metrics import record_cache
+from app.utils.tracing import stage
+
+logger = get_logger(__name__)
+
+
+class ArtifactError(Exception):
+    """Raised when a fetched artifact is missing or fails verification."""
+
+
+def sha256_hex(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _blob_key(digest: str) -> str:
+    return f"blobs/sha256/{digest[:2]}/{digest}"
+
+
+def _ref_key(kind: str, name: str) -> str:
+    return f"refs/{kind}/{name}.json"
+
+
+class ArtifactStore(abc.ABC):
+    """
+    Key/value backend plus the content-addressing on top of it.
+
+    Backends implement `_read`, `_write` and `_exists`; everything else is shared.
+    """
+
+    name = "base"
+
+    @abc.abstractmethod
+    def _read(self, key: str) -> Optional[bytes]:
+        """Bytes stored under `key`, or None if there are none."""
+
+    @abc.abstractmethod
+    def _write(self, key: str, data: bytes):
+        """Store `data` under `key`, atomically replacing any previous value."""
+
+    @abc.abstractmethod
+    def _exists(self, key: str) -> bool:
+        """Whether `key` exists, without reading it."""
+
+    def put_blob(self, data: bytes, digest: Optional[str] = None) -> str:
+        """Store `data` under its sha256 (no-op if already present) and return the digest."""
+        digest = digest or sha256_hex(data)
+        key = _blob_key(digest)
+        if not self._exists(key):
+            self._write(key, data)
+        return digest
+
+    def get_blob(self, digest: str) -> bytes:
+        data = self._read(_blob_key(digest))
+        if data is None:
+            raise ArtifactError(f"Missing blob {digest}")
+        if sha256_hex(data) != digest:
+            raise ArtifactError(f"Blob {digest} failed hash verification")
+        return data
+
+    def put_ref(self, kind: str, name: str, ref: dict):
+        self._write(_ref_key(kind, name), json.dumps(ref, sort_keys=True).encode("utf-8"))
+
+    def get_ref(self, kind: str, name: str) -> Optional[dict]:
+        data = self._read(_ref_key(kind, name))
+        return json.loads(data) if data is not None else None
+
+    def has_ref(self, kind: str, name: str) -> bool:
+        return self._exists(_ref_key(kind, name))
+
+
+class LocalArtifactStore(ArtifactStore):
+    """Directory backend; point several nodes at one shared mount."""
+
+    name = "local"
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, *key.split("/"))
+
+    def _read(self, key: str) -> Optional[bytes]:
+        try:
+            with open(self._path(key), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def _write(self, key: str, data: bytes):
+        atomic_write_bytes(self._path(key), data)
+
+    def _exists(self, key: str) -> bool:
+        return os.path.exists(self._path(key))
+
+
+class S3ArtifactStore(ArtifactStore):
+    """S3-compatible backend (set ARTIFACT_S3_ENDPOINT_URL for MinIO and friends)."""
+
+    name = "s3"
+
+    def __init__(self, bucket: str, prefix: str = "", endpoint_url: Optional[str] = None):
+        import boto3
+        from botocore.exceptions import ClientError
+
+        self.bucket = bucket
+        self.prefix = prefix.strip("/")
+        self._client = boto3.client("s3", endpoint_url=endpoint_url or None)
+        self._client_error = ClientError
+
+    def _key(self, key: str) -> str:
+        return f"{self.prefix}/{key}" if self.prefix else key
+
+    def _is_missing(self, e) -> bool:
+        return e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound")
+
+    def _read(self, key: str) -> Optional[bytes]:
+        try:
+            response = self._client.get_object(Bucket=self.bucket, Key=self._key(key))
+        except self._client_error as e:
+            if self._is_missing(e):
+                return None
+            raise
+        return response["Body"].read()
+
+    def _write(self, key: str, data: bytes):
+        # Single PUTs are atomic in S3: readers see the old object or the new one
+        self._client.put_object(Bucket=self.bucket, Key=self._key(key), Body=data)
+
+    def _exists(self, key: str) -> bool:
+        try:
+            self._client.head_object(Bucket=self.bucket, Key=self._key(key))
+            return True
+        except self._client_error as e:
+            if self._is_missing(e):
+                return False
+            raise
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_artifact_store() -> Optional[ArtifactStore]:
+    """Configured shared store, or None when ARTIFACT_STORE is empty."""
+    global _store
+    backend = config.ARTIFACT_STORE.lower()
+    if not backend:
+        return None
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                if backend == "local":
+                    _store = LocalArtifactStore(config.ARTIFACT_STORE_PATH)
+                elif backend == "s3":
+                    _store = S3ArtifactStore(
+                        config.ARTIFACT_S3_BUCKET,
+                        prefix=config.ARTIFACT_S3_PREFIX,
+                        endpoint_url=config.ARTIFACT_S3_ENDPOINT_URL,
+                    )
+                else:
+                    raise ValueError(f"Unknown ARTIFACT_STORE backend: {config.ARTIFACT_STORE}")
+                logger.info(f"✓ Artifact store: {_store.name}")
+    return _store
+
+
+# ---- TRANSCRIPTS ----
+
+def publish_transcript(video_id: str, transcript: str):
+    """Upload a transcript to the shared store. Failures are logged, not raised."""
+    store = get_artifact_store()
+    if store is None:
+        return
+    data = transcript.encode("utf-8")
+    try:
+        with stage("artifact.put_transcript", video_id=video_id, backend=store.name):
+            digest = store.put_blob(data)
+            store.put_ref("transcripts", video_id, {"sha256": digest, "size": len(data)})
+    except Exception as e:
+        logger.warning(f"✗ Could not publish transcript for {video_id}: {str(e)}")
+
+
+def fetch_transcript(video_id: str) -> Optional[str]:
+    """Transcript from the shared store, or None (missing, disabled or unreachable)."""
+    store = get_artifact_store()
+    if store is None:
+        return None
+    try:
+        with stage("artifact.get_transcript", video_id=video_id, backend=store.name):
+            ref = store.get_ref("transcripts", video_id)
+            transcript = store.get_blob(ref["sha256"]).decode("utf-8") if ref else None
+    except Exception as e:
+        logger.warning(f"✗ Could not fetch transcript for {video_id}: {str(e)}")
+        transcript = None
+    record_cache("artifact_transcript", transcript is not None)
+    return transcript
+
+
+# ---- INDEX BUNDLES ----
+
+def publish_index_bundle(video_id: str, index_path: str, manifest: dict):
+    """
+    Upload the files of a published index version plus its manifest.
+
+    The manifest's per-file sha256 values double as blob keys, so re-uploading
+    an identical index moves no data.
+    """
+    store = get_artifact_store()
+    if store is None:
+        return
+    try:
+        with stage("artifact.put_index", video_id=video_id, backend=store.name):
+            for name, digest in manifest["files"].items():
+                with open(os.path.join(index_path, name), "rb") as f:
+                    store.put_blob(f.read(), digest=digest)
+            store.put_ref("indexes", video_id, manifest)
+    except Exception as e:
+        logger.warning(f"✗ Could not publish index for {video_id}: {str(e)}")
+
+
+def publish_index_alias(video_id: str, manifest: dict):
+    """Upload an alias manifest, so other nodes reuse the target's index too. Failures are logged, not raised."""
+    store = get_artifact_store()
+    if store is None:
+        return
+    try:
+        with stage("artifact.put_alias", video_id=video_id, backend=store.name):
+            store.put_ref("indexes", video_id, manifest)
+    except Exception as e:
+        logger.warning(f"✗ Could not publish alias for {video_id}: {str(e)}")
+
+
+def _install_bundle(store: ArtifactStore, video_id: str, remote: dict):
+    """Download the files of a remote index manifest and publish them locally."""
+    blobs = {name: store.get_blob(digest) for name, digest in remote["files"].items()}
+
+    def write(tmp_dir: str):
+        for name, data in blobs.items():
+            with open(os.path.join(tmp_dir, name), "wb") as f:
+                f.write(data)
+
+    # publish_index overwrites version/path/files with the local values
+    metadata = {**remote, "source": {"artifact_store": store.name, "version": remote.get("version")}}
+    publish_index(video_id, write, metadata)
+
+
+def fetch_index_bundle(video_id: str) -> bool:
+    """
+    Download the shared index for `video_id` and publish it locally.
+
+    A shared alias is recreated locally, after fetching its target's index
+    if this node does not have it yet.
+
+    Returns:
+        True if a verified index (or alias and target) is now available locally
+    """
+    store = get_artifact_store()
+    if store is None:
+        return False
+    try:
+        with stage("artifact.get_index", video_id=video_id, backend=store.name):
+            remote = store.get_ref("indexes", video_id)
+            if remote is None:
+                found = False
+            elif remote.get("alias_of"):
+                target = remote["alias_of"]
+                if index_version(target) is None:
+                    target_ref = store.get_ref("indexes", target)
+                    if target_ref is None or target_ref.get("alias_of"):
+                        raise ArtifactError(f"Alias target {target} has no shared index")
+                    _install_bundle(store, target, target_ref)
+                publish_alias(video_id, target, {**remote, "source": {"artifact_store": store.name}})
+                found = True
+            else:
+                _install_bundle(store, video_id, remote)
+                found = True
+    except Exception as e:
+        logger.warning(f"✗ Could not fetch index for {video_id}: {str(e)}")
+        found = False
+    record_cache("artifact_index", found)
+    return found
+
+
+def has_remote_transcript(video_id: str) -> bool:
+    """Cheap existence check (one HEAD / stat) for `/check`."""
+    store = get_artifact_store()
+    if store is None:
+        return False
+    try:
+        return store.has_ref("transcripts", video_id) or store.has_ref("indexes", video_id)
+    except Exception as e:
+        logger.warning(f"✗ Artifact store unreachable: {str(e)}")
+        return False
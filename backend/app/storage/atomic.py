@@ -0,0 +1,81 @@
+# app/storage/atomic.py
+"""
+Crash-safe file primitives shared by the storage layer.
+
+    - atomic_write_text / atomic_write_json: write to a temp file in the same
+      directory, fsync, then os.replace() over the target. Readers see either
+      the old or the new content, never a partial file.
+    - fsync_tree: flush every file in a freshly written directory (and the
+      directory entries) before it is renamed into place.
+    - file_lock: cross-process reader/writer lock on ./data/locks/<name>.lock
+      (fcntl.flock), so several uvicorn workers can share ./data safely.
+"""
+import fcntl
+import json
+import os
+import tempfile
+from contextlib import contextmanager
+
+LOCK_DIR = "./data/locks"
+
+
+def fsync_dir(path: str):
+    """Persist directory entries (renames, creates) for `path`."""
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def fsync_tree(path: str):
+    """fsync every regular file under `path`, then the directories themselves."""
+    for root, dirs, files in os.walk(path):
+        for name in files:
+            with open(os.path.join(root, name), "rb") as f:
+                os.fsync(f.fileno())
+        fsync_dir(root)
+
+
+def atomic_write_bytes(path: str, data: bytes):
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+    fsync_dir(directory)
+
+
+def atomic_write_text(path: str, text: str):
+    atomic_write_bytes(path, text.encode("utf-8"))
+
+
+def atomic_write_json(path: str, data) -> None:
+    atomic_write_bytes(path, json.dumps(data, indent=2, sort_keys=True).encode("utf-8"))
+
+
+@contextmanager
+def file_lock(name: str, exclusive: bool):
+    """
+    Hold a shared (readers) or exclusive (writer) lock across processes.
+
+    flock locks belong to the open file description, so this also excludes
+    threads of the same process that take the lock independently.
+    """
+    os.makedirs(LOCK_DIR, exist_ok=True)
+    with open(os.path.join(LOCK_DIR, f"{name}.lock"), "a+") as handle:
+        fcntl.flock(handle.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
@@ -1,19 +1,35 @@
 import os
 from app.config import config
+from app.storage.atomic import atomic_write_text
+from app.storage.artifacts import fetch_transcript, publish_transcript
 
 CACHE_DIR = config.CACHE_PATH
 os.makedirs(CACHE_DIR, exist_ok=True)
 
-def save_transcript(video_id: str, transcript: str):
-    """Save transcript locally."""
+def _save_local(video_id: str, transcript: str):
     file_path = os.path.join(CACHE_DIR, f"{video_id}.txt")
-    with open(file_path, "w", encoding="utf-8") as f:
-        f.write(transcript)
+    atomic_write_text(file_path, transcript)
+
+def save_transcript(video_id: str, transcript: str):
+    """Save transcript locally (atomically: readers never see a partial file) and share it."""
+    _save_local(video_id, transcript)
+    publish_transcript(video_id, transcript)
+
+def load_transcript(video_id: str, fetch_remote: bool = True) -> str | None:
+    """
+    Load transcript if it exists.
 
-def load_transcript(video_id: str) -> str | None:
-    """Load transcript if it exists."""
+    The local file acts as a read-through cache for the shared artifact store:
+    on a local miss (and fetch_remote=True) the transcript is fetched from the
+    store and kept locally.
+    """
     file_path = os.path.join(CACHE_DIR, f"{video_id}.txt")
     if os.path.exists(file_path):
         with open(file_path, "r", encoding="utf-8") as f:
             return f.read()
+    if fetch_remote:
+        transcript = fetch_transcript(video_id)
+        if transcript is not None:
+            _save_local(video_id, transcript)
+            return transcript
     return None
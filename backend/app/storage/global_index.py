@@ -0,0 +1,304 @@
+# app/storage/global_index.py
+"""
+Append-only persistence for the global (all videos) FAISS index.
+
+Rewriting index.faiss / index.pkl on every add made each `process_video`
+cost O(index size). Instead, an add writes one immutable segment holding
+only the new chunks, and a background thread periodically compacts the
+segments into a new version of the base index:
+
+    ./data/faiss/_global/
+        MANIFEST.json            {"version": 4, "segments_through": 118, ...}
+        v000004/index.faiss      base index (index_store versioning)
+        v000004/index.pkl
+        segments/
+            seg-000000000119.npz vectors + documents of one add
+            seg-000000000120.npz
+
+A reader loads the base, then replays segments newer than
+`segments_through`. Compaction loads the base, applies the pending
+segments, publishes the result with the new `segments_through` and only
+then deletes the compacted segments. A crash at any point either leaves
+segments that are replayed or leftovers that are skipped and removed by
+the next compaction.
+
+Every chunk is tagged with its `video_id` (metadata, and ids of the form
+`{video_id}:{seq}:{n}`). Re-adding a video replaces its previous chunks.
+A global index from before segments existed (index files directly in the
+FAISS directory) is used as the initial base.
+"""
+import io
+import json
+import os
+import shutil
+import threading
+import time
+from typing import List, Optional
+
+import faiss
+import numpy as np
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores import FAISS
+
+from app.config import config
+from app.services.embeddings import EMBEDDING_MODEL_NAME, get_embeddings
+from app.storage.atomic import atomic_write_bytes, file_lock
+from app.storage.index_store import (
+    GLOBAL_INDEX_ID, open_index, publish_index, read_manifest, video_index_dir, writer_lock,
+)
+from app.storage.quantization import vectorstore_nbytes
+from app.utils import memory
+from app.utils.logger import get_logger
+from app.utils.tracing import stage
+
+logger = get_logger(__name__)
+
+SEGMENT_PREFIX = "seg-"
+SEGMENT_SUFFIX = ".npz"
+
+_state = None
+_state_lock = threading.RLock()
+_compactor = None
+
+
+def _segment_dir() -> str:
+    return os.path.join(video_index_dir(GLOBAL_INDEX_ID), "segments")
+
+
+def _segment_path(seq: int) -> str:
+    return os.path.join(_segment_dir(), f"{SEGMENT_PREFIX}{seq:012d}{SEGMENT_SUFFIX}")
+
+
+def _list_segments() -> List[int]:
+    try:
+        names = os.listdir(_segment_dir())
+    except FileNotFoundError:
+        return []
+    return sorted(
+        int(name[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)])
+        for name in names
+        if name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX)
+    )
+
+
+def _write_segment(video_id: Optional[str], texts: List[str], vectors: np.ndarray, metadatas: List[dict]) -> dict:
+    """Append one segment (O(new chunks)); returns it as `_read_segment` would."""
+    with file_lock("faiss-global-append", exclusive=True):
+        existing = _list_segments()
+        manifest = read_manifest(GLOBAL_INDEX_ID) or {}
+        seq = max(existing[-1] if existing else 0, manifest.get("segments_through", 0)) + 1
+        prefix = video_id or "global"
+        documents = [
+            {"id": f"{prefix}:{seq}:{n}", "text": text, "metadata": metadata}
+            for n, (text, metadata) in enumerate(zip(texts, metadatas))
+        ]
+        buffer = io.BytesIO()
+        np.savez(buffer, vectors=vectors, documents=np.array(json.dumps({"video_id": video_id, "documents": documents})))
+        atomic_write_bytes(_segment_path(seq), buffer.getvalue())
+    return {"seq": seq, "video_id": video_id, "documents": documents, "vectors": vectors}
+
+
+def _read_segment(seq: int) -> dict:
+    with np.load(_segment_path(seq)) as data:
+        payload = json.loads(str(data["documents"]))
+        vectors = np.asarray(data["vectors"], dtype=np.float32)
+    return {"seq": seq, "video_id": payload["video_id"], "documents": payload["documents"], "vectors": vectors}
+
+
+class GlobalIndexState:
+    """A loaded global vectorstore, the last segment applied to it and its chunk ids per video."""
+
+    def __init__(self, vectorstore: FAISS, applied_seq: int):
+        self.vectorstore = vectorstore
+        self.applied_seq = applied_seq
+        self.video_doc_ids = {}
+        for doc_id in vectorstore.index_to_docstore_id.values():
+            document = vectorstore.docstore.search(doc_id)
+            video_id = getattr(document, "metadata", {}).get("video_id")
+            if video_id:
+                self.video_doc_ids.setdefault(video_id, []).append(doc_id)
+
+    def apply(self, segment: dict):
+        """Add a segment's chunks, replacing earlier chunks of the same video."""
+        if segment["seq"] <= self.applied_seq:
+            return
+        video_id = segment["video_id"]
+        if video_id and self.video_doc_ids.get(video_id):
+            self.vectorstore.delete(self.video_doc_ids.pop(video_id))
+        documents = segment["documents"]
+        if documents:
+            self.vectorstore.add_embeddings(
+                [(doc["text"], vector) for doc, vector in zip(documents, segment["vectors"].tolist())],
+                metadatas=[doc["metadata"] for doc in documents],
+                ids=[doc["id"] for doc in documents],
+            )
+            if video_id:
+                self.video_doc_ids[video_id] = [doc["id"] for doc in documents]
+        self.applied_seq = segment["seq"]
+
+    def catch_up(self) -> bool:
+        """
+        Apply segments written since (by this or another worker).
+
+        Returns False if a compaction has folded (and may have deleted)
+        segments this state never applied; reload the base then.
+        """
+        manifest = read_manifest(GLOBAL_INDEX_ID)
+        if manifest is not None and manifest.get("segments_through", 0) > self.applied_seq:
+            return False
+        for seq in _list_segments():
+            if seq > self.applied_seq:
+                try:
+                    self.apply(_read_segment(seq))
+                except FileNotFoundError:
+                    return False
+        return True
+
+
+def _empty_vectorstore() -> FAISS:
+    dimension = len(get_embeddings().embed_query("dimension"))
+    return FAISS(get_embeddings(), faiss.IndexFlatL2(dimension), InMemoryDocstore({}), {})
+
+
+def _load_base() -> GlobalIndexState:
+    """Base index and the segment it includes: the published version, else a legacy index, else empty."""
+    if read_manifest(GLOBAL_INDEX_ID) is not None:
+        with open_index(GLOBAL_INDEX_ID) as (path, manifest):
+            vectorstore = FAISS.load_local(path, get_embeddings(), allow_dangerous_deserialization=True)
+        return GlobalIndexState(vectorstore, manifest.get("segments_through", 0))
+
+    legacy_dir = config.CHROMA_DB_PATH.replace("chroma", "faiss")
+    if os.path.exists(os.path.join(legacy_dir, "index.faiss")):
+        try:
+            vectorstore = FAISS.load_local(legacy_dir, get_embeddings(), allow_dangerous_deserialization=True)
+            logger.info(f"✓ Using legacy global FAISS index from {legacy_dir} as the base")
+            return GlobalIndexState(vectorstore, 0)
+        except Exception as e:
+            logger.warning(f"⚠ Could not load legacy global index: {e}")
+    return GlobalIndexState(_empty_vectorstore(), 0)
+
+
+def _evict_state():
+    global _state
+    with _state_lock:
+        _state = None
+
+
+def _state_nbytes() -> int:
+    state = _state
+    return vectorstore_nbytes(state.vectorstore) if state is not None else 0
+
+
+def get_global_state() -> GlobalIndexState:
+    """Shared global index, loaded on first use and brought up to date with new segments."""
+    global _state
+    with _state_lock:
+        if _state is not None and _state.catch_up():
+            memory.touch("global_index")
+            return _state
+        start = time.perf_counter()
+        with stage("global_index.load"):
+            _state = _load_base()
+            _state.catch_up()
+        # Evictable: the next use reloads the base and replays pending segments
+        memory.register("global_index", kind="global_index", size=_state_nbytes, evict=_evict_state,
+                        cost=time.perf_counter() - start)
+        _start_compactor()
+        return _state
+
+
+def append(texts: List[str], video_id: Optional[str] = None) -> int:
+    """
+    Embed `texts` and append them to the global index.
+
+    Only the new chunks are written (one segment); the base index is left
+    alone until the next compaction.
+
+    Returns:
+        The segment sequence number
+    """
+    metadatas = [{"video_id": video_id, "chunk": n} if video_id else {"chunk": n} for n in range(len(texts))]
+    with stage("global_index.embed", chunks=len(texts)):
+        vectors = np.asarray(get_embeddings().embed_documents(texts), dtype=np.float32)
+    with stage("global_index.append", chunks=len(texts)):
+        segment = _write_segment(video_id, texts, vectors, metadatas)
+    get_global_state()
+    return segment["seq"]
+
+
+def compact() -> Optional[dict]:
+    """
+    Fold pending segments into a new base version, then delete them.
+
+    Returns:
+        The new manifest, or None if there was nothing to compact
+    """
+    with file_lock("faiss-global-compact", exclusive=True):
+        pending = _list_segments()
+        if not pending:
+            return None
+        start = time.perf_counter()
+        with stage("global_index.compact", segments=len(pending)):
+            state = _load_base()
+            for seq in pending:
+                state.apply(_read_segment(seq))
+            manifest = publish_index(
+                GLOBAL_INDEX_ID,
+                state.vectorstore.save_local,
+                {
+                    "segments_through": state.applied_seq,
+                    "chunks": len(state.vectorstore.index_to_docstore_id),
+                    "videos": len(state.video_doc_ids),
+                    "embedding_model": EMBEDDING_MODEL_NAME,
+                },
+            )
+        # The new base includes these; readers skip them from now on
+        for seq in pending:
+            if seq <= manifest["segments_through"]:
+                try:
+                    os.remove(_segment_path(seq))
+                except FileNotFoundError:
+                    pass
+    logger.info(
+        f"✓ Compacted {len(pending)} global index segments into version {manifest['version']} "
+        f"({manifest['chunks']} chunks) in {time.perf_counter() - start:.1f}s"
+    )
+    return manifest
+
+
+def _compaction_loop():
+    while True:
+        time.sleep(config.GLOBAL_COMPACT_CHECK_INTERVAL)
+        try:
+            segments = _list_segments()
+            if not segments:
+                continue
+            oldest_age = time.time() - os.path.getmtime(_segment_path(segments[0]))
+            if len(segments) >= config.GLOBAL_COMPACT_SEGMENTS or oldest_age >= config.GLOBAL_COMPACT_MAX_AGE:
+                compact()
+        except Exception as e:
+            logger.warning(f"✗ Global index compaction failed: {str(e)}")
+
+
+def _start_compactor():
+    global _compactor
+    if _compactor is None and config.GLOBAL_COMPACT_CHECK_INTERVAL > 0:
+        _compactor = threading.Thread(target=_compaction_loop, name="global-index-compactor", daemon=True)
+        _compactor.start()
+
+
+def clear():
+    """Delete the global index: base versions, segments and any legacy files."""
+    global _state
+    # Also block appends, so no segment is written into the tree being removed
+    with _state_lock, file_lock("faiss-global-compact", exclusive=True):
+        with file_lock("faiss-global-append", exclusive=True), writer_lock(GLOBAL_INDEX_ID):
+            shutil.rmtree(video_index_dir(GLOBAL_INDEX_ID), ignore_errors=True)
+            legacy_dir = config.CHROMA_DB_PATH.replace("chroma", "faiss")
+            for name in ("index.faiss", "index.pkl"):
+                try:
+                    os.remove(os.path.join(legacy_dir, name))
+                except FileNotFoundError:
+                    pass
+            _state = None
+    memory.unregister("global_index")
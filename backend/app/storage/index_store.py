@@ -0,0 +1,233 @@
+# app/storage/index_store.py
+"""
+Versioned on-disk layout for per-video FAISS indexes.
+
+    ./data/faiss/{video_id}/
+        MANIFEST.json      -> {"version": 3, "path": "v000003", "files": {...}, ...}
+        v000003/
+            index.faiss
+            index.pkl
+
+Writers build a new version in a temp directory, fsync it, rename it to
+`vNNNNNN` and then atomically replace MANIFEST.json, all under the video's
+exclusive lock. Readers take the shared lock, read the manifest and load the
+version it points to, so they never see a half-written `index.faiss` next to
+a stale `index.pkl`, even with several uvicorn workers sharing ./data.
+
+Directories written before manifests existed (index files directly in the
+video directory) are still readable as version 0.
+
+A video whose transcript is a near-duplicate of an indexed one gets an alias
+manifest instead ({"alias_of": "<video_id>", "path": null, ...}); readers are
+sent to the target's current version (see app/services/dedup.py).
+"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+from contextlib import contextmanager
+from typing import Callable, Optional
+
+from app.storage.atomic import atomic_write_json, file_lock, fsync_dir, fsync_tree
+
+INDEX_ROOT = "./data/faiss"
+MANIFEST_NAME = "MANIFEST.json"
+MANIFEST_FORMAT = 1
+STALE_TMP_SECONDS = 3600  # Temp dirs this old were left behind by a crashed writer
+GLOBAL_INDEX_ID = "_global"  # Base of the global index (app/storage/global_index.py); never a video ID
+
+
+def video_index_dir(video_id: str) -> str:
+    return os.path.join(INDEX_ROOT, video_id)
+
+
+def sidecar_path(video_id: str, name: str) -> str:
+    """Path for a derived artifact kept next to the index (e.g. SUMMARY.json); not versioned or pruned."""
+    return os.path.join(video_index_dir(video_id), name)
+
+
+def _lock_name(video_id: str) -> str:
+    return f"faiss-{video_id}"
+
+
+def _file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def read_manifest(video_id: str) -> Optional[dict]:
+    """Current manifest for `video_id`, or None (no index, or a legacy one)."""
+    try:
+        with open(os.path.join(video_index_dir(video_id), MANIFEST_NAME), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _is_legacy(video_id: str) -> bool:
+    return os.path.exists(os.path.join(video_index_dir(video_id), "index.faiss"))
+
+
+def index_exists(video_id: str) -> bool:
+    """True once a complete index has been published (a bare directory is not enough)."""
+    return read_manifest(video_id) is not None or _is_legacy(video_id)
+
+
+def alias_target(video_id: str) -> Optional[str]:
+    """Video whose index `video_id` aliases, or None if it has its own (or none)."""
+    manifest = read_manifest(video_id)
+    return manifest.get("alias_of") if manifest else None
+
+
+def list_indexed_videos(include_aliases: bool = True) -> list:
+    """Video IDs with a complete index under INDEX_ROOT."""
+    if not os.path.isdir(INDEX_ROOT):
+        return []
+    return sorted(
+        name for name in os.listdir(INDEX_ROOT)
+        if name != GLOBAL_INDEX_ID and os.path.isdir(os.path.join(INDEX_ROOT, name)) and index_exists(name)
+        and (include_aliases or alias_target(name) is None)
+    )
+
+
+def index_version(video_id: str) -> Optional[int]:
+    manifest = read_manifest(video_id)
+    if manifest is not None:
+        return manifest["version"]
+    return 0 if _is_legacy(video_id) else None
+
+
+@contextmanager
+def open_index(video_id: str):
+    """
+    Yield `(path, manifest)` for the current version under the shared lock.
+
+    The version directory cannot be pruned while the block runs, so loading
+    from `path` is safe. An alias yields its target's path and manifest.
+    Raises FileNotFoundError if there is no index.
+    """
+    target = alias_target(video_id)
+    if target is not None:
+        with open_index(target) as opened:
+            yield opened
+        return
+
+    with file_lock(_lock_name(video_id), exclusive=False):
+        manifest = read_manifest(video_id)
+        if manifest is not None:
+            yield os.path.join(video_index_dir(video_id), manifest["path"]), manifest
+        elif _is_legacy(video_id):
+            yield video_index_dir(video_id), {"version": 0, "path": ".", "legacy": True}
+        else:
+            raise FileNotFoundError(f"No vectorstore found for video ID: {video_id}")
+
+
+@contextmanager
+def writer_lock(video_id: str):
+    """Exclusive lock for a video's index directory (publishing, pruning)."""
+    with file_lock(_lock_name(video_id), exclusive=True):
+        yield
+
+
+def publish_index(video_id: str, write: Callable[[str], None], metadata: dict) -> dict:
+    """
+    Atomically publish a new index version.
+
+    Args:
+        video_id: Video whose index is being written
+        write: Called with a temp directory; must write the index files into it
+        metadata: Extra manifest fields (chunk count, embedding model, index type...)
+
+    Returns:
+        The manifest that is now current
+    """
+    video_dir = video_index_dir(video_id)
+    os.makedirs(video_dir, exist_ok=True)
+
+    # Build outside the lock: writing the files is the slow part
+    tmp_dir = tempfile.mkdtemp(prefix=".tmp-", dir=video_dir)
+    try:
+        write(tmp_dir)
+        fsync_tree(tmp_dir)
+        files = {
+            name: _file_sha256(os.path.join(tmp_dir, name))
+            for name in sorted(os.listdir(tmp_dir))
+        }
+
+        with writer_lock(video_id):
+            previous = index_version(video_id) or 0
+            version = previous + 1
+            version_name = f"v{version:06d}"
+            os.rename(tmp_dir, os.path.join(video_dir, version_name))
+            fsync_dir(video_dir)
+
+            manifest = {
+                **metadata,
+                "format": MANIFEST_FORMAT,
+                "video_id": video_id,
+                "version": version,
+                "path": version_name,
+                "created_at": time.time(),
+                "files": files,
+            }
+            atomic_write_json(os.path.join(video_dir, MANIFEST_NAME), manifest)
+            _prune(video_dir, keep=version_name)
+        return manifest
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def publish_alias(video_id: str, target_id: str, metadata: dict) -> dict:
+    """
+    Point `video_id` at another video's index instead of building its own.
+
+    Aliases always point at a video with a real index (never at another
+    alias). Any previous index versions of `video_id` are pruned.
+
+    Returns:
+        The alias manifest that is now current
+    """
+    target_id = alias_target(target_id) or target_id
+    if target_id == video_id:
+        raise ValueError(f"Cannot alias {video_id} to itself")
+
+    video_dir = video_index_dir(video_id)
+    os.makedirs(video_dir, exist_ok=True)
+    with writer_lock(video_id):
+        version = (index_version(video_id) or 0) + 1
+        manifest = {
+            **metadata,
+            "format": MANIFEST_FORMAT,
+            "video_id": video_id,
+            "version": version,
+            "path": None,
+            "alias_of": target_id,
+            "created_at": time.time(),
+            "files": {},
+        }
+        atomic_write_json(os.path.join(video_dir, MANIFEST_NAME), manifest)
+        _prune(video_dir, keep=None)
+    return manifest
+
+
+def _prune(video_dir: str, keep: Optional[str]):
+    """Remove superseded versions and legacy files. Caller holds the writer lock."""
+    now = time.time()
+    for name in os.listdir(video_dir):
+        path = os.path.join(video_dir, name)
+        if name in (keep, MANIFEST_NAME):
+            continue
+        if name.startswith(".tmp-"):
+            # Another writer may still be building this one; only sweep old leftovers
+            if now - os.path.getmtime(path) > STALE_TMP_SECONDS:
+                shutil.rmtree(path, ignore_errors=True)
+            continue
+        if os.path.isdir(path) and name.startswith("v"):
+            shutil.rmtree(path, ignore_errors=True)
+        elif name in ("index.faiss", "index.pkl"):
+            os.remove(path)
@@ -0,0 +1,337 @@
+# app/storage/quantization.py
+"""
+FAISS index structures and encodings for per-video indexes.
+
+A flat index stores every 384-dim MiniLM vector as float32 (1536 bytes) and
+scans all of them per query. INDEX_TYPE selects the structure when an index
+is built:
+
+    auto  Chosen from the chunk count (default): flat below
+          INDEX_AUTO_HNSW_CHUNKS, hnsw up to INDEX_AUTO_IVF_CHUNKS, ivf beyond.
+          Short videos keep the exact flat index and pay nothing extra
+    flat  IndexFlatL2, exact
+    hnsw  IndexHNSWFlat (INDEX_HNSW_M links per node): graph search, low-ms
+          queries on very long streams; vectors stay exact for MMR
+    ivf   IndexIVFFlat (~4*sqrt(n) lists, INDEX_IVF_NPROBE probed): cheaper to
+          build than HNSW for the largest indexes
+    sq8   IndexScalarQuantizer 8-bit: 384 bytes/vector, ~4x smaller;
+          distances and reconstructions are near-exact
+    pq    IndexPQ (INDEX_PQ_M sub-quantizers): 48 bytes/vector at M=48, but
+          the index also stores a float32 codebook of 384 * 2**nbits floats
+          (384 KB at 8 bits). That only pays off on long videos: below
+          ~1,200 chunks PQ is larger than sq8, and build_index falls back to
+          sq8. Codes are too lossy to rank on their own, so the top `fetch_k`
+          candidates are re-ranked with float vectors recomputed from the
+          chunk text (RerankedFAISS) before MMR
+
+PQ trades query latency for disk: re-ranking embeds every candidate not yet
+memoized with MiniLM on the query path (tens of ms for fetch_k chunks on
+CPU), and the memo is capped at PQ_RERANK_CACHE_CHUNKS vectors per index so
+it cannot grow back to the float32 size the codes saved. Measure with
+`python -m app.cli.convert_indexes --to pq --dry-run` before switching.
+
+The type and its parameters are recorded in the index MANIFEST.json
+("index"); load_vectorstore_for_video picks the matching vectorstore class
+and applies the search-time parameters (efSearch, nprobe) with
+`configure_search`. Existing directories are converted with
+`python -m app.cli.convert_indexes`.
+"""
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, List, Optional, Sequence, Tuple
+
+import faiss
+import numpy as np
+from langchain_community.vectorstores import FAISS
+from langchain_community.vectorstores.utils import maximal_marginal_relevance
+from langchain_core.documents import Document
+
+from app.config import config
+
+INDEX_TYPES = ("flat", "hnsw", "ivf", "sq8", "pq")
+AUTO_INDEX = "auto"
+
+PQ_MAX_NBITS = 8
+PQ_MIN_NBITS = 4  # Below 16 centroids per sub-quantizer PQ is not worth it; use sq8
+PQ_RERANK_CACHE_CHUNKS = 1024  # Exact vectors memoized per PQ index (1.5 MB at 384 dims)
+
+
+def _pq_nbits(n: int) -> Optional[int]:
+    """Bits per PQ code that `n` training vectors can support (k-means needs >= 2**nbits points)."""
+    if n < 2 ** PQ_MIN_NBITS:
+        return None
+    return min(PQ_MAX_NBITS, int(math.log2(n)))
+
+
+def _pq_pays_off(n: int, d: int, nbits: int) -> bool:
+    """Whether PQ codes plus their float32 codebook are smaller than sq8 codes for `n` vectors."""
+    pq_bytes = d * (2 ** nbits) * 4 + n * config.INDEX_PQ_M
+    sq8_bytes = n * d + 2 * d * 4  # Codes plus per-dimension min/range
+    return pq_bytes < sq8_bytes
+
+
+def resolve_index_type(index_type: str, n: int) -> str:
+    """Concrete index type for `n` chunks: `index_type` itself unless it is "auto"."""
+    if index_type != AUTO_INDEX:
+        return index_type
+    if n >= config.INDEX_AUTO_IVF_CHUNKS:
+        return "ivf"
+    if n >= config.INDEX_AUTO_HNSW_CHUNKS:
+        return "hnsw"
+    return "flat"
+
+
+def _ivf_nlist(n: int) -> int:
+    """~4*sqrt(n) inverted lists, keeping >= 39 training points per list (FAISS's minimum)."""
+    return max(1, min(int(4 * math.sqrt(n)), n // 39))
+
+
+def configure_search(index, index_info: Optional[dict]):
+    """Apply the manifest's search-time parameters to a loaded index."""
+    index_info = index_info or {}
+    if index_info.get("type") == "hnsw":
+        index.hnsw.efSearch = index_info.get("ef_search", config.INDEX_HNSW_EF_SEARCH)
+    elif index_info.get("type") == "ivf":
+        index.nprobe = index_info.get("nprobe", config.INDEX_IVF_NPROBE)
+        # MMR reconstructs candidate vectors, which IVF needs a direct map for
+        index.make_direct_map()
+    return index
+
+
+def build_index(vectors: np.ndarray, index_type: str) -> Tuple[Any, dict]:
+    """
+    Build a FAISS index of `index_type` over `vectors` (ids 0..n-1, in order).
+
+    Args:
+        vectors: Chunk embeddings, one row per chunk
+        index_type: One of INDEX_TYPES, or "auto" to choose by chunk count
+
+    Returns:
+        (index, description) where description is the manifest "index" entry
+        (type and parameters). PQ falls back to sq8 when the video is too
+        short to train a codebook, or so short that the codebook would make
+        the index larger than sq8.
+    """
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    n, d = vectors.shape
+    index_type = resolve_index_type(index_type, n)
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown index type {index_type!r}; expected one of {INDEX_TYPES} or {AUTO_INDEX!r}")
+
+    if index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(d, config.INDEX_HNSW_M, faiss.METRIC_L2)
+        index.hnsw.efConstruction = config.INDEX_HNSW_EF_CONSTRUCTION
+        index.add(vectors)
+        info = {
+            "type": "hnsw",
+            "m": config.INDEX_HNSW_M,
+            "ef_construction": config.INDEX_HNSW_EF_CONSTRUCTION,
+            "ef_search": config.INDEX_HNSW_EF_SEARCH,
+        }
+        return configure_search(index, info), info
+
+    if index_type == "ivf":
+        nlist = _ivf_nlist(n)
+        index = faiss.IndexIVFFlat(faiss.IndexFlatL2(d), d, nlist, faiss.METRIC_L2)
+        index.train(vectors)
+        index.add(vectors)
+        info = {"type": "ivf", "nlist": nlist, "nprobe": min(config.INDEX_IVF_NPROBE, nlist)}
+        return configure_search(index, info), info
+
+    if index_type == "pq":
+        nbits = _pq_nbits(n)
+        if nbits is not None and d % config.INDEX_PQ_M == 0 and _pq_pays_off(n, d, nbits):
+            index = faiss.IndexPQ(d, config.INDEX_PQ_M, nbits, faiss.METRIC_L2)
+            index.train(vectors)
+            index.add(vectors)
+            return index, {"type": "pq", "m": config.INDEX_PQ_M, "nbits": nbits, "rerank": "exact"}
+        index_type = "sq8"
+
+    if index_type == "sq8":
+        index = faiss.IndexScalarQuantizer(d, faiss.ScalarQuantizer.QT_8bit, faiss.METRIC_L2)
+        index.train(vectors)
+        index.add(vectors)
+        return index, {"type": "sq8"}
+
+    index = faiss.IndexFlatL2(d)
+    index.add(vectors)
+    return index, {"type": "flat"}
+
+
+def index_nbytes(index) -> int:
+    """Serialized size of a FAISS index (what index.faiss takes on disk and roughly in memory)."""
+    return int(faiss.serialize_index(index).nbytes)
+
+
+def vectorstore_nbytes(vectorstore) -> int:
+    """
+    Cheap in-memory size estimate of a loaded vectorstore (for the memory governor):
+    vector codes, HNSW links and ids, plus the chunk text in the docstore.
+    """
+    index = vectorstore.index
+    nbytes = 0
+    if hasattr(index, "hnsw"):
+        nbytes += faiss.downcast_index(index.storage).code_size * index.ntotal
+        nbytes += index.hnsw.neighbors.size() * 4
+    else:
+        nbytes += getattr(index, "code_size", index.d * 4) * index.ntotal
+        if hasattr(index, "nlist"):
+            nbytes += 8 * index.ntotal  # Inverted list ids
+    for document in getattr(vectorstore.docstore, "_dict", {}).values():
+        nbytes += len(getattr(document, "page_content", "")) + 200  # Text plus object overhead
+    if isinstance(vectorstore, RerankedFAISS):
+        nbytes += len(vectorstore._exact) * index.d * 4
+    return nbytes
+
+
+class RerankedFAISS(FAISS):
+    """
+    FAISS vectorstore over PQ codes with exact float re-ranking.
+
+    PQ search only proposes `fetch_k` candidates. Their float vectors are
+    recomputed from the chunk text, then candidates are re-scored against
+    the query and passed to MMR, so ranking within the candidates is exact.
+    Recomputed vectors are memoized in a PQ_RERANK_CACHE_CHUNKS LRU.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._exact: "OrderedDict[int, np.ndarray]" = OrderedDict()
+        self._exact_lock = threading.Lock()
+
+    def exact_vectors(self, ids: Sequence[int]) -> np.ndarray:
+        """Float vectors for index positions `ids`, embedding any not seen before."""
+        with self._exact_lock:
+            missing = [i for i in ids if i not in self._exact]
+        fresh = {}
+        if missing:
+            texts = [self.docstore.search(self.index_to_docstore_id[i]).page_content for i in missing]
+            fresh = dict(zip(missing, np.asarray(self.embeddings.embed_documents(texts), dtype=np.float32)))
+        with self._exact_lock:
+            rows = []
+            for i in ids:
+                vector = fresh.get(i)
+                if vector is None:
+                    vector = self._exact.get(i)
+                if vector is None:  # Evicted by a concurrent query meanwhile
+                    text = self.docstore.search(self.index_to_docstore_id[i]).page_content
+                    vector = np.asarray(self.embeddings.embed_documents([text])[0], dtype=np.float32)
+                self._exact[i] = vector
+                self._exact.move_to_end(i)
+                rows.append(vector)
+            while len(self._exact) > PQ_RERANK_CACHE_CHUNKS:
+                self._exact.popitem(last=False)
+            return np.vstack(rows)
+
+    def max_marginal_relevance_search_with_score_by_vector(
+        self,
+        embedding: List[float],
+        *,
+        k: int = 4,
+        fetch_k: int = 20,
+        lambda_mult: float = 0.5,
+        filter=None,
+    ) -> List[Tuple[Document, float]]:
+        if filter is not None:
+            return super().max_marginal_relevance_search_with_score_by_vector(
+                embedding, k=k, fetch_k=fetch_k, lambda_mult=lambda_mult, filter=filter
+            )
+        query = np.asarray([embedding], dtype=np.float32)
+        _, indices = self.index.search(query, fetch_k)
+        candidate_ids = [int(i) for i in indices[0] if i != -1]
+        if not candidate_ids:
+            return []
+
+        candidates = self.exact_vectors(candidate_ids)
+        distances = ((candidates - query) ** 2).sum(axis=1)
+        order = np.argsort(distances)
+        candidate_ids = [candidate_ids[j] for j in order]
+        candidates = candidates[order]
+        distances = distances[order]
+
+        selected = maximal_marginal_relevance(query, candidates, k=min(k, len(candidate_ids)), lambda_mult=lambda_mult)
+        return [
+            (self.docstore.search(self.index_to_docstore_id[candidate_ids[j]]), float(distances[j]))
+            for j in selected
+        ]
+
+
+def vectorstore_class(index_info: Optional[dict]):
+    """Vectorstore class for a manifest "index" entry (legacy indexes are flat)."""
+    if index_info and index_info.get("type") == "pq":
+        return RerankedFAISS
+    return FAISS
+
+
+def candidate_vectors(vectorstore, ids: Sequence[int]) -> np.ndarray:
+    """Vectors for MMR over candidate positions: exact for PQ stores, stored/decoded otherwise."""
+    if isinstance(vectorstore, RerankedFAISS):
+        return vectorstore.exact_vectors(ids)
+    return np.vstack([vectorstore.index.reconstruct(int(i)) for i in ids])
+
+
+def recall_at_k(reference: Sequence, candidate: Sequence, k: int) -> float:
+    """Mean fraction of each query's reference top-k ids that the candidate top-k also returns."""
+    hits = []
+    for ref, cand in zip(reference, candidate):
+        expected = {int(i) for i in ref[:k] if i != -1}
+        hits.append(len(expected & {int(i) for i in cand[:k]}) / max(1, len(expected)))
+    return float(np.mean(hits)) if hits else 1.0
+
+
+def _timed_search(index, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray, float]:
+    start = time.perf_counter()
+    distances, ids = index.search(queries, k)
+    return distances, ids, (time.perf_counter() - start) / max(1, len(queries))
+
+
+def evaluate_index(vectors: np.ndarray, queries: np.ndarray, index_type: str, k: int, fetch_k: int) -> Tuple[Any, dict, dict]:
+    """
+    Build `index_type` over `vectors` and compare it with an exact flat index.
+
+    For pq, the top `fetch_k` PQ candidates are re-ranked with the exact
+    vectors, as RerankedFAISS does at query time (minus the one-off embedding).
+
+    Returns:
+        (index, index_info, report) where report has recall@k, sizes and
+        per-query search latency for both indexes
+    """
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    queries = np.ascontiguousarray(queries, dtype=np.float32)
+    k = min(k, len(vectors))
+    fetch_k = min(max(fetch_k, k), len(vectors))
+
+    flat = faiss.IndexFlatL2(vectors.shape[1])
+    flat.add(vectors)
+    _, reference, flat_latency = _timed_search(flat, queries, k)
+
+    index, index_info = build_index(vectors, index_type)
+    if index_info["type"] == "pq":
+        start = time.perf_counter()
+        _, proposed = index.search(queries, fetch_k)
+        found = []
+        for query, row in zip(queries, proposed):
+            row = row[row != -1]
+            exact = ((vectors[row] - query) ** 2).sum(axis=1)
+            found.append(row[np.argsort(exact)][:k])
+        latency = (time.perf_counter() - start) / max(1, len(queries))
+    else:
+        _, found, latency = _timed_search(index, queries, k)
+
+    flat_bytes = index_nbytes(flat)
+    quantized_bytes = index_nbytes(index)
+    report = {
+        "index": index_info,
+        "vectors": int(len(vectors)),
+        "queries": int(len(queries)),
+        "k": k,
+        "recall_at_k": round(recall_at_k(reference, found, k), 4),
+        "flat_bytes": flat_bytes,
+        "index_bytes": quantized_bytes,
+        "size_ratio": round(quantized_bytes / flat_bytes, 4) if flat_bytes else 1.0,
+        "flat_search_us": round(flat_latency * 1e6, 1),
+        "index_search_us": round(latency * 1e6, 1),
+    }
+    return index, index_info, report
@@ -1,19 +1,34 @@
 # app/storage/vector_store.py
 
-from langchain_community.vectorstores import FAISS
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_core.documents import Document
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from app.services.embeddings import get_embeddings
+from app.services.embeddings import EMBEDDING_MODEL_NAME, get_embeddings
+from app.storage import global_index
+from app.storage.artifacts import fetch_index_bundle, publish_index_bundle
+from app.storage.index_store import alias_target, index_version, open_index, publish_index, video_index_dir
+from app.storage.quantization import (
+    build_index, configure_search, evaluate_index, resolve_index_type, vectorstore_class, vectorstore_nbytes,
+)
 from app.config import config
+from app.utils import memory
+from app.utils.logger import get_logger
+from app.utils.metrics import record_cache
+from app.utils.tracing import stage
 import os
 import re
+import threading
+import time
+import uuid
+import numpy as np
+from collections import OrderedDict
 
 # ---- CLEAN TRANSCRIPT UTILS ----
 
 # ...existing code...
-import logging
 from typing import Any, Dict, List, Optional, Sequence
 
-logger = logging.getLogger(__name__)
+logger = get_logger(__name__)
 
 
 class VectorStore:
@@ -245,62 +260,92 @@ def clean_transcript(text):
 
 # ---- VECTORSTORE FUNCTIONS ----
 
-_embeddings = get_embeddings()
-FAISS_INDEX_PATH = config.CHROMA_DB_PATH.replace("chroma", "faiss")
-os.makedirs(FAISS_INDEX_PATH, exist_ok=True)
-
-_vectorstore = None
-
 def get_vectorstore():
-    global _vectorstore
-    if _vectorstore is None:
-        index_file = os.path.join(FAISS_INDEX_PATH, "index.faiss")
-        if os.path.exists(index_file):
-            try:
-                _vectorstore = FAISS.load_local(
-                    FAISS_INDEX_PATH,
-                    _embeddings,
-                    allow_dangerous_deserialization=True
-                )
-                print(f"✓ Loaded existing FAISS index from {FAISS_INDEX_PATH}")
-            except Exception as e:
-                print(f"⚠ Could not load existing index: {e}")
-                _vectorstore = FAISS.from_texts(["initialization"], _embeddings)
-        else:
-            _vectorstore = FAISS.from_texts(["initialization"], _embeddings)
-            print(f"✓ Created new FAISS index at {FAISS_INDEX_PATH}")
-    
-    return _vectorstore
+    """The global (all videos) FAISS index: base version plus appended segments."""
+    return global_index.get_global_state().vectorstore
 
-def add_to_vectorstore(texts):
-    vectorstore = get_vectorstore()
-    vectorstore.add_texts(texts)
-    vectorstore.save_local(FAISS_INDEX_PATH)
-    print(f"✓ Added {len(texts)} texts to FAISS and saved to disk")
+def add_to_vectorstore(texts, video_id=None):
+    """
+    Append chunks to the global index, tagged with `video_id`.
+
+    Writes only the new chunks (see app/storage/global_index.py); re-adding a
+    video replaces its earlier chunks. Compaction runs in the background.
+    """
+    seq = global_index.append(texts, video_id=video_id)
+    logger.info(f"✓ Added {len(texts)} texts to the global FAISS index (segment {seq})")
 
 def clear_vectorstore():
-    global _vectorstore
-    index_file = os.path.join(FAISS_INDEX_PATH, "index.faiss")
-    pkl_file = os.path.join(FAISS_INDEX_PATH, "index.pkl")
-    
-    if os.path.exists(index_file):
-        os.remove(index_file)
-    if os.path.exists(pkl_file):
-        os.remove(pkl_file)
-    
-    _vectorstore = None
-    print("✓ Cleared FAISS vectorstore")
+    global_index.clear()
+    logger.info("✓ Cleared FAISS vectorstore")
+
+_loaded_indexes = OrderedDict()  # video_id -> (manifest version, FAISS vectorstore)
+_loaded_lock = threading.Lock()
+
+def _evict_loaded(video_id: str):
+    with _loaded_lock:
+        _loaded_indexes.pop(video_id, None)
+
+def _cache_loaded(video_id: str, version: int, vectorstore, load_seconds: Optional[float] = None):
+    dropped = []
+    with _loaded_lock:
+        _loaded_indexes[video_id] = (version, vectorstore)
+        _loaded_indexes.move_to_end(video_id)
+        while len(_loaded_indexes) > config.VECTORSTORE_CACHE_SIZE:
+            dropped.append(_loaded_indexes.popitem(last=False)[0])
+    for dropped_id in dropped:
+        memory.unregister(f"index:{dropped_id}")
+    # Rebuild cost is a reload from disk: measured when known, else ~200 MB/s
+    nbytes = vectorstore_nbytes(vectorstore)
+    memory.register(
+        f"index:{video_id}",
+        kind="index",
+        size=lambda: vectorstore_nbytes(vectorstore),
+        evict=lambda: _evict_loaded(video_id),
+        cost=load_seconds if load_seconds is not None else 0.01 + nbytes / (200 * 1024 * 1024),
+    )
 
 def load_vectorstore_for_video(video_id: str):
-    path = f"./data/faiss/{video_id}/"
-    if not os.path.exists(path):
+    """
+    Load the current version of a per-video index.
+
+    Loaded indexes are kept in a small LRU keyed by manifest version, so a
+    repeat question skips deserialization, and an index republished by
+    another worker is picked up on the next call. On a local miss the index is
+    fetched from the shared artifact store, if one is configured.
+
+    An alias (near-duplicate re-upload) loads, and caches, its target's index.
+    """
+    video_id = alias_target(video_id) or video_id
+    version = index_version(video_id)
+    record_cache("vectorstore", version is not None)
+    if version is None and fetch_index_bundle(video_id):
+        # Another node built it; the shared copy is now published locally (possibly as an alias)
+        video_id = alias_target(video_id) or video_id
+        version = index_version(video_id)
+    if version is None:
         raise FileNotFoundError(f"No vectorstore found for video ID: {video_id}")
     
-    return FAISS.load_local(
-        path,
-        _embeddings,
-        allow_dangerous_deserialization=True
-    )
+    with _loaded_lock:
+        cached = _loaded_indexes.get(video_id)
+        hit = bool(cached) and cached[0] == version
+        if hit:
+            _loaded_indexes.move_to_end(video_id)
+            memory.touch(f"index:{video_id}")
+    record_cache("vectorstore_memory", hit)
+    if hit:
+        return cached[1]
+    
+    load_start = time.perf_counter()
+    with open_index(video_id) as (path, manifest):
+        with stage("index.load", video_id=video_id, version=manifest["version"]):
+            vectorstore = vectorstore_class(manifest.get("index")).load_local(
+                path,
+                get_embeddings(),
+                allow_dangerous_deserialization=True
+            )
+            configure_search(vectorstore.index, manifest.get("index"))
+    _cache_loaded(video_id, manifest["version"], vectorstore, time.perf_counter() - load_start)
+    return vectorstore
 
 def create_vectorstore_for_video(video_id: str, transcript: str):
     # FIXED: Clean the transcript before processing
@@ -313,18 +358,91 @@ def create_vectorstore_for_video(video_id: str, transcript: str):
         length_function=len
     )
     
-    chunks = text_splitter.split_text(transcript)
+    with stage("index.chunk", video_id=video_id):
+        chunks = text_splitter.split_text(transcript)
     
-    # Create vectorstore from chunks
-    vectorstore = FAISS.from_texts(
-        texts=chunks,
-        embedding=_embeddings
-    )
+    # Embed separately from index construction so each shows up as its own span
+    with stage("index.embed", video_id=video_id, chunks=len(chunks)):
+        vectors = get_embeddings().embed_documents(chunks)
+    
+    # Create vectorstore from chunks; "auto" keeps short videos on the exact flat index
+    index_type = resolve_index_type(config.INDEX_TYPE, len(chunks))
+    with stage("index.build", video_id=video_id, index_type=index_type):
+        # Docstore and ids as FAISS.from_embeddings would lay them out; the index is built once
+        ids = [str(uuid.uuid4()) for _ in chunks]
+        docstore = InMemoryDocstore({doc_id: Document(page_content=chunk) for doc_id, chunk in zip(ids, chunks)})
+        index, index_info = build_index(np.asarray(vectors, dtype=np.float32), index_type)
+        vectorstore = vectorstore_class(index_info)(get_embeddings(), index, docstore, dict(enumerate(ids)))
     
-    # Save to disk
-    path = f"./data/faiss/{video_id}/"
-    os.makedirs(path, exist_ok=True)
-    vectorstore.save_local(path)
+    # Publish a new version atomically (temp dir -> fsync -> rename -> manifest)
+    with stage("index.save", video_id=video_id):
+        manifest = publish_index(
+            video_id,
+            vectorstore.save_local,
+            {"chunks": len(chunks), "embedding_model": EMBEDDING_MODEL_NAME, "index": index_info},
+        )
+    _cache_loaded(video_id, manifest["version"], vectorstore)
+    publish_index_bundle(video_id, os.path.join(video_index_dir(video_id), manifest["path"]), manifest)
     
-    print(f"✓ Created and saved vectorstore for video {video_id} with {len(chunks)} chunks (cleaned)")
+    logger.info(f"✓ Created and saved vectorstore for video {video_id} with {len(chunks)} chunks (cleaned), version {manifest['version']}")
     return vectorstore
+
+def _stored_vectors(vectorstore, index_info: Optional[dict]) -> np.ndarray:
+    """All vectors of a loaded store in id order: stored exactly (flat/hnsw/ivf), re-embedded otherwise."""
+    if not index_info or index_info.get("type", "flat") in ("flat", "hnsw", "ivf"):
+        return vectorstore.index.reconstruct_n(0, vectorstore.index.ntotal)
+    texts = [
+        vectorstore.docstore.search(vectorstore.index_to_docstore_id[i]).page_content
+        for i in range(vectorstore.index.ntotal)
+    ]
+    return np.asarray(get_embeddings().embed_documents(texts), dtype=np.float32)
+
+def convert_video_index(video_id: str, index_type: str, k: int, fetch_k: int, sample: int = 50, dry_run: bool = False) -> dict:
+    """
+    Re-encode an existing per-video index as `index_type` and report the trade-off.
+
+    Queries are the embedded opening (first 200 characters) of up to `sample`
+    chunks, so the neighbours are real but not trivially the chunk itself.
+
+    Returns:
+        Report with recall@k vs flat, index sizes, search latency and status
+        ('converted' / 'unchanged' / 'dry-run'). An alias converts its target.
+    """
+    video_id = alias_target(video_id) or video_id
+    with open_index(video_id) as (path, manifest):
+        index_info = manifest.get("index")
+        vectorstore = vectorstore_class(index_info).load_local(
+            path, get_embeddings(), allow_dangerous_deserialization=True
+        )
+        configure_search(vectorstore.index, index_info)
+    vectors = _stored_vectors(vectorstore, index_info)
+
+    ids = list(range(vectorstore.index.ntotal))
+    step = max(1, len(ids) // max(1, sample))
+    openings = [
+        vectorstore.docstore.search(vectorstore.index_to_docstore_id[i]).page_content[:200]
+        for i in ids[::step][:sample]
+    ]
+    queries = np.asarray(get_embeddings().embed_documents(openings), dtype=np.float32)
+
+    index, new_info, report = evaluate_index(vectors, queries, index_type, k, fetch_k)
+    report.update(video_id=video_id, previous_index=index_info or {"type": "flat"})
+
+    if (index_info or {"type": "flat"}) == new_info:
+        report["status"] = "unchanged"
+        return report
+    if dry_run:
+        report["status"] = "dry-run"
+        return report
+
+    converted = vectorstore_class(new_info)(
+        get_embeddings(), index, vectorstore.docstore, vectorstore.index_to_docstore_id
+    )
+    metadata = {key: value for key, value in manifest.items() if key != "legacy"}
+    metadata["index"] = new_info
+    new_manifest = publish_index(video_id, converted.save_local, metadata)
+    _cache_loaded(video_id, new_manifest["version"], converted)
+    publish_index_bundle(video_id, os.path.join(video_index_dir(video_id), new_manifest["path"]), new_manifest)
+    report["status"] = "converted"
+    report["version"] = new_manifest["version"]
+    return report
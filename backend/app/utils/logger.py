@@ -1,14 +1,152 @@
+# app/utils/logger.py
+"""
+Non-blocking application logging.
+
+Log calls never touch a file or stdout on the calling thread (often the
+event loop). The root logger has a single QueueHandler; a background
+QueueListener drains the queue into:
+
+    stdout        text (default) or JSON lines, LOG_STDOUT_FORMAT
+    LOG_FILE      JSON lines, rotated at LOG_MAX_BYTES (LOG_BACKUP_COUNT files kept)
+
+Every record carries the request id bound by app.utils.tracing. If the
+queue is full (LOG_QUEUE_SIZE), records are dropped and counted in
+klypse_log_records_dropped_total rather than blocking the caller.
+
+Noisy hot-path messages pass a key, e.g.
+    logger.info(f"Trying transcript for language: {lang}", extra={"log_key": "captions.lang"})
+Below WARNING, each key lets LOG_RATE_LIMIT records through per second and
+then samples 1 in LOG_SAMPLE_EVERY; the next record that gets through
+reports how many were suppressed.
+"""
+import atexit
+import json
 import logging
+import logging.handlers
+import os
+import queue
 import sys
+import threading
+import time
+from contextvars import ContextVar
+from datetime import datetime, timezone
+
+from app.config import config
+from app.utils.metrics import LOG_RECORDS_DROPPED_TOTAL
+
+TEXT_FORMAT = '%(asctime)s | %(levelname)s | %(name)s | %(message)s'
+
+# Bound per request by app.utils.tracing.new_request_id
+request_id_var: ContextVar[str] = ContextVar("request_id", default="-")
+
+
+class RequestContextFilter(logging.Filter):
+    """Stamp the request id on the caller's thread, before the record is queued."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Per-key rate limit, then 1-in-N sampling, for records tagged with `log_key`."""
+
+    def __init__(self, rate_limit: int, sample_every: int):
+        super().__init__()
+        self.rate_limit = rate_limit
+        self.sample_every = max(1, sample_every)
+        self._windows = {}  # log_key -> [window start, records in window, suppressed since last emit]
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        key = getattr(record, "log_key", None)
+        if key is None or record.levelno >= logging.WARNING:
+            return True
+        now = time.monotonic()
+        with self._lock:
+            window = self._windows.setdefault(key, [now, 0, 0])
+            if now - window[0] >= 1.0:
+                window[0], window[1] = now, 0
+            window[1] += 1
+            over = window[1] - self.rate_limit
+            if over > 0 and over % self.sample_every != 0:
+                window[2] += 1
+                return False
+            record.suppressed = window[2]
+            window[2] = 0
+        return True
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops (and counts) records instead of blocking when the queue is full."""
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_RECORDS_DROPPED_TOTAL.inc()
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "request_id": getattr(record, "request_id", "-"),
+            "thread": record.threadName,
+        }
+        if getattr(record, "log_key", None):
+            entry["log_key"] = record.log_key
+        if getattr(record, "suppressed", 0):
+            entry["suppressed"] = record.suppressed
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class TextFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        if getattr(record, "suppressed", 0):
+            line += f" (+{record.suppressed} similar suppressed)"
+        return line
+
+
+def _configure() -> logging.handlers.QueueListener:
+    stdout_handler = logging.StreamHandler(sys.stdout)
+    stdout_handler.setFormatter(JsonFormatter() if config.LOG_STDOUT_FORMAT == "json" else TextFormatter(TEXT_FORMAT))
+    handlers = [stdout_handler]
+
+    if config.LOG_FILE:
+        os.makedirs(os.path.dirname(config.LOG_FILE) or ".", exist_ok=True)
+        file_handler = logging.handlers.RotatingFileHandler(
+            config.LOG_FILE,
+            maxBytes=config.LOG_MAX_BYTES,
+            backupCount=config.LOG_BACKUP_COUNT,
+            encoding="utf-8",
+        )
+        file_handler.setFormatter(JsonFormatter())
+        handlers.append(file_handler)
+
+    queue_handler = DroppingQueueHandler(queue.Queue(maxsize=config.LOG_QUEUE_SIZE))
+    queue_handler.addFilter(RequestContextFilter())
+    queue_handler.addFilter(SamplingFilter(config.LOG_RATE_LIMIT, config.LOG_SAMPLE_EVERY))
+
+    root = logging.getLogger()
+    root.handlers = [queue_handler]
+    root.setLevel(config.LOG_LEVEL.upper())
+
+    listener = logging.handlers.QueueListener(queue_handler.queue, *handlers, respect_handler_level=True)
+    listener.start()
+    # Flush what is still queued on interpreter exit
+    atexit.register(listener.stop)
+    return listener
+
+
+_listener = _configure()
 
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s | %(levelname)s | %(name)s | %(message)s',
-    handlers=[
-        logging.StreamHandler(sys.stdout),
-        logging.FileHandler('./data/app.log')
-    ]
-)
 
 def get_logger(name):
     return logging.getLogger(name)
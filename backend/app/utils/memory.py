@@ -0,0 +1,239 @@
+# app/utils/memory.py
+"""
+Process-wide memory governor.
+
+Heavy residents of a worker (embedding model, Whisper weights, the global
+FAISS index, loaded per-video indexes, in-memory caches) register here with
+a size estimate, an optional eviction callback and a rebuild cost (seconds
+to load or recompute it again):
+
+    memory.register("index:abc", kind="index", size=nbytes, evict=drop, cost=0.04)
+    memory.touch("index:abc")         # on every use
+    memory.unregister("index:abc")    # when the owner drops it itself
+
+A governor thread compares the process RSS with MEMORY_BUDGET_MB (checked
+every MEMORY_CHECK_INTERVAL seconds and right after each registration).
+Over budget, it evicts residents until the projected RSS is under
+MEMORY_TARGET_RATIO of the budget, cheapest first: the lowest rebuild
+cost per MB, discounted the longer a resident has been idle. Residents used
+in the last MEMORY_MIN_IDLE seconds and those without an eviction callback
+(pinned) are never evicted.
+
+Eviction callbacks run on the governor thread without the governor lock
+held, so they may take their owner's locks. `/debug/memory` returns
+`report()`.
+"""
+import ctypes
+import gc
+import os
+import threading
+import time
+from typing import Callable, Optional, Union
+
+from app.config import config
+from app.utils.logger import get_logger
+from app.utils.metrics import MEMORY_EVICTIONS_TOTAL, MEMORY_RSS_BYTES
+
+logger = get_logger(__name__)
+
+MB = 1024 * 1024
+
+
+class Resident:
+    """One registered memory consumer."""
+
+    def __init__(self, name: str, kind: str, size: Union[int, Callable[[], int]], evict: Optional[Callable[[], None]], cost: float):
+        self.name = name
+        self.kind = kind
+        self.size = size
+        self.evict = evict
+        self.cost = cost
+        self.last_used = time.monotonic()
+
+    def nbytes(self) -> int:
+        try:
+            return int(self.size() if callable(self.size) else self.size)
+        except Exception:
+            return 0
+
+    def score(self, now: float) -> float:
+        """Rebuild seconds per MB, discounted by idle minutes; lowest is evicted first."""
+        idle_minutes = (now - self.last_used) / 60
+        return self.cost / max(self.nbytes() / MB, 1e-3) / (1 + idle_minutes)
+
+
+_residents: dict = {}
+_lock = threading.Lock()
+_wake = threading.Event()
+_thread = None
+_evictions = {}
+
+
+def rss_bytes() -> Optional[int]:
+    """Current resident set size of this process (Linux /proc), or None if unavailable."""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def register(name: str, kind: str, size: Union[int, Callable[[], int]], evict: Optional[Callable[[], None]] = None, cost: float = 1.0):
+    """
+    Register (or replace) a resident.
+
+    Args:
+        name: Unique name, e.g. "index:{video_id}"
+        kind: Group in the report ("index", "model", "cache", ...)
+        size: Estimated bytes, or a callable returning them (for growing caches)
+        evict: Frees the resident; None pins it (reported, never evicted)
+        cost: Estimated seconds to rebuild it after eviction
+    """
+    with _lock:
+        _residents[name] = Resident(name, kind, size, evict, cost)
+    _ensure_thread()
+    _wake.set()
+
+
+def unregister(name: str):
+    with _lock:
+        _residents.pop(name, None)
+
+
+def touch(name: str):
+    """Mark a resident as just used."""
+    with _lock:
+        resident = _residents.get(name)
+        if resident is not None:
+            resident.last_used = time.monotonic()
+
+
+def _release_freed_memory():
+    """Give freed heap back to the OS so RSS actually drops (glibc only; best effort)."""
+    gc.collect()
+    try:
+        ctypes.CDLL("libc.so.6").malloc_trim(0)
+    except (OSError, AttributeError):
+        pass
+
+
+def enforce() -> list:
+    """
+    Evict residents while the process is over budget.
+
+    Returns:
+        Names of the evicted residents
+    """
+    budget = config.MEMORY_BUDGET_MB * MB
+    rss = rss_bytes()
+    if rss is not None:
+        MEMORY_RSS_BYTES.set(rss)
+    if budget <= 0:
+        return []
+
+    with _lock:
+        residents = list(_residents.values())
+    if rss is None:
+        rss = sum(resident.nbytes() for resident in residents)
+    if rss <= budget:
+        return []
+
+    target = budget * config.MEMORY_TARGET_RATIO
+    now = time.monotonic()
+    candidates = sorted(
+        (r for r in residents if r.evict is not None and now - r.last_used >= config.MEMORY_MIN_IDLE),
+        key=lambda r: r.score(now),
+    )
+    evicted = []
+    projected = rss
+    for resident in candidates:
+        if projected <= target:
+            break
+        freed = resident.nbytes()
+        with _lock:
+            if _residents.get(resident.name) is not resident:
+                continue  # Dropped or replaced by its owner meanwhile
+            del _residents[resident.name]
+        try:
+            resident.evict()
+        except Exception as e:
+            logger.warning(f"✗ Evicting {resident.name} failed: {str(e)}")
+            continue
+        projected -= freed
+        evicted.append(resident.name)
+        MEMORY_EVICTIONS_TOTAL.labels(kind=resident.kind).inc()
+        with _lock:
+            _evictions[resident.kind] = _evictions.get(resident.kind, 0) + 1
+
+    if evicted:
+        _release_freed_memory()
+        after = rss_bytes()
+        if after is not None:
+            MEMORY_RSS_BYTES.set(after)
+        logger.warning(
+            f"Memory over budget ({rss / MB:.0f}MB > {budget / MB:.0f}MB): evicted {len(evicted)} "
+            f"residents ({', '.join(evicted[:5])}{'...' if len(evicted) > 5 else ''}), "
+            f"RSS now {(after or projected) / MB:.0f}MB"
+        )
+    elif projected > budget:
+        logger.warning(f"Memory over budget ({rss / MB:.0f}MB > {budget / MB:.0f}MB) with nothing evictable")
+    return evicted
+
+
+def _governor_loop():
+    while True:
+        _wake.wait(timeout=config.MEMORY_CHECK_INTERVAL)
+        _wake.clear()
+        try:
+            enforce()
+        except Exception as e:
+            logger.warning(f"✗ Memory governor check failed: {str(e)}")
+
+
+def _ensure_thread():
+    global _thread
+    if _thread is None and config.MEMORY_BUDGET_MB > 0:
+        with _lock:
+            if _thread is None:
+                _thread = threading.Thread(target=_governor_loop, name="memory-governor", daemon=True)
+                _thread.start()
+
+
+def report() -> dict:
+    """RSS, budget and the registered residents, largest first."""
+    rss = rss_bytes()
+    now = time.monotonic()
+    with _lock:
+        residents = list(_residents.values())
+        evictions = dict(_evictions)
+    rows = sorted(
+        (
+            {
+                "name": r.name,
+                "kind": r.kind,
+                "bytes": r.nbytes(),
+                "evictable": r.evict is not None,
+                "rebuild_cost_s": round(r.cost, 3),
+                "idle_s": round(now - r.last_used, 1),
+            }
+            for r in residents
+        ),
+        key=lambda row: row["bytes"],
+        reverse=True,
+    )
+    by_kind = {}
+    for row in rows:
+        by_kind[row["kind"]] = by_kind.get(row["kind"], 0) + row["bytes"]
+    registered = sum(row["bytes"] for row in rows)
+    budget = config.MEMORY_BUDGET_MB * MB
+    return {
+        "rss_bytes": rss,
+        "budget_bytes": budget or None,
+        "target_bytes": int(budget * config.MEMORY_TARGET_RATIO) if budget else None,
+        "registered_bytes": registered,
+        # Interpreter, libraries, request buffers and anything not registered
+        "unaccounted_bytes": rss - registered if rss is not None else None,
+        "by_kind": by_kind,
+        "evictions": evictions,
+        "residents": rows,
+    }
@@ -0,0 +1,181 @@
+# app/utils/metrics.py
+"""
+Prometheus metrics for the Klypse backend.
+
+All metrics live in one module so every service records into the same
+registry and `/metrics` can expose them in a single scrape.
+"""
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+
+# Buckets tuned for our pipeline: sub-100ms cache hits up to multi-minute Whisper runs
+STAGE_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+STAGE_SECONDS = Histogram(
+    "klypse_stage_seconds",
+    "Duration of pipeline stages (transcript tiers, embedding, FAISS, retrieval, LLM).",
+    ["stage", "outcome"],
+    buckets=STAGE_BUCKETS,
+)
+
+TRANSCRIPT_TIER_TOTAL = Counter(
+    "klypse_transcript_tier_total",
+    "Transcript tier attempts by tier and outcome.",
+    ["tier", "outcome"],
+)
+
+TRANSCRIPT_TIER_SECONDS = Histogram(
+    "klypse_transcript_tier_seconds",
+    "Wall time of transcript tier attempts by tier and outcome (tunes TRANSCRIPT_HEDGE_DELAY).",
+    ["tier", "outcome"],
+    buckets=STAGE_BUCKETS,
+)
+
+TRANSCRIPT_HEDGE_TOTAL = Counter(
+    "klypse_transcript_hedge_total",
+    "Hedged transcript fetches by result (captions_before_hedge: no download started, "
+    "captions_won: speculative download cancelled, audio: captions failed and the download was used).",
+    ["result"],
+)
+
+CACHE_REQUESTS_TOTAL = Counter(
+    "klypse_cache_requests_total",
+    "Cache lookups by cache name and result (hit/miss).",
+    ["cache", "result"],
+)
+
+LLM_TIME_TO_FIRST_TOKEN = Histogram(
+    "klypse_llm_time_to_first_token_seconds",
+    "Time from LLM call start to the first generated token.",
+    buckets=STAGE_BUCKETS,
+)
+
+ANSWER_TIME_TO_FIRST_FRAME = Histogram(
+    "klypse_answer_time_to_first_frame_seconds",
+    "Time from request arrival to the first answer frame sent over SSE.",
+    ["path"],
+    buckets=STAGE_BUCKETS,
+)
+
+ASK_REQUESTS_TOTAL = Counter(
+    "klypse_ask_requests_total",
+    "Questions received by endpoint and vectorstore state.",
+    ["endpoint", "vectorstore"],
+)
+
+ANSWER_STREAM_FRAMES = Histogram(
+    "klypse_answer_stream_frames",
+    "SSE events per /ask/stream answer (after word coalescing).",
+    buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500),
+)
+
+ANSWER_STREAM_RESUMES_TOTAL = Counter(
+    "klypse_answer_stream_resumes_total",
+    "Reconnects with Last-Event-ID by result (hit: resumed from buffer, miss: recomputed).",
+    ["result"],
+)
+
+PREFETCH_TOTAL = Counter(
+    "klypse_prefetch_total",
+    "Speculative ingestions after /check by outcome "
+    "(queued, dropped, stale, ingested, skipped, cancelled, failed, unused).",
+    ["outcome"],
+)
+
+PREFETCH_FIRST_QUESTION_TOTAL = Counter(
+    "klypse_prefetch_first_question_total",
+    "First question for a prefetched video by prefetch state "
+    "(ready: index already built, running: joined in-flight prefetch, queued: prefetch never started).",
+    ["result"],
+)
+
+PREFETCH_LEAD_SECONDS = Histogram(
+    "klypse_prefetch_lead_seconds",
+    "Time between a prefetch finishing and the first question for that video.",
+    buckets=STAGE_BUCKETS,
+)
+
+LOCAL_WHISPER_REALTIME_FACTOR = Histogram(
+    "klypse_local_whisper_realtime_factor",
+    "Local Whisper processing time divided by audio duration, by engine.",
+    ["engine"],
+    buckets=(0.01, 0.02, 0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1, 1.5, 2, 5),
+)
+
+DEDUP_CHECKS_TOTAL = Counter(
+    "klypse_dedup_checks_total",
+    "Near-duplicate transcript checks at ingestion by result "
+    "(duplicate: aliased an existing index, unique: indexed, skipped: too short to compare).",
+    ["result"],
+)
+
+EXTRACTIVE_ANSWERS_TOTAL = Counter(
+    "klypse_extractive_answers_total",
+    "Extractive fast-path attempts on /ask/stream by result "
+    "(answered: span returned without the LLM, fallback: low confidence, skipped: not a lookup question).",
+    ["result"],
+)
+
+EXTRACTIVE_LATENCY_SAVED_SECONDS = Histogram(
+    "klypse_extractive_latency_saved_seconds",
+    "Estimated LLM time avoided per extractive answer (moving average of RetrievalQA latency minus extraction time).",
+    buckets=STAGE_BUCKETS,
+)
+
+LOG_RECORDS_DROPPED_TOTAL = Counter(
+    "klypse_log_records_dropped_total",
+    "Log records dropped because the logging queue was full.",
+)
+
+MEMORY_RSS_BYTES = Gauge(
+    "klypse_memory_rss_bytes",
+    "Worker resident set size at the last memory governor check.",
+)
+
+MEMORY_EVICTIONS_TOTAL = Counter(
+    "klypse_memory_evictions_total",
+    "Residents evicted by the memory governor by kind (index, global_index, model, cache).",
+    ["kind"],
+)
+
+
+DISPATCH_REQUESTS_TOTAL = Counter(
+    "klypse_dispatch_requests_total",
+    "Dispatcher requests by route: affinity (owning worker), spill (next worker on the ring), "
+    "overflow (least loaded), unkeyed (no video_id) or unavailable.",
+    ["route"],
+)
+
+DISPATCH_REBALANCE_TOTAL = Counter(
+    "klypse_dispatch_rebalance_total",
+    "Workers joining or leaving the dispatcher's hash ring.",
+    ["event"],
+)
+
+DISPATCH_WORKER_IN_FLIGHT = Gauge(
+    "klypse_dispatch_worker_in_flight",
+    "Requests the dispatcher has in flight per worker.",
+    ["worker"],
+)
+
+DISPATCH_WORKER_CACHE_HIT_RATIO = Gauge(
+    "klypse_dispatch_worker_cache_hit_ratio",
+    "Cache hit ratio per worker and cache, scraped from the workers' klypse_cache_requests_total.",
+    ["worker", "cache"],
+)
+
+
+def record_cache(cache: str, hit: bool):
+    """Count a cache lookup as a hit or miss."""
+    CACHE_REQUESTS_TOTAL.labels(cache=cache, result="hit" if hit else "miss").inc()
+
+
+def record_transcript_tier(tier: str, outcome: str, seconds: float = None):
+    """Count a transcript tier attempt (outcome: success / empty / error / skipped / cancelled) and its duration."""
+    TRANSCRIPT_TIER_TOTAL.labels(tier=tier, outcome=outcome).inc()
+    if seconds is not None:
+        TRANSCRIPT_TIER_SECONDS.labels(tier=tier, outcome=outcome).observe(seconds)
+
+
+def render_metrics() -> tuple[bytes, str]:
+    """Return the exposition payload and its content type."""
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -0,0 +1,73 @@
+# app/utils/startup.py
+"""
+Startup timing and readiness.
+
+Heavy dependencies (torch, Whisper, the embedding model, the Groq client)
+are loaded lazily, and warm-up runs after the server is already accepting
+connections. This module records how long each import/warm-up phase took
+and whether the worker is ready:
+
+    - liveness  (`/health`, `/health/live`): the process is up
+    - readiness (`/health/ready`): warm-up finished, first requests won't pay
+      for model loading
+
+For a per-module breakdown of import time, run:
+    python -X importtime -c "import app.main" 2> importtime.log
+"""
+import threading
+import time
+from contextlib import contextmanager
+
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class StartupReport:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.created = time.perf_counter()
+        self.phases = []
+        self.ready = False
+        self.ready_after = None
+        self.error = None
+
+    @contextmanager
+    def phase(self, name: str):
+        """Time one import or warm-up phase."""
+        start = time.perf_counter()
+        status = "ok"
+        try:
+            yield
+        except Exception as e:
+            status = f"error: {str(e)}"
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.phases.append({"phase": name, "seconds": round(elapsed, 3), "status": status})
+            logger.info(f"startup phase={name} duration_ms={elapsed * 1000:.1f} status={status}")
+
+    def mark_ready(self, error: str = None):
+        with self._lock:
+            self.ready = error is None
+            self.error = error
+            self.ready_after = round(time.perf_counter() - self.created, 3)
+        slowest = sorted(self.phases, key=lambda p: p["seconds"], reverse=True)
+        summary = ", ".join(f"{p['phase']}={p['seconds']}s" for p in slowest)
+        if error:
+            logger.error(f"✗ Warm-up failed after {self.ready_after}s: {error} ({summary})")
+        else:
+            logger.info(f"✓ Ready after {self.ready_after}s — slowest phases: {summary}")
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            return {
+                "ready": self.ready,
+                "ready_after_seconds": self.ready_after,
+                "error": self.error,
+                "phases": list(self.phases),
+            }
+
+
+startup_report = StartupReport()
@@ -0,0 +1,130 @@
+# app/utils/tracing.py
+"""
+Lightweight timing spans linked by a per-request id.
+
+Usage:
+    with stage("transcript.captions", lang="en"):
+        ...
+
+Each span observes `klypse_stage_seconds` and logs one structured line:
+    span stage=transcript.captions outcome=ok duration_ms=412.3 request_id=... lang=en
+"""
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+from langchain.callbacks.base import BaseCallbackHandler
+
+from app.utils.logger import get_logger, request_id_var
+from app.utils.metrics import LLM_TIME_TO_FIRST_TOKEN, STAGE_SECONDS
+
+logger = get_logger(__name__)
+
+def new_request_id(incoming: Optional[str] = None) -> str:
+    """Bind a request id to the current context (reusing the client's if sent)."""
+    request_id = incoming or uuid.uuid4().hex[:16]
+    request_id_var.set(request_id)
+    return request_id
+
+
+def get_request_id() -> str:
+    return request_id_var.get()
+
+
+@contextmanager
+def stage(name: str, **fields: Any):
+    """
+    Time a pipeline stage.
+
+    The outcome label is 'ok' unless the block raises, in which case it is
+    'error' and the exception propagates unchanged.
+    """
+    start = time.perf_counter()
+    outcome = "ok"
+    try:
+        yield
+    except BaseException:
+        outcome = "error"
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.labels(stage=name, outcome=outcome).observe(elapsed)
+        extra = " ".join(f"{k}={v}" for k, v in fields.items())
+        logger.info(
+            f"span stage={name} outcome={outcome} duration_ms={elapsed * 1000:.1f} "
+            f"request_id={get_request_id()} {extra}".rstrip(),
+            extra={"log_key": f"span.{name}"},
+        )
+
+
+def record_stage(name: str, seconds: float, outcome: str = "ok"):
+    """Observe a stage duration measured elsewhere (e.g. inside a callback)."""
+    STAGE_SECONDS.labels(stage=name, outcome=outcome).observe(seconds)
+    logger.info(
+        f"span stage={name} outcome={outcome} duration_ms={seconds * 1000:.1f} "
+        f"request_id={get_request_id()}",
+        extra={"log_key": f"span.{name}"},
+    )
+
+
+class StageTimingCallback(BaseCallbackHandler):
+    """
+    LangChain callback that splits a RetrievalQA run into spans.
+
+    Records `qa.retrieval` (retriever start → end), `qa.generation`
+    (LLM start → end) and LLM time-to-first-token. TTFT requires the LLM to
+    be created with streaming enabled; otherwise the first token is counted
+    when generation finishes.
+    """
+
+    def __init__(self):
+        self._retrieval_start: Dict[Any, float] = {}
+        self._llm_start: Dict[Any, float] = {}
+        self._first_token_seen: set = set()
+
+    def on_retriever_start(self, serialized: Dict[str, Any], query: str, *, run_id, **kwargs):
+        self._retrieval_start[run_id] = time.perf_counter()
+
+    def on_retriever_end(self, documents: List[Any], *, run_id, **kwargs):
+        start = self._retrieval_start.pop(run_id, None)
+        if start is not None:
+            record_stage("qa.retrieval", time.perf_counter() - start)
+
+    def on_retriever_error(self, error: BaseException, *, run_id, **kwargs):
+        start = self._retrieval_start.pop(run_id, None)
+        if start is not None:
+            record_stage("qa.retrieval", time.perf_counter() - start, outcome="error")
+
+    def _start_llm(self, run_id):
+        self._llm_start[run_id] = time.perf_counter()
+
+    def on_llm_start(self, serialized: Dict[str, Any], prompts: List[str], *, run_id, **kwargs):
+        self._start_llm(run_id)
+
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages: List[Any], *, run_id, **kwargs):
+        self._start_llm(run_id)
+
+    def on_llm_new_token(self, token: str, *, run_id, **kwargs):
+        if run_id in self._first_token_seen:
+            return
+        start = self._llm_start.get(run_id)
+        if start is not None:
+            self._first_token_seen.add(run_id)
+            LLM_TIME_TO_FIRST_TOKEN.observe(time.perf_counter() - start)
+
+    def on_llm_end(self, response: Any, *, run_id, **kwargs):
+        start = self._llm_start.pop(run_id, None)
+        if start is None:
+            return
+        elapsed = time.perf_counter() - start
+        if run_id not in self._first_token_seen:
+            LLM_TIME_TO_FIRST_TOKEN.observe(elapsed)
+        self._first_token_seen.discard(run_id)
+        record_stage("qa.generation", elapsed)
+
+    def on_llm_error(self, error: BaseException, *, run_id, **kwargs):
+        start = self._llm_start.pop(run_id, None)
+        self._first_token_seen.discard(run_id)
+        if start is not None:
+            record_stage("qa.generation", time.perf_counter() - start, outcome="error")
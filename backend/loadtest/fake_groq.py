@@ -0,0 +1,168 @@
+# loadtest/fake_groq.py
+"""
+Local stand-in for the Groq API, for load tests.
+
+Serves the two endpoints the backend uses, with configurable latency:
+
+    POST /openai/v1/chat/completions        streaming (SSE) and non-streaming
+    POST /openai/v1/audio/transcriptions    Whisper; returns fixture-like text
+
+Point the backend at it with GROQ_BASE_URL=http://127.0.0.1:<port>.
+
+Examples:
+    python -m loadtest.fake_groq --port 8100 --ttft 0.35 --tps 250 --tokens 180
+    python -m loadtest.fake_groq --error-rate 0.05     # 5% of calls answer 429
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+import uuid
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+
+WORDS = (
+    "the video explains how the speaker approaches the problem step by step and "
+    "highlights the main trade offs with concrete examples from the transcript"
+).split()
+
+app = FastAPI(title="Fake Groq")
+
+
+def _setting(name: str, default: float) -> float:
+    return float(os.environ.get(f"FAKE_GROQ_{name}", default))
+
+
+def _rate_limit_headers() -> dict:
+    # Generous budget so the backend's scheduler is not the bottleneck being measured
+    return {
+        "x-ratelimit-limit-requests": "100000",
+        "x-ratelimit-remaining-requests": "99999",
+        "x-ratelimit-reset-requests": "1s",
+        "x-ratelimit-limit-tokens": "100000000",
+        "x-ratelimit-remaining-tokens": "99999999",
+        "x-ratelimit-reset-tokens": "1s",
+    }
+
+
+def _maybe_rate_limited():
+    if random.random() < _setting("ERROR_RATE", 0.0):
+        return JSONResponse(
+            {"error": {"message": "Rate limit reached (fake)", "type": "tokens", "code": "rate_limit_exceeded"}},
+            status_code=429,
+            headers={**_rate_limit_headers(), "retry-after": "1"},
+        )
+    return None
+
+
+def _completion_tokens(max_tokens: int) -> list:
+    count = min(int(_setting("TOKENS", 150)), max_tokens or 1024)
+    return [WORDS[i % len(WORDS)] + " " for i in range(count)]
+
+
+@app.post("/openai/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    limited = _maybe_rate_limited()
+    if limited:
+        return limited
+
+    tokens = _completion_tokens(body.get("max_tokens"))
+    prompt_tokens = sum(len(str(m.get("content", "")).split()) for m in body.get("messages", []))
+    completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+    created = int(time.time())
+    model = body.get("model", "fake-model")
+    ttft = _setting("TTFT", 0.3)
+    tps = max(1.0, _setting("TPS", 250))
+    usage = {"prompt_tokens": prompt_tokens, "completion_tokens": len(tokens), "total_tokens": prompt_tokens + len(tokens)}
+
+    if not body.get("stream"):
+        await asyncio.sleep(ttft + len(tokens) / tps)
+        return JSONResponse(
+            {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": "".join(tokens).strip()},
+                    "finish_reason": "stop",
+                }],
+                "usage": usage,
+            },
+            headers=_rate_limit_headers(),
+        )
+
+    def chunk(delta: dict, finish_reason=None, **extra) -> str:
+        payload = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": created,
+            "model": model,
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            **extra,
+        }
+        return f"data: {json.dumps(payload)}\n\n"
+
+    async def stream():
+        await asyncio.sleep(ttft)
+        yield chunk({"role": "assistant", "content": ""})
+        # Sleep per batch of tokens rather than per token to keep timer overhead out of the numbers
+        batch = max(1, int(tps / 50))
+        for i in range(0, len(tokens), batch):
+            yield chunk({"content": "".join(tokens[i:i + batch])})
+            await asyncio.sleep(len(tokens[i:i + batch]) / tps)
+        yield chunk({}, finish_reason="stop", x_groq={"usage": usage})
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(stream(), media_type="text/event-stream", headers=_rate_limit_headers())
+
+
+@app.post("/openai/v1/audio/transcriptions")
+async def audio_transcriptions(request: Request):
+    form = await request.form()
+    limited = _maybe_rate_limited()
+    if limited:
+        return limited
+
+    upload = form.get("file")
+    size = len(await upload.read()) if upload is not None else 0
+    # Roughly proportional to the upload, like the real service
+    await asyncio.sleep(_setting("AUDIO_LATENCY", 1.0) + size / (1024 * 1024) * _setting("AUDIO_SECONDS_PER_MB", 0.5))
+    text = " ".join(WORDS[i % len(WORDS)] for i in range(int(_setting("AUDIO_WORDS", 1500))))
+
+    if form.get("response_format") == "text":
+        return PlainTextResponse(text, headers=_rate_limit_headers())
+    return JSONResponse({"text": text}, headers=_rate_limit_headers())
+
+
+def main(argv=None):
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Fake Groq API for load tests.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--ttft", type=float, default=0.3, help="Seconds before the first token")
+    parser.add_argument("--tps", type=float, default=250, help="Generated tokens per second")
+    parser.add_argument("--tokens", type=int, default=150, help="Tokens per completion")
+    parser.add_argument("--audio-latency", type=float, default=1.0, help="Base seconds per transcription")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of calls answered with 429")
+    args = parser.parse_args(argv)
+
+    # Settings travel through the environment so they also apply under `uvicorn loadtest.fake_groq:app`
+    os.environ.update({
+        "FAKE_GROQ_TTFT": str(args.ttft),
+        "FAKE_GROQ_TPS": str(args.tps),
+        "FAKE_GROQ_TOKENS": str(args.tokens),
+        "FAKE_GROQ_AUDIO_LATENCY": str(args.audio_latency),
+        "FAKE_GROQ_ERROR_RATE": str(args.error_rate),
+    })
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
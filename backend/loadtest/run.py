@@ -0,0 +1,440 @@
+# loadtest/run.py
+"""
+End-to-end load test for `/ask/stream`.
+
+Drives the FastAPI app over HTTP with a mix of hot (already ingested) and
+cold (first question ever) videos at one or more concurrency levels, and
+reports time-to-first-token (first answer frame), total latency and
+throughput. Results are saved as JSON and compared with the previous run.
+
+By default (`--spawn`) everything runs locally:
+    - loadtest.fake_groq on --groq-port (configurable TTFT / tokens per second)
+    - the backend via uvicorn on --port, in a scratch directory, with
+      GROQ_BASE_URL pointing at the fake and TRANSCRIPT_FIXTURE_DIR at
+      generated fixture transcripts (or audio files for the Whisper tier)
+The embedding model and FAISS are real, so retrieval cost is measured.
+
+Examples:
+    python -m loadtest.run -c 1 4 16 -n 200 --hot-ratio 0.8
+    python -m loadtest.run -c 8 --cold-source audio --groq-ttft 0.6 --groq-tps 120
+    python -m loadtest.run --no-spawn --url http://127.0.0.1:8000 --fixture-dir /srv/fixtures
+    python -m loadtest.run --compare loadtest/results/20250101-120000.json
+"""
+import argparse
+import asyncio
+import glob
+import json
+import os
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURES_DIR = os.path.join(BACKEND_DIR, "loadtest", "fixtures")
+RESULTS_DIR = os.path.join(BACKEND_DIR, "loadtest", "results")
+
+# Frames the backend sends before the answer itself (cold path progress)
+STATUS_PREFIXES = ("🔄", "🧠", "✅")
+ERROR_PREFIX = "❌"
+
+HISTOGRAM_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 30, 60)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test /ask/stream with local Groq and YouTube stand-ins.")
+    parser.add_argument("-c", "--concurrency", type=int, nargs="+", default=[1, 4, 16],
+                        help="Concurrent users per level (default: 1 4 16)")
+    parser.add_argument("-n", "--requests", type=int, default=100, help="Requests per concurrency level")
+    parser.add_argument("--hot-ratio", type=float, default=0.8, help="Share of requests for already-ingested videos")
+    parser.add_argument("--hot-videos", type=int, default=5, help="Distinct hot videos (warmed before measuring)")
+    parser.add_argument("--cold-source", choices=["text", "audio"], default="text",
+                        help="Cold videos resolve to fixture text, or to audio sent through Groq Whisper")
+    parser.add_argument("--questions", default=os.path.join(FIXTURES_DIR, "questions.txt"))
+    parser.add_argument("--transcript", default=os.path.join(FIXTURES_DIR, "transcript.txt"),
+                        help="Seed transcript; every video gets a shuffled copy")
+    parser.add_argument("--seed", type=int, default=1)
+
+    parser.add_argument("--spawn", dest="spawn", action="store_true", default=True,
+                        help="Start the fake Groq server and the backend locally (default)")
+    parser.add_argument("--no-spawn", dest="spawn", action="store_false",
+                        help="Use an already running backend at --url")
+    parser.add_argument("--url", default=None, help="Backend base URL (default: spawned backend)")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers for the spawned backend")
+    parser.add_argument("--fixture-dir", default=None,
+                        help="With --no-spawn: the server's TRANSCRIPT_FIXTURE_DIR, where fixtures are written")
+    parser.add_argument("--transcript-latency", type=float, default=0.5, help="Simulated transcript fetch seconds")
+    parser.add_argument("--groq-port", type=int, default=8100)
+    parser.add_argument("--groq-ttft", type=float, default=0.3)
+    parser.add_argument("--groq-tps", type=float, default=250)
+    parser.add_argument("--groq-tokens", type=int, default=150)
+    parser.add_argument("--groq-error-rate", type=float, default=0.0)
+
+    parser.add_argument("--timeout", type=float, default=300, help="Per-request timeout (seconds)")
+    parser.add_argument("--label", default="", help="Free-form label stored with the results")
+    parser.add_argument("--compare", default="latest",
+                        help="Previous results file to compare against ('latest', a path, or 'none')")
+    parser.add_argument("--json", action="store_true", help="Print the full results as JSON")
+    return parser.parse_args(argv)
+
+
+# ---- FIXTURES ----
+
+def _video_ids(prefix: str, count: int, tag: str) -> list:
+    # 11 characters, like real YouTube IDs
+    return [f"{prefix}{tag}{n:06d}"[:11] for n in range(count)]
+
+
+def write_fixtures(fixture_dir: str, transcript_path: str, video_ids: list, cold_ids: list, cold_source: str, seed: int):
+    """One shuffled transcript per video, so no two videos share a transcript."""
+    os.makedirs(fixture_dir, exist_ok=True)
+    with open(transcript_path, "r", encoding="utf-8") as f:
+        paragraphs = [p for p in f.read().split("\n") if p.strip()]
+
+    for video_id in video_ids:
+        if cold_source == "audio" and video_id in cold_ids:
+            # Content is irrelevant to the fake Whisper endpoint; the size drives its latency
+            with open(os.path.join(fixture_dir, f"{video_id}.ogg"), "wb") as f:
+                f.write(os.urandom(256 * 1024))
+            continue
+        rng = random.Random(f"{seed}-{video_id}")
+        shuffled = paragraphs[:]
+        rng.shuffle(shuffled)
+        with open(os.path.join(fixture_dir, f"{video_id}.txt"), "w", encoding="utf-8") as f:
+            f.write(f"Video {video_id}.\n" + "\n".join(shuffled))
+
+
+# ---- PROCESSES ----
+
+def _wait_for(url: str, timeout: float, ok_statuses=(200,)):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(url, timeout=2.0).status_code in ok_statuses:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    raise TimeoutError(f"{url} not ready after {timeout:.0f}s")
+
+
+def spawn_stack(args, workdir: str, fixture_dir: str) -> list:
+    """Start the fake Groq server and the backend; returns the processes."""
+    groq = subprocess.Popen(
+        [sys.executable, "-m", "loadtest.fake_groq", "--port", str(args.groq_port),
+         "--ttft", str(args.groq_ttft), "--tps", str(args.groq_tps), "--tokens", str(args.groq_tokens),
+         "--error-rate", str(args.groq_error_rate)],
+        cwd=BACKEND_DIR,
+    )
+
+    os.makedirs(os.path.join(workdir, "data"), exist_ok=True)
+    env = {
+        **os.environ,
+        "PYTHONPATH": BACKEND_DIR,
+        "GROQ_API_KEY": "fake-key",
+        "GROQ_BASE_URL": f"http://127.0.0.1:{args.groq_port}",
+        # The fake server advertises huge limits; keep the client budget out of the way too
+        "GROQ_RPM": "100000",
+        "GROQ_TPM": "100000000",
+        "GROQ_AUDIO_RPM": "100000",
+        "GROQ_MAX_QUEUED": "100000",
+        "GROQ_MAX_QUEUED_PER_KEY": "100000",
+        "TRANSCRIPT_FIXTURE_DIR": fixture_dir,
+        "TRANSCRIPT_FIXTURE_LATENCY": str(args.transcript_latency),
+        "CACHE_PATH": "./data/cache",
+        "CHROMA_DB_PATH": "./data/faiss",
+    }
+    backend = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(args.port),
+         "--workers", str(args.workers), "--log-level", "warning"],
+        cwd=workdir,
+        env=env,
+    )
+    processes = [groq, backend]
+    try:
+        _wait_for(f"http://127.0.0.1:{args.groq_port}/docs", 30)
+        _wait_for(f"http://127.0.0.1:{args.port}/health/ready", 300)
+    except Exception:
+        stop_stack(processes)
+        raise
+    return processes
+
+
+def stop_stack(processes: list):
+    for process in processes:
+        process.terminate()
+    for process in processes:
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+# ---- LOAD ----
+
+async def ask_once(client: httpx.AsyncClient, url: str, video_id: str, question: str, kind: str) -> dict:
+    start = time.perf_counter()
+    result = {"kind": kind, "video_id": video_id, "status": "ok", "ttft": None, "total": None, "frames": 0, "bytes": 0}
+    try:
+        async with client.stream("POST", f"{url}/ask/stream", json={"video_id": video_id, "question": question}) as response:
+            if response.status_code == 429:
+                result["status"] = "rejected"
+                return result
+            if response.status_code != 200:
+                result["status"] = f"http_{response.status_code}"
+                return result
+            buffer = ""
+            async for text in response.aiter_text():
+                result["bytes"] += len(text.encode("utf-8"))
+                buffer += text
+                *events, buffer = buffer.split("\n\n")
+                for event in events:
+                    data = next((line[6:] for line in event.split("\n") if line.startswith("data: ")), None)
+                    if data is None:
+                        continue
+                    result["frames"] += 1
+                    if data == "[END]":
+                        result["total"] = time.perf_counter() - start
+                        return result
+                    if data.startswith(ERROR_PREFIX):
+                        result["status"] = "error"
+                    elif not data.startswith(STATUS_PREFIXES) and result["ttft"] is None:
+                        result["ttft"] = time.perf_counter() - start
+        result["status"] = "truncated"
+    except (httpx.HTTPError, asyncio.TimeoutError) as e:
+        result["status"] = f"exception:{type(e).__name__}"
+    result["total"] = time.perf_counter() - start
+    return result
+
+
+async def run_level(url: str, concurrency: int, total: int, hot_ids: list, cold_ids: list, questions: list,
+                    hot_ratio: float, rng: random.Random, timeout: float) -> tuple:
+    """Run `total` requests with `concurrency` users; cold IDs are consumed (each is cold once)."""
+    plan = []
+    for _ in range(total):
+        if cold_ids and rng.random() >= hot_ratio:
+            plan.append((cold_ids.pop(), "cold"))
+        else:
+            plan.append((rng.choice(hot_ids), "hot"))
+    plan = [(video_id, kind, rng.choice(questions)) for video_id, kind in plan]
+
+    results = []
+    queue = asyncio.Queue()
+    for item in plan:
+        queue.put_nowait(item)
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(timeout=httpx.Timeout(timeout, connect=10.0), limits=limits) as client:
+        async def user():
+            while not queue.empty():
+                video_id, kind, question = queue.get_nowait()
+                results.append(await ask_once(client, url, video_id, question, kind))
+
+        start = time.perf_counter()
+        await asyncio.gather(*(user() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    return results, elapsed
+
+
+async def warm_hot_videos(url: str, hot_ids: list, timeout: float):
+    async with httpx.AsyncClient(timeout=timeout) as client:
+        async with client.stream("POST", f"{url}/warm", json={"video_ids": hot_ids, "parallelism": 4}) as response:
+            response.raise_for_status()
+            async for _ in response.aiter_text():
+                pass
+
+
+# ---- REPORTING ----
+
+def percentile(values: list, q: float):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(q / 100 * (len(ordered) - 1))))
+    return round(ordered[index], 4)
+
+
+def latency_stats(values: list) -> dict:
+    return {
+        "count": len(values),
+        "mean": round(statistics.mean(values), 4) if values else None,
+        "p50": percentile(values, 50),
+        "p90": percentile(values, 90),
+        "p99": percentile(values, 99),
+        "max": round(max(values), 4) if values else None,
+    }
+
+
+def histogram(values: list) -> dict:
+    counts = {f"<={bound}s": 0 for bound in HISTOGRAM_BUCKETS}
+    counts[f">{HISTOGRAM_BUCKETS[-1]}s"] = 0
+    for value in values:
+        for bound in HISTOGRAM_BUCKETS:
+            if value <= bound:
+                counts[f"<={bound}s"] += 1
+                break
+        else:
+            counts[f">{HISTOGRAM_BUCKETS[-1]}s"] += 1
+    return counts
+
+
+def summarize_level(concurrency: int, results: list, elapsed: float) -> dict:
+    ok = [r for r in results if r["status"] == "ok"]
+    ttft = [r["ttft"] for r in ok if r["ttft"] is not None]
+    statuses = {}
+    for r in results:
+        statuses[r["status"]] = statuses.get(r["status"], 0) + 1
+    by_kind = {
+        kind: latency_stats([r["ttft"] for r in ok if r["kind"] == kind and r["ttft"] is not None])
+        for kind in ("hot", "cold")
+    }
+    return {
+        "concurrency": concurrency,
+        "requests": len(results),
+        "statuses": statuses,
+        "elapsed_seconds": round(elapsed, 2),
+        "throughput_rps": round(len(ok) / elapsed, 3) if elapsed > 0 else 0.0,
+        "ttft": latency_stats(ttft),
+        "ttft_by_kind": by_kind,
+        "total": latency_stats([r["total"] for r in ok if r["total"] is not None]),
+        "ttft_histogram": histogram(ttft),
+        "frames_mean": round(statistics.mean(r["frames"] for r in ok), 1) if ok else None,
+        "bytes_mean": round(statistics.mean(r["bytes"] for r in ok), 1) if ok else None,
+    }
+
+
+def print_level(level: dict):
+    ttft = level["ttft"]
+    print(
+        f"\nconcurrency={level['concurrency']}  requests={level['requests']}  "
+        f"throughput={level['throughput_rps']} req/s  statuses={level['statuses']}"
+    )
+    print(f"  TTFT  p50={ttft['p50']}s  p90={ttft['p90']}s  p99={ttft['p99']}s  max={ttft['max']}s")
+    for kind, stats in level["ttft_by_kind"].items():
+        if stats["count"]:
+            print(f"    {kind:<4}  n={stats['count']:<5} p50={stats['p50']}s  p99={stats['p99']}s")
+    peak = max(level["ttft_histogram"].values()) or 1
+    for bucket, count in level["ttft_histogram"].items():
+        print(f"  {bucket:>8} | {'#' * round(40 * count / peak):<40} {count}")
+
+
+def _git_revision() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, text=True).strip()
+    except Exception:
+        return "unknown"
+
+
+def load_previous(compare: str, exclude: str = None):
+    if compare == "none":
+        return None
+    if compare == "latest":
+        runs = sorted(p for p in glob.glob(os.path.join(RESULTS_DIR, "*.json")) if p != exclude)
+        if not runs:
+            return None
+        compare = runs[-1]
+    with open(compare, "r", encoding="utf-8") as f:
+        previous = json.load(f)
+    previous["_path"] = compare
+    return previous
+
+
+def _delta(new, old) -> str:
+    if new is None or old is None:
+        return "n/a"
+    if old == 0:
+        return f"{new}"
+    return f"{new} ({(new - old) / old * 100:+.1f}%)"
+
+
+def print_comparison(current: dict, previous: dict):
+    print(f"\nCompared with {previous['_path']} ({previous.get('git_revision')}, {previous.get('label') or 'no label'}):")
+    old_levels = {level["concurrency"]: level for level in previous["levels"]}
+    for level in current["levels"]:
+        old = old_levels.get(level["concurrency"])
+        if old is None:
+            print(f"  concurrency={level['concurrency']}: no previous data")
+            continue
+        print(
+            f"  concurrency={level['concurrency']}: "
+            f"TTFT p50 {_delta(level['ttft']['p50'], old['ttft']['p50'])}, "
+            f"p99 {_delta(level['ttft']['p99'], old['ttft']['p99'])}, "
+            f"throughput {_delta(level['throughput_rps'], old['throughput_rps'])} req/s"
+        )
+    print(f"  saturation throughput {_delta(current['saturation_rps'], previous.get('saturation_rps'))} req/s")
+
+
+# ---- MAIN ----
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    rng = random.Random(args.seed)
+    with open(args.questions, "r", encoding="utf-8") as f:
+        questions = [line.strip() for line in f if line.strip()]
+
+    tag = f"{int(time.time()) % 10000:04d}"
+    hot_ids = _video_ids("H", args.hot_videos, tag)
+    cold_budget = sum(round(args.requests * (1 - args.hot_ratio)) + 5 for _ in args.concurrency)
+    cold_ids = _video_ids("C", cold_budget, tag)
+
+    workdir = tempfile.mkdtemp(prefix="loadtest-")
+    fixture_dir = args.fixture_dir or os.path.join(workdir, "fixtures")
+    processes = []
+    try:
+        write_fixtures(fixture_dir, args.transcript, hot_ids + cold_ids, set(cold_ids), args.cold_source, args.seed)
+        if args.spawn:
+            print(f"Starting fake Groq (:{args.groq_port}) and backend (:{args.port}) in {workdir} ...", file=sys.stderr)
+            processes = spawn_stack(args, workdir, fixture_dir)
+        url = args.url or f"http://127.0.0.1:{args.port}"
+
+        print(f"Warming {len(hot_ids)} hot videos ...", file=sys.stderr)
+        asyncio.run(warm_hot_videos(url, hot_ids, args.timeout))
+
+        levels = []
+        for concurrency in args.concurrency:
+            print(f"Running {args.requests} requests at concurrency {concurrency} ...", file=sys.stderr)
+            results, elapsed = asyncio.run(run_level(
+                url, concurrency, args.requests, hot_ids, cold_ids, questions, args.hot_ratio, rng, args.timeout
+            ))
+            levels.append(summarize_level(concurrency, results, elapsed))
+    finally:
+        stop_stack(processes)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "git_revision": _git_revision(),
+        "label": args.label,
+        "settings": {k: v for k, v in vars(args).items() if k not in ("json", "compare")},
+        "levels": levels,
+        "saturation_rps": max(level["throughput_rps"] for level in levels),
+    }
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    path = os.path.join(RESULTS_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}.json")
+    previous = load_previous(args.compare, exclude=path)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        for level in levels:
+            print_level(level)
+        print(f"\nSaturation throughput: {report['saturation_rps']} req/s")
+    if previous:
+        print_comparison(report, previous)
+    print(f"\nSaved {path}", file=sys.stderr)
+
+    failed = sum(n for level in levels for status, n in level["statuses"].items() if status != "ok")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,20 @@
+"""
+Shared test setup.
+
+Settings are read when `app.config` is first imported, so the required ones
+are set here, and the working directory moves to a scratch directory because
+every store resolves its "./data/..." paths against it.
+"""
+import os
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRATCH_DIR = tempfile.mkdtemp(prefix="klypse-tests-")
+
+sys.path.insert(0, BACKEND_DIR)
+os.environ.setdefault("GROQ_API_KEY", "test-key")
+os.environ.setdefault("CHROMA_DB_PATH", os.path.join(SCRATCH_DIR, "chroma"))
+os.environ.setdefault("CACHE_PATH", os.path.join(SCRATCH_DIR, "cache"))
+os.environ.setdefault("LOG_FILE", "")
+os.chdir(SCRATCH_DIR)
@@ -0,0 +1,200 @@
+"""Artifact store backends, content addressing and the read-through paths that use them."""
+import io
+import os
+import shutil
+
+import pytest
+
+from app.config import config
+from app.storage import artifacts
+from app.storage.artifacts import (
+    ArtifactError, ArtifactStore, LocalArtifactStore, S3ArtifactStore, fetch_index_bundle, fetch_transcript,
+    has_remote_transcript, publish_index_alias, publish_index_bundle, sha256_hex,
+)
+from app.storage.cache import CACHE_DIR, load_transcript, save_transcript
+from app.storage.index_store import INDEX_ROOT, alias_target, index_exists, open_index, publish_alias, publish_index
+
+
+def test_backends_must_implement_the_key_value_methods():
+    class ReadOnlyStore(ArtifactStore):
+        def _read(self, key):
+            return None
+
+    with pytest.raises(TypeError):
+        ReadOnlyStore()
+
+
+def test_blobs_are_content_addressed_and_verified(tmp_path):
+    store = LocalArtifactStore(str(tmp_path))
+    digest = store.put_blob(b"transcript")
+    assert digest == sha256_hex(b"transcript")
+    assert store.get_blob(digest) == b"transcript"
+
+    with open(os.path.join(tmp_path, "blobs", "sha256", digest[:2], digest), "wb") as f:
+        f.write(b"tampered")
+    with pytest.raises(ArtifactError):
+        store.get_blob(digest)
+    with pytest.raises(ArtifactError):
+        store.get_blob(sha256_hex(b"never stored"))
+
+
+class StubS3Client:
+    """In-memory S3 client with botocore's error shapes (NoSuchKey / 404 for missing keys)."""
+
+    def __init__(self):
+        from botocore.exceptions import ClientError
+
+        self.objects = {}
+        self.denied = set()
+        self._error = ClientError
+
+    def _check(self, bucket: str, key: str, operation: str, missing_code: str):
+        if key in self.denied:
+            raise self._error({"Error": {"Code": "AccessDenied", "Message": "Access Denied"}}, operation)
+        if (bucket, key) not in self.objects:
+            raise self._error({"Error": {"Code": missing_code, "Message": "Not Found"}}, operation)
+
+    def get_object(self, Bucket, Key):
+        self._check(Bucket, Key, "GetObject", "NoSuchKey")
+        return {"Body": io.BytesIO(self.objects[(Bucket, Key)])}
+
+    def put_object(self, Bucket, Key, Body):
+        if Key in self.denied:
+            raise self._error({"Error": {"Code": "AccessDenied", "Message": "Access Denied"}}, "PutObject")
+        self.objects[(Bucket, Key)] = Body
+
+    def head_object(self, Bucket, Key):
+        self._check(Bucket, Key, "HeadObject", "404")
+        return {"ContentLength": len(self.objects[(Bucket, Key)])}
+
+
+@pytest.fixture
+def s3(monkeypatch):
+    """An S3ArtifactStore (MinIO-style endpoint) on a stub client, configured as the shared store."""
+    boto3 = pytest.importorskip("boto3")
+    client = StubS3Client()
+    created = {}
+
+    def make_client(service, endpoint_url=None):
+        created.update(service=service, endpoint_url=endpoint_url)
+        return client
+
+    monkeypatch.setattr(boto3, "client", make_client)
+    store = S3ArtifactStore("klypse", prefix="/shared/", endpoint_url="http://localhost:9000")
+    assert created == {"service": "s3", "endpoint_url": "http://localhost:9000"}
+    monkeypatch.setattr(config, "ARTIFACT_STORE", "s3")
+    monkeypatch.setattr(artifacts, "_store", store)
+    return store, client
+
+
+@pytest.fixture
+def local_data(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+
+def test_s3_keys_are_prefixed_and_missing_keys_are_not_errors(s3):
+    store, client = s3
+    digest = store.put_blob(b"chunk")
+    assert ("klypse", f"shared/blobs/sha256/{digest[:2]}/{digest}") in client.objects
+    assert store.get_blob(digest) == b"chunk"
+
+    assert store.get_ref("transcripts", "missing") is None
+    assert not store.has_ref("transcripts", "missing")
+    with pytest.raises(ArtifactError):
+        store.get_blob(sha256_hex(b"never stored"))
+
+
+def test_s3_errors_other_than_not_found_are_raised(s3):
+    from botocore.exceptions import ClientError
+
+    store, client = s3
+    client.denied.add("shared/refs/transcripts/secret.json")
+    with pytest.raises(ClientError):
+        store.get_ref("transcripts", "secret")
+    with pytest.raises(ClientError):
+        store.has_ref("transcripts", "secret")
+    with pytest.raises(ClientError):
+        store.put_ref("transcripts", "secret", {})
+
+
+def test_transcripts_are_read_through_from_the_store(s3):
+    save_transcript("s3video0001", "shared transcript")
+    os.remove(os.path.join(CACHE_DIR, "s3video0001.txt"))
+
+    assert load_transcript("s3video0001", fetch_remote=False) is None
+    assert load_transcript("s3video0001") == "shared transcript"
+    # Kept locally: the next read does not touch the store
+    assert os.path.exists(os.path.join(CACHE_DIR, "s3video0001.txt"))
+    assert fetch_transcript("s3video0002") is None
+
+
+def test_tampered_transcript_blob_is_not_returned(s3):
+    store, client = s3
+    save_transcript("s3video0003", "original words")
+    key = ("klypse", f"shared/blobs/sha256/{sha256_hex(b'original words')[:2]}/{sha256_hex(b'original words')}")
+    client.objects[key] = b"tampered words"
+    assert fetch_transcript("s3video0003") is None
+
+
+def test_has_remote_transcript_checks_transcripts_and_indexes(s3, local_data):
+    store, client = s3
+    assert not has_remote_transcript("s3video0004")
+    store.put_ref("indexes", "s3video0004", {"files": {}})
+    assert has_remote_transcript("s3video0004")
+    save_transcript("s3video0005", "words")
+    assert has_remote_transcript("s3video0005")
+
+    # An unreachable store means "not there", never an error on /check
+    client.denied.update({"shared/refs/transcripts/s3video0006.json", "shared/refs/indexes/s3video0006.json"})
+    assert not has_remote_transcript("s3video0006")
+
+
+def make_index(video_id: str, content: bytes) -> dict:
+    def write(tmp_dir: str):
+        for name in ("index.faiss", "index.pkl"):
+            with open(os.path.join(tmp_dir, name), "wb") as f:
+                f.write(content + name.encode())
+
+    manifest = publish_index(video_id, write, {"chunks": 3})
+    publish_index_bundle(video_id, os.path.join(INDEX_ROOT, video_id, manifest["path"]), manifest)
+    return manifest
+
+
+def read_index(video_id: str) -> bytes:
+    with open_index(video_id) as (path, _):
+        with open(os.path.join(path, "index.faiss"), "rb") as f:
+            return f.read()
+
+
+def test_index_bundle_is_fetched_and_verified(s3, local_data):
+    _, client = s3
+    manifest = make_index("original", b"vectors")
+    shutil.rmtree(INDEX_ROOT)
+
+    assert fetch_index_bundle("original")
+    assert read_index("original") == b"vectorsindex.faiss"
+    assert not fetch_index_bundle("never_built")
+
+    # A corrupted blob is never published locally
+    shutil.rmtree(INDEX_ROOT)
+    digest = manifest["files"]["index.pkl"]
+    client.objects[("klypse", f"shared/blobs/sha256/{digest[:2]}/{digest}")] = b"corrupted"
+    assert not fetch_index_bundle("original")
+    assert not index_exists("original")
+
+
+def test_alias_fetches_its_target_first(s3, local_data):
+    make_index("original", b"vectors")
+    publish_index_alias("reupload", publish_alias("reupload", "original", {"similarity": 0.95}))
+    shutil.rmtree(INDEX_ROOT)
+
+    assert fetch_index_bundle("reupload")
+    assert alias_target("reupload") == "original"
+    assert read_index("reupload") == b"vectorsindex.faiss"
+
+
+def test_alias_without_a_shared_target_is_not_installed(s3, local_data):
+    store, _ = s3
+    store.put_ref("indexes", "orphan", {"alias_of": "gone", "files": {}})
+    assert not fetch_index_bundle("orphan")
+    assert alias_target("orphan") is None
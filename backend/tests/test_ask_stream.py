@@ -0,0 +1,68 @@
+"""Cold path of /ask/stream: transcript and embedding work stays off the event loop."""
+import asyncio
+import time
+
+import httpx
+
+from app.api import endpoints
+
+
+class IdleScheduler:
+    def release_unclaimed(self, ticket):
+        pass
+
+
+def test_cold_ingestion_does_not_block_the_event_loop(monkeypatch):
+    from app.main import app
+
+    indexed = []
+
+    def load_vectorstore(video_id):
+        time.sleep(0.05)
+        if not indexed:
+            raise FileNotFoundError(video_id)
+        return object()
+
+    def slow_transcript(video_id, captions_only=False):
+        time.sleep(0.4)  # Caption discovery plus audio download
+        return "transcript text"
+
+    def slow_index(video_id, transcript):
+        time.sleep(0.4)  # Embedding
+        indexed.append(video_id)
+
+    async def answer(vectorstore, question, video_id, ticket):
+        return "An answer.", False
+
+    monkeypatch.setattr(endpoints, "load_vectorstore_for_video", load_vectorstore)
+    monkeypatch.setattr(endpoints, "load_transcript", lambda video_id: None)
+    monkeypatch.setattr(endpoints, "get_transcript", slow_transcript)
+    monkeypatch.setattr(endpoints, "index_transcript", slow_index)
+    monkeypatch.setattr(endpoints, "_generate_answer", answer)
+    monkeypatch.setattr(endpoints, "cached_overview_answer", lambda video_id, question: None)
+    monkeypatch.setattr(endpoints, "_admit_interactive", lambda api_key, count=1: [None])
+    monkeypatch.setattr(endpoints, "get_scheduler", lambda: IdleScheduler())
+
+    async def main():
+        gaps = []
+        done = asyncio.Event()
+
+        async def ticker():
+            last = time.perf_counter()
+            while not done.is_set():
+                await asyncio.sleep(0.01)
+                now = time.perf_counter()
+                gaps.append(now - last)
+                last = now
+
+        ticking = asyncio.create_task(ticker())
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            response = await client.post("/ask/stream", json={"video_id": "coldvideo01", "question": "What is it about?"})
+        done.set()
+        await ticking
+        return response, max(gaps)
+
+    response, longest_gap = asyncio.run(main())
+    assert "Ready" in response.text and "answer" in response.text
+    assert indexed == ["coldvideo01"]
+    assert longest_gap < 0.2
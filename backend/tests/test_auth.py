@@ -0,0 +1,45 @@
+"""Caller identity for the per-caller Groq queue limit, and API key enforcement."""
+from fastapi.testclient import TestClient
+from starlette.requests import Request
+
+from app.api.auth import scheduler_key
+
+
+def make_request(client_host: str, forwarded: str = None) -> Request:
+    headers = [(b"x-forwarded-for", forwarded.encode())] if forwarded else []
+    return Request({"type": "http", "method": "POST", "path": "/ask/stream", "headers": headers, "client": (client_host, 5000)})
+
+
+def test_api_key_is_the_caller():
+    assert scheduler_key(make_request("10.0.0.1"), "dev-key-123") == "dev-key-123"
+
+
+def test_anonymous_callers_are_keyed_by_client_address():
+    assert scheduler_key(make_request("10.0.0.1"), None) == "anonymous:10.0.0.1"
+    assert scheduler_key(make_request("10.0.0.2"), None) == "anonymous:10.0.0.2"
+
+
+def test_forwarded_address_is_trusted_only_from_the_local_proxy():
+    assert scheduler_key(make_request("127.0.0.1", "1.2.3.4, 10.0.0.7"), None) == "anonymous:10.0.0.7"
+    assert scheduler_key(make_request("10.0.0.1", "10.0.0.7"), None) == "anonymous:10.0.0.1"
+
+
+def test_debug_memory_requires_an_api_key():
+    from app.main import app
+
+    client = TestClient(app)
+    assert client.get("/debug/memory").status_code == 401
+    assert client.get("/debug/memory", headers={"X-API-Key": "guess"}).status_code == 401
+    response = client.get("/debug/memory", headers={"X-API-Key": "dev-key-123"})
+    assert response.status_code == 200
+    assert "residents" in response.json()
+
+
+def test_warm_requires_an_api_key():
+    from app.main import app
+
+    client = TestClient(app)
+    assert client.post("/warm", json={"video_ids": ["dQw4w9WgXcQ"]}).status_code == 401
+    assert client.post("/warm", json={"video_ids": ["dQw4w9WgXcQ"]}, headers={"X-API-Key": "guess"}).status_code == 401
+    # A valid key gets past authentication to request validation
+    assert client.post("/warm", json={"parallelism": "many"}, headers={"X-API-Key": "dev-key-123"}).status_code == 422
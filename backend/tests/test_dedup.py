@@ -0,0 +1,84 @@
+"""Signature journal, offline backfill and shared aliases of near-duplicate videos."""
+import os
+import random
+import shutil
+
+import pytest
+
+from app.cli import backfill_dedup
+from app.config import config
+from app.services import dedup
+from app.storage import artifacts
+from app.storage.artifacts import LocalArtifactStore, fetch_index_bundle, publish_index_alias, publish_index_bundle
+from app.storage.cache import save_transcript
+from app.storage.index_store import INDEX_ROOT, alias_target, index_version, publish_alias, publish_index, read_manifest
+
+
+def make_transcript(seed: int, words: int = 400) -> str:
+    rng = random.Random(seed)
+    return " ".join(rng.choice(["alpha", "beta", "gamma", "delta", "omega", "sigma", "kappa", "theta"]) + str(rng.randint(0, 50))
+                    for _ in range(words))
+
+
+def make_index(video_id: str) -> dict:
+    def write(tmp_dir: str):
+        with open(os.path.join(tmp_dir, "index.faiss"), "wb") as f:
+            f.write(video_id.encode())
+
+    return publish_index(video_id, write, {"chunks": 1})
+
+
+@pytest.fixture(autouse=True)
+def fresh_data(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(dedup, "_index", None)
+
+
+def test_signatures_of_other_workers_are_read_from_the_last_offset():
+    transcript = make_transcript(1)
+    make_index("original")
+    dedup.remember("original", dedup.transcript_signature(transcript))
+    offset = dedup._journal["offset"]
+    assert offset == os.path.getsize(dedup.journal_path())
+
+    # Another worker appends a signature, and is still writing the next line
+    make_index("other")
+    dedup.append_signatures({"other": dedup.transcript_signature(make_transcript(2))})
+    with open(dedup.journal_path(), "ab") as f:
+        f.write(b'{"video_id": "partial"')
+
+    match = dedup.find_duplicate("reupload", dedup.transcript_signature(transcript + " outro"))
+    assert match[0] == "original"
+    assert set(dedup.get_signature_index().signatures) == {"original", "other"}
+    assert dedup._journal["offset"] == os.path.getsize(dedup.journal_path()) - len(b'{"video_id": "partial"')
+
+
+def test_backfill_signs_indexed_videos_offline():
+    transcript = make_transcript(3)
+    make_index("legacy")
+    save_transcript("legacy", transcript)
+    assert dedup.find_duplicate("reupload", dedup.transcript_signature(transcript)) is None
+
+    assert backfill_dedup.main([]) == 0
+    assert dedup.find_duplicate("reupload", dedup.transcript_signature(transcript))[0] == "legacy"
+
+    # Already signed videos are left alone
+    size = os.path.getsize(dedup.journal_path())
+    backfill_dedup.main([])
+    assert os.path.getsize(dedup.journal_path()) == size
+
+
+def test_aliases_are_shared_through_the_artifact_store(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "ARTIFACT_STORE", "local")
+    monkeypatch.setattr(artifacts, "_store", LocalArtifactStore(str(tmp_path / "shared")))
+
+    manifest = make_index("original")
+    publish_index_bundle("original", os.path.join(INDEX_ROOT, "original", manifest["path"]), manifest)
+    publish_index_alias("reupload", publish_alias("reupload", "original", {"similarity": 0.97}))
+
+    # Another node, with an empty local disk
+    shutil.rmtree(INDEX_ROOT)
+    assert fetch_index_bundle("reupload")
+    assert alias_target("reupload") == "original"
+    assert read_manifest("reupload")["similarity"] == 0.97
+    assert index_version("original") is not None
@@ -0,0 +1,198 @@
+"""Hash ring, routing decisions and the merged /warm stream of the video-affinity dispatcher."""
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from app import dispatcher
+from app.config import config
+from app.dispatcher import HashRing, routing_key
+
+KEYS = [f"video{n:06d}" for n in range(4000)]
+
+
+def owners(ring: HashRing) -> dict:
+    return {key: ring.preference(key)[0] for key in KEYS}
+
+
+def make_ring(count: int) -> HashRing:
+    ring = HashRing(config.DISPATCH_VNODES)
+    for n in range(count):
+        ring.add(f"http://w{n}")
+    return ring
+
+
+def test_preference_lists_every_node_once_owner_first():
+    ring = make_ring(4)
+    preference = ring.preference("dQw4w9WgXcQ")
+    assert sorted(preference) == sorted(ring.nodes)
+    assert ring.preference("dQw4w9WgXcQ") == preference
+    assert HashRing(8).preference("dQw4w9WgXcQ") == []
+
+
+def test_shares_cover_the_key_space_evenly():
+    shares = make_ring(4).shares()
+    assert sum(shares.values()) == pytest.approx(1.0, abs=1e-3)
+    assert all(0.15 < share < 0.35 for share in shares.values())
+
+    before = owners(make_ring(4))
+    counts = {node: list(before.values()).count(node) / len(KEYS) for node in shares}
+    assert all(counts[node] == pytest.approx(shares[node], abs=0.05) for node in shares)
+
+
+def test_adding_a_node_moves_only_its_share_of_keys():
+    ring = make_ring(4)
+    before = owners(ring)
+    ring.add("http://w4")
+    after = owners(ring)
+
+    moved = [key for key in KEYS if before[key] != after[key]]
+    assert 0.12 < len(moved) / len(KEYS) < 0.28  # ~1/5
+    assert {after[key] for key in moved} == {"http://w4"}
+
+
+def test_removing_a_node_moves_only_its_keys():
+    ring = make_ring(4)
+    before = owners(ring)
+    ring.remove("http://w2")
+    after = owners(ring)
+
+    moved = [key for key in KEYS if before[key] != after[key]]
+    assert 0.15 < len(moved) / len(KEYS) < 0.35  # ~1/4
+    assert {before[key] for key in moved} == {"http://w2"}
+    assert "http://w2" not in after.values()
+
+
+@pytest.fixture
+def workers(monkeypatch):
+    """Three healthy workers on a fresh ring."""
+    monkeypatch.setattr(dispatcher, "_workers", {})
+    monkeypatch.setattr(dispatcher, "_ring", HashRing(config.DISPATCH_VNODES))
+    monkeypatch.setattr(dispatcher, "_routes", {})
+    monkeypatch.setattr(config, "DISPATCH_MAX_INFLIGHT", 2)
+    dispatcher.set_workers(["http://w0", "http://w1", "http://w2"])
+    for worker in dispatcher._workers.values():
+        dispatcher._join(worker)
+    return dispatcher._workers
+
+
+def test_candidates_prefer_the_owner_then_spill_then_overflow(workers):
+    preference = dispatcher._ring.preference("dQw4w9WgXcQ")
+    owner, successor, last = (workers[url] for url in preference)
+
+    assert dispatcher._candidates("dQw4w9WgXcQ") == [(owner, "affinity"), (successor, "spill"), (last, "spill")]
+
+    owner.in_flight = 2
+    assert dispatcher._candidates("dQw4w9WgXcQ")[0] == (successor, "spill")
+
+    successor.in_flight = 3
+    last.in_flight = 4
+    assert dispatcher._candidates("dQw4w9WgXcQ") == [(owner, "overflow")]
+
+
+def test_unkeyed_requests_go_to_the_least_loaded_worker(workers):
+    busy = list(workers.values())
+    busy[0].in_flight, busy[1].in_flight, busy[2].in_flight = 3, 1, 2
+    assert dispatcher._candidates(None) == [(busy[1], "unkeyed")]
+
+    for worker in busy:
+        dispatcher._leave(worker, "test")
+    assert dispatcher._candidates(None) == []
+    assert dispatcher._candidates("dQw4w9WgXcQ") == []
+
+
+def test_routing_key_from_path_and_body():
+    assert routing_key("/check/dQw4w9WgXcQ", b"") == "dQw4w9WgXcQ"
+    assert routing_key("/summary/dQw4w9WgXcQ", b"") == "dQw4w9WgXcQ"
+    body = json.dumps({"video_id": "https://www.youtube.com/watch?v=dQw4w9WgXcQ", "question": "Why?"}).encode()
+    assert routing_key("/ask/stream", body) == "dQw4w9WgXcQ"
+    assert routing_key("/ask/batch", json.dumps({"video_id": "dQw4w9WgXcQ"}).encode()) == "dQw4w9WgXcQ"
+
+
+def test_routing_key_ignores_unkeyed_paths_and_bad_bodies():
+    assert routing_key("/health/ready", b"") is None
+    assert routing_key("/warm", json.dumps({"video_id": "dQw4w9WgXcQ"}).encode()) is None
+    assert routing_key("/ask/stream", b"{not json") is None
+    assert routing_key("/ask/stream", b"[]") is None
+    assert routing_key("/ask/stream", json.dumps({"video_id": 42}).encode()) is None
+    assert routing_key("/ask/stream", b"") is None
+
+
+class ChunkedBody(httpx.AsyncByteStream):
+    """A response body that is streamed like a real upstream (httpx reads plain `content` eagerly)."""
+
+    def __init__(self, data: bytes):
+        self.data = data
+
+    async def __aiter__(self):
+        yield self.data
+
+
+def fake_workers(requests: list, drop: str = None):
+    """Workers answering /warm with one progress frame per video (except `drop`, lost mid-stream)."""
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.path != "/warm":
+            return httpx.Response(404)
+        payload = json.loads(request.content)
+        if not isinstance(payload, dict):
+            return httpx.Response(422, stream=ChunkedBody(b'{"detail": "body must be an object"}'))
+        requests.append((f"{request.url.scheme}://{request.url.host}", payload["video_ids"]))
+        frames = "".join(
+            f"event: progress\ndata: {json.dumps({'video_id': vid, 'status': 'ingested', 'transcript_length': 100, 'seconds': 0.5})}\n\n"
+            for vid in payload["video_ids"]
+            if vid != drop
+        )
+        body = (frames + "data: [END]\n\n").encode()
+        return httpx.Response(200, stream=ChunkedBody(body), headers={"content-type": "text/event-stream"})
+
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+async def post_warm(body) -> httpx.Response:
+    content = body if isinstance(body, bytes) else json.dumps(body).encode()
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=dispatcher.app), base_url="http://dispatcher") as client:
+        return await client.post("/warm", content=content, headers={"content-type": "application/json"})
+
+
+def sse_events(text: str) -> list:
+    events = []
+    for frame in text.split("\n\n"):
+        if frame.startswith("event: "):
+            name, data = frame.split("\n", 1)
+            events.append((name[len("event: "):], json.loads(data[len("data: "):])))
+    return events
+
+
+def test_warm_is_split_by_owner_and_merged(workers, monkeypatch):
+    requests = []
+    monkeypatch.setattr(dispatcher, "_client", fake_workers(requests, drop=KEYS[3]))
+    video_ids = KEYS[:12]
+
+    response = asyncio.run(post_warm({"video_ids": video_ids + [KEYS[0]]}))
+    events = sse_events(response.text)
+
+    # Each worker got exactly the videos it owns
+    for url, ids in requests:
+        assert all(dispatcher._ring.preference(vid)[0] == url for vid in ids)
+    assert sorted(vid for _, ids in requests for vid in ids) == sorted(video_ids)
+
+    progress = [data for name, data in events if name == "progress"]
+    assert [data["done"] for data in progress] == list(range(1, 13))
+    assert {data["total"] for data in progress} == {12}
+    assert {data["video_id"] for data in progress} == set(video_ids)
+    lost = next(data for data in progress if data["video_id"] == KEYS[3])
+    assert lost["status"] == "failed" and lost["error"].startswith("dispatch:")
+
+    summary = events[-1][1]
+    assert events[-1][0] == "summary"
+    assert (summary["total"], summary["ingested"], summary["failed"]) == (12, 11, 1)
+    assert response.text.endswith("data: [END]\n\n")
+    assert all(worker.in_flight == 0 for worker in workers.values())
+
+
+def test_warm_bodies_that_are_not_objects_go_to_a_worker(workers, monkeypatch):
+    monkeypatch.setattr(dispatcher, "_client", fake_workers([]))
+    assert asyncio.run(post_warm(b"[]")).status_code == 422
+    assert asyncio.run(post_warm(b'"dQw4w9WgXcQ"')).status_code == 422
@@ -0,0 +1,68 @@
+"""The extractive stage is opt-in, and its fallback reuses the chunks it retrieved."""
+import asyncio
+from typing import Any, List, Optional
+
+from langchain_community.embeddings import FakeEmbeddings
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+from langchain_core.language_models.llms import LLM
+
+from app.api.endpoints import _invoke_qa_chain
+from app.config import config
+from app.services.extractive import extractive_answer
+from app.services.groq_scheduler import INTERACTIVE, get_scheduler
+from app.services.qa_chain import create_qa_chain
+
+
+class RecordingLLM(LLM):
+    prompts: List[str] = []
+
+    @property
+    def _llm_type(self) -> str:
+        return "recording"
+
+    def _call(self, prompt: str, stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> str:
+        self.prompts.append(prompt)
+        return "It costs five dollars."
+
+
+def test_extractive_stage_is_off_by_default():
+    assert config.EXTRACTIVE_ENABLED is False
+    assert extractive_answer(None, "what is the price?") == (None, None)
+
+
+def test_fallback_answers_from_the_given_documents_without_retrieving(monkeypatch):
+    vectorstore = FAISS.from_texts(["unrelated chunk"], FakeEmbeddings(size=8))
+
+    def no_retrieval(*args, **kwargs):
+        raise AssertionError("retrieved again")
+
+    monkeypatch.setattr(vectorstore, "max_marginal_relevance_search", no_retrieval)
+    monkeypatch.setattr(vectorstore, "max_marginal_relevance_search_by_vector", no_retrieval)
+    llm = RecordingLLM()
+    qa_chain = create_qa_chain(llm, vectorstore)
+    ticket = get_scheduler().admit(INTERACTIVE)[0]
+
+    result = asyncio.run(
+        _invoke_qa_chain(qa_chain, "what is the price?", "vid", ticket, [Document(page_content="The price is $5.")])
+    )
+
+    assert result == {"result": "It costs five dollars."}
+    assert "The price is $5." in llm.prompts[0]
+
+
+def test_chain_runs_on_the_event_loop_through_the_async_scheduler(monkeypatch):
+    vectorstore = FAISS.from_texts(["The price is $5."], FakeEmbeddings(size=8))
+    llm = RecordingLLM()
+    scheduler = get_scheduler()
+
+    def blocking_run(*args, **kwargs):
+        raise AssertionError("used the blocking scheduler path")
+
+    monkeypatch.setattr(scheduler, "run", blocking_run)
+    ticket = scheduler.admit(INTERACTIVE)[0]
+
+    result = asyncio.run(_invoke_qa_chain(create_qa_chain(llm, vectorstore), "what is the price?", "vid", ticket))
+
+    assert result["result"] == "It costs five dollars."
+    assert scheduler.stats()["in_flight"] == 0
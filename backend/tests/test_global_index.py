@@ -0,0 +1,110 @@
+"""Segment appends, replay, compaction and clearing of the global FAISS index."""
+import hashlib
+import os
+import shutil
+import threading
+
+import numpy as np
+import pytest
+from langchain_core.embeddings import Embeddings
+
+from app.config import config
+from app.storage import global_index
+from app.storage.atomic import file_lock
+from app.storage.index_store import GLOBAL_INDEX_ID, read_manifest
+
+
+class HashEmbeddings(Embeddings):
+    """Deterministic 16-d vectors derived from the text (no model download)."""
+
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+
+    def embed_query(self, text):
+        seed = int.from_bytes(hashlib.sha256(text.encode()).digest()[:4], "little")
+        return np.random.default_rng(seed).standard_normal(16).tolist()
+
+
+@pytest.fixture(autouse=True)
+def fresh_index(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(config, "GLOBAL_COMPACT_CHECK_INTERVAL", 0)
+    monkeypatch.setattr(global_index, "get_embeddings", lambda: HashEmbeddings())
+    monkeypatch.setattr(global_index, "_state", None)
+
+
+def chunks_by_video() -> dict:
+    vectorstore = global_index.get_global_state().vectorstore
+    found = {}
+    for doc_id in vectorstore.index_to_docstore_id.values():
+        document = vectorstore.docstore.search(doc_id)
+        found.setdefault(document.metadata.get("video_id"), []).append(document.page_content)
+    return found
+
+
+def reload():
+    """Drop the loaded state, as a restart or another worker would see the index."""
+    global_index._state = None
+
+
+def test_segments_newer_than_the_base_are_replayed():
+    global_index.append(["a1", "a2"], video_id="a")
+    global_index.append(["b1"], video_id="b")
+    manifest = global_index.compact()
+    assert manifest["segments_through"] == 2
+    assert global_index._list_segments() == []
+
+    assert global_index.append(["c1"], video_id="c") == 3
+    reload()
+    assert chunks_by_video() == {"a": ["a1", "a2"], "b": ["b1"], "c": ["c1"]}
+    assert global_index.get_global_state().applied_seq == 3
+
+
+def test_segments_left_behind_by_a_crashed_compaction_are_skipped_then_removed():
+    global_index.append(["a1", "a2"], video_id="a")
+    segment = global_index._segment_path(1)
+    shutil.copy(segment, segment + ".bak")
+    global_index.compact()
+    # Crash between publishing the base and deleting the folded segment
+    os.replace(segment + ".bak", segment)
+
+    reload()
+    assert chunks_by_video() == {"a": ["a1", "a2"]}
+    assert global_index.append(["b1"], video_id="b") == 2
+
+    global_index.compact()
+    assert global_index._list_segments() == []
+    reload()
+    assert chunks_by_video() == {"a": ["a1", "a2"], "b": ["b1"]}
+
+
+def test_re_adding_a_video_replaces_its_chunks():
+    global_index.append(["old1", "old2"], video_id="a")
+    global_index.append(["other"], video_id="b")
+    global_index.append(["new1"], video_id="a")
+    assert chunks_by_video() == {"a": ["new1"], "b": ["other"]}
+
+    global_index.compact()
+    reload()
+    assert chunks_by_video() == {"a": ["new1"], "b": ["other"]}
+    global_index.append(["newer"], video_id="a")
+    assert chunks_by_video() == {"a": ["newer"], "b": ["other"]}
+
+
+def test_clear_waits_for_appends_and_removes_everything():
+    global_index.append(["a1"], video_id="a")
+    global_index.compact()
+    global_index.append(["b1"], video_id="b")
+
+    cleared = threading.Event()
+    with file_lock("faiss-global-append", exclusive=True):
+        thread = threading.Thread(target=lambda: (global_index.clear(), cleared.set()))
+        thread.start()
+        assert not cleared.wait(0.2)
+    thread.join(timeout=2)
+    assert cleared.is_set()
+
+    assert read_manifest(GLOBAL_INDEX_ID) is None
+    assert global_index._list_segments() == []
+    assert global_index.append(["c1"], video_id="c") == 1
+    assert chunks_by_video() == {"c": ["c1"]}
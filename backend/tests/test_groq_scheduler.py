@@ -0,0 +1,139 @@
+"""Admission, ordering, wake-ups and retries of the Groq scheduler."""
+import asyncio
+import threading
+import time
+
+import httpx
+import pytest
+
+from app.services.groq_scheduler import BACKGROUND, INTERACTIVE, GroqScheduler, SchedulerBusy, parse_duration
+
+
+def make_scheduler(**overrides) -> GroqScheduler:
+    options = dict(
+        budgets={"chat": {"rpm": 6000, "tpm": 0}},
+        max_concurrency=4,
+        max_queued=10,
+        max_queued_per_key=3,
+        max_retries=2,
+        backoff_base=0.01,
+        backoff_max=0.02,
+    )
+    options.update(overrides)
+    return GroqScheduler(**options)
+
+
+def test_parse_duration():
+    assert parse_duration("7") == 7.0
+    assert parse_duration("2m59.5s") == pytest.approx(179.5)
+    assert parse_duration("120ms") == pytest.approx(0.12)
+    assert parse_duration("soon") is None
+    assert parse_duration(None) is None
+
+
+def test_admission_is_limited_per_caller_and_overall():
+    scheduler = make_scheduler(max_queued=5)
+    tickets = scheduler.admit(INTERACTIVE, "anonymous:10.0.0.1", count=3)
+    with pytest.raises(SchedulerBusy):
+        scheduler.admit(INTERACTIVE, "anonymous:10.0.0.1")
+    # Another client has its own allowance, up to the overall limit
+    tickets += scheduler.admit(INTERACTIVE, "anonymous:10.0.0.2", count=2)
+    with pytest.raises(SchedulerBusy):
+        scheduler.admit(INTERACTIVE, "anonymous:10.0.0.3")
+
+    for ticket in tickets:
+        scheduler.release_unclaimed(ticket)
+    assert scheduler.stats()["admitted"] == 0
+    assert scheduler.stats()["per_key"] == {}
+
+
+def test_interactive_call_runs_before_queued_background_calls():
+    scheduler = make_scheduler(max_concurrency=1)
+    order = []
+    gate = threading.Event()
+    busy = scheduler.admit(BACKGROUND)[0]
+    holder = threading.Thread(target=scheduler.run, args=(gate.wait, busy))
+    holder.start()
+    while scheduler.stats()["in_flight"] == 0:
+        time.sleep(0.001)
+
+    background = scheduler.admit(BACKGROUND)[0]
+    interactive = scheduler.admit(INTERACTIVE)[0]
+    threads = [
+        threading.Thread(target=scheduler.run, args=(lambda: order.append("background"), background)),
+        threading.Thread(target=scheduler.run, args=(lambda: order.append("interactive"), interactive)),
+    ]
+    for thread in threads:
+        thread.start()
+    while scheduler.stats()["waiting"] < 2:
+        time.sleep(0.001)
+
+    gate.set()
+    for thread in [holder, *threads]:
+        thread.join(timeout=2)
+    assert order == ["interactive", "background"]
+
+
+def test_waiters_all_proceed_when_a_rate_limit_block_expires():
+    scheduler = make_scheduler(max_concurrency=8)
+    scheduler._requests["chat"].block_for(0.1)
+
+    async def main():
+        tickets = scheduler.admit(INTERACTIVE, "a") + scheduler.admit(BACKGROUND, "b", count=2)
+        started = []
+        all_started = asyncio.Event()
+
+        async def call():
+            # Every call stays in flight until all of them got their turn
+            started.append(time.monotonic())
+            if len(started) == len(tickets):
+                all_started.set()
+            await all_started.wait()
+
+        await asyncio.wait_for(asyncio.gather(*(scheduler.arun(call, t) for t in tickets)), timeout=1.0)
+
+    # Without a wake-up after each turn, the runners-up sleep until the first call finishes
+    asyncio.run(main())
+
+
+def test_cancelled_async_waiter_leaves_the_queue():
+    scheduler = make_scheduler(max_concurrency=1)
+
+    async def main():
+        gate = asyncio.Event()
+        holder = asyncio.create_task(scheduler.arun(gate.wait, scheduler.admit(INTERACTIVE)[0]))
+        waiter = asyncio.create_task(scheduler.arun(lambda: asyncio.sleep(0), scheduler.admit(INTERACTIVE)[0]))
+        await asyncio.sleep(0.05)
+        assert scheduler.stats()["waiting"] == 1
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        gate.set()
+        await holder
+
+    asyncio.run(main())
+    assert scheduler.stats() == {"in_flight": 0, "waiting": 0, "admitted": 0, "per_key": {}}
+
+
+def test_transient_errors_are_retried_then_raised():
+    scheduler = make_scheduler(max_retries=2)
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise httpx.ConnectError("refused")
+        return "ok"
+
+    assert scheduler.call(flaky, INTERACTIVE) == "ok"
+    assert len(attempts) == 3
+
+    def broken():
+        raise httpx.ConnectError("refused")
+
+    with pytest.raises(httpx.ConnectError):
+        scheduler.call(broken, INTERACTIVE)
+    with pytest.raises(ValueError):
+        scheduler.call(lambda: int("x"), INTERACTIVE)
+    assert scheduler.stats()["in_flight"] == 0
+    assert scheduler.stats()["admitted"] == 0
@@ -0,0 +1,98 @@
+"""Versioned per-video index layout: publishing, pruning, aliases and legacy indexes."""
+import os
+
+import pytest
+
+from app.storage.index_store import (
+    INDEX_ROOT, alias_target, index_exists, index_version, list_indexed_videos, open_index, publish_alias,
+    publish_index, read_manifest, video_index_dir,
+)
+
+
+@pytest.fixture(autouse=True)
+def fresh_data(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+
+def writer(content: bytes):
+    def write(tmp_dir: str):
+        with open(os.path.join(tmp_dir, "index.faiss"), "wb") as f:
+            f.write(content)
+
+    return write
+
+
+def read_current(video_id: str) -> bytes:
+    with open_index(video_id) as (path, _):
+        with open(os.path.join(path, "index.faiss"), "rb") as f:
+            return f.read()
+
+
+def test_publishing_a_version_prunes_the_previous_one():
+    first = publish_index("vid", writer(b"one"), {"chunks": 1})
+    second = publish_index("vid", writer(b"two"), {"chunks": 2})
+
+    assert (first["version"], second["version"]) == (1, 2)
+    assert read_manifest("vid")["chunks"] == 2
+    assert read_current("vid") == b"two"
+    assert sorted(os.listdir(video_index_dir("vid"))) == ["MANIFEST.json", second["path"]]
+    assert set(second["files"]) == {"index.faiss"}
+
+
+def test_failed_write_leaves_the_current_version_alone():
+    publish_index("vid", writer(b"one"), {})
+
+    def broken(tmp_dir: str):
+        writer(b"partial")(tmp_dir)
+        raise RuntimeError("embedding failed")
+
+    with pytest.raises(RuntimeError):
+        publish_index("vid", broken, {})
+    assert index_version("vid") == 1
+    assert read_current("vid") == b"one"
+    assert not [name for name in os.listdir(video_index_dir("vid")) if name.startswith(".tmp-")]
+
+
+def test_aliases_resolve_to_the_target_index():
+    publish_index("original", writer(b"one"), {})
+    publish_alias("reupload", "original", {"similarity": 0.9})
+    # An alias of an alias points at the real index
+    publish_alias("mirror", "reupload", {"similarity": 0.9})
+
+    assert alias_target("mirror") == "original"
+    assert read_current("mirror") == b"one"
+    assert list_indexed_videos() == ["mirror", "original", "reupload"]
+    assert list_indexed_videos(include_aliases=False) == ["original"]
+    with pytest.raises(ValueError):
+        publish_alias("original", "reupload", {})
+
+
+def test_alias_replaces_an_existing_index_and_vice_versa():
+    publish_index("original", writer(b"one"), {})
+    publish_index("reupload", writer(b"own"), {})
+    publish_alias("reupload", "original", {})
+    assert index_version("reupload") == 2
+    assert os.listdir(video_index_dir("reupload")) == ["MANIFEST.json"]
+
+    publish_index("reupload", writer(b"rebuilt"), {})
+    assert alias_target("reupload") is None
+    assert read_current("reupload") == b"rebuilt"
+
+
+def test_legacy_index_is_version_zero_until_republished():
+    os.makedirs(video_index_dir("old"))
+    for name in ("index.faiss", "index.pkl"):
+        with open(os.path.join(video_index_dir("old"), name), "wb") as f:
+            f.write(b"legacy")
+    os.makedirs(os.path.join(INDEX_ROOT, "empty"))
+
+    assert index_exists("old") and index_version("old") == 0
+    assert not index_exists("empty")
+    assert read_current("old") == b"legacy"
+
+    publish_index("old", writer(b"new"), {})
+    assert index_version("old") == 1
+    assert sorted(os.listdir(video_index_dir("old"))) == ["MANIFEST.json", "v000001"]
+    with pytest.raises(FileNotFoundError):
+        with open_index("missing"):
+            pass
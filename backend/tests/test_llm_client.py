@@ -0,0 +1,42 @@
+"""The shared ChatGroq must work on both the sync and the async path."""
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from app.api import deps
+from app.services import groq_scheduler
+
+
+def _completion_stream(request: httpx.Request) -> httpx.Response:
+    assert request.url.path.endswith("/chat/completions")
+    chunks = [
+        {"choices": [{"index": 0, "delta": {"role": "assistant", "content": word}, "finish_reason": None}]}
+        for word in ("Hello", " there")
+    ]
+    chunks.append({"choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]})
+    body = "".join(
+        f"data: {json.dumps({'id': 'c1', 'object': 'chat.completion.chunk', 'created': 0, 'model': 'm', **chunk})}\n\n"
+        for chunk in chunks
+    ) + "data: [DONE]\n\n"
+    return httpx.Response(200, headers={"content-type": "text/event-stream"}, content=body.encode())
+
+
+@pytest.fixture
+def mocked_groq(monkeypatch):
+    """Pooled clients (and the SDK clients built on them) backed by a mock transport."""
+    transport = httpx.MockTransport(_completion_stream)
+    monkeypatch.setattr(groq_scheduler, "_http_client", httpx.Client(transport=transport))
+    monkeypatch.setattr(groq_scheduler, "_async_http_client", httpx.AsyncClient(transport=transport))
+    monkeypatch.setattr(groq_scheduler, "_groq_client", None)
+    monkeypatch.setattr(groq_scheduler, "_async_groq_client", None)
+    return deps.build_llm()
+
+
+def test_invoke_uses_pooled_sync_client(mocked_groq):
+    assert mocked_groq.invoke("hi").content == "Hello there"
+
+
+def test_ainvoke_uses_pooled_async_client(mocked_groq):
+    assert asyncio.run(mocked_groq.ainvoke("hi")).content == "Hello there"
@@ -0,0 +1,110 @@
+"""Eviction decisions of the memory governor (app.utils.memory.enforce)."""
+import time
+
+import pytest
+
+from app.config import config
+from app.utils import memory
+
+MB = memory.MB
+
+
+@pytest.fixture(autouse=True)
+def governor(monkeypatch):
+    """Empty registry, no governor thread, and an RSS of 120 MB against a 100 MB budget (target 85 MB)."""
+    monkeypatch.setattr(memory, "_residents", {})
+    monkeypatch.setattr(memory, "_evictions", {})
+    monkeypatch.setattr(memory, "_ensure_thread", lambda: None)
+    monkeypatch.setattr(memory, "_release_freed_memory", lambda: None)
+    monkeypatch.setattr(memory, "rss_bytes", lambda: 120 * MB)
+    monkeypatch.setattr(config, "MEMORY_BUDGET_MB", 100)
+    monkeypatch.setattr(config, "MEMORY_TARGET_RATIO", 0.85)
+    monkeypatch.setattr(config, "MEMORY_MIN_IDLE", 5.0)
+
+
+def add(name: str, size_mb: float = 20, cost: float = 1.0, idle: float = 600, evicted=None, evict=True):
+    """Register a resident that has been idle for `idle` seconds; its eviction is recorded in `evicted`."""
+    callback = (lambda: evicted.append(name)) if evict and evicted is not None else None
+    memory.register(name, kind="index", size=int(size_mb * MB), evict=callback, cost=cost)
+    memory._residents[name].last_used = time.monotonic() - idle
+
+
+def test_cheapest_to_rebuild_per_mb_is_evicted_first_until_under_target():
+    evicted = []
+    add("costly", cost=3.0, evicted=evicted)
+    add("cheap", cost=1.0, evicted=evicted)
+    add("middle", cost=2.0, evicted=evicted)
+
+    # 120 MB -> 100 MB -> 80 MB, under the 85 MB target
+    assert memory.enforce() == ["cheap", "middle"]
+    assert evicted == ["cheap", "middle"]
+    assert list(memory._residents) == ["costly"]
+    assert memory.report()["evictions"] == {"index": 2}
+
+
+def test_longer_idle_residents_score_lower():
+    now = time.monotonic()
+    evicted = []
+    add("recent", idle=60, evicted=evicted)
+    add("stale", idle=3600, evicted=evicted)
+    assert memory._residents["stale"].score(now) < memory._residents["recent"].score(now)
+    assert memory.enforce()[0] == "stale"
+
+
+def test_recently_used_residents_are_kept():
+    evicted = []
+    add("in_use", cost=0.01, idle=1, evicted=evicted)
+    add("idle", cost=5.0, evicted=evicted)
+    add("idle_too", cost=5.0, evicted=evicted)
+
+    assert memory.enforce() == ["idle", "idle_too"]
+    assert "in_use" in memory._residents
+
+
+def test_pinned_residents_are_never_evicted():
+    add("embedding_model", cost=0.01, evict=False)
+    assert memory.enforce() == []
+    assert "embedding_model" in memory._residents
+
+
+def test_resident_replaced_by_its_owner_during_eviction_is_skipped():
+    evicted = []
+
+    def evict_first():
+        evicted.append("first")
+        # The owner reloads "second" while the governor is busy; the new one is in use
+        memory.register("second", kind="index", size=20 * MB, evict=lambda: evicted.append("second (new)"), cost=0.01)
+
+    memory.register("first", kind="index", size=20 * MB, evict=evict_first, cost=0.01)
+    memory._residents["first"].last_used = time.monotonic() - 600
+    add("second", cost=0.02, evicted=evicted)
+    add("third", cost=5.0, evicted=evicted)
+
+    assert memory.enforce() == ["first", "third"]
+    assert evicted == ["first", "third"]
+    assert "second" in memory._residents
+
+
+def test_zero_budget_only_reports(monkeypatch):
+    monkeypatch.setattr(config, "MEMORY_BUDGET_MB", 0)
+    evicted = []
+    add("cheap", evicted=evicted)
+    assert memory.enforce() == []
+    assert evicted == []
+    assert memory.report()["budget_bytes"] is None
+
+
+def test_failing_eviction_is_logged_and_the_next_resident_is_tried():
+    evicted = []
+
+    def broken():
+        raise RuntimeError("owner lock timeout")
+
+    memory.register("broken", kind="index", size=20 * MB, evict=broken, cost=0.01)
+    memory._residents["broken"].last_used = time.monotonic() - 600
+    add("a", cost=1.0, evicted=evicted)
+    add("b", cost=2.0, evicted=evicted)
+
+    assert memory.enforce() == ["a", "b"]
+    assert evicted == ["a", "b"]
+    assert memory.report()["evictions"] == {"index": 2}
@@ -0,0 +1,75 @@
+"""Speculative ingestion after /check: staleness, captions-only scope and waiting."""
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.config import config
+from app.services import prefetch
+
+
+def wait_until(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.005)
+
+
+@pytest.fixture
+def fake_ingest(monkeypatch):
+    """Prefetch workers run a fake ingestion that blocks until `gate` is set."""
+    monkeypatch.setattr(config, "PREFETCH_WORKERS", 1)
+    monkeypatch.setattr(config, "PREFETCH_QUEUE_SIZE", 2)
+    monkeypatch.setattr(config, "PREFETCH_TTL", 300)
+    gate = threading.Event()
+    calls = []
+
+    def ingest_video(video_id, should_continue=None, captions_only=False):
+        calls.append((video_id, captions_only))
+        gate.wait(2)
+        if should_continue is not None and not should_continue():
+            return {"status": "cancelled", "seconds": 0.0}
+        return {"status": "ingested", "seconds": 0.0}
+
+    monkeypatch.setattr(prefetch, "ingest_video", ingest_video)
+    yield gate, calls
+    gate.set()
+    wait_until(lambda: not prefetch.stats()["running"] and not prefetch.stats()["queued"])
+
+
+def test_checks_of_other_videos_do_not_abandon_a_running_prefetch(fake_ingest):
+    gate, calls = fake_ingest
+    assert prefetch.schedule("runningVid1") == "queued"
+    wait_until(lambda: prefetch.stats()["running"] == ["runningVid1"])
+
+    # Other users open many other videos while the transcript is being fetched
+    for i in range(10):
+        prefetch.schedule(f"otherVideo{i}")
+    assert len(prefetch.stats()["queued"]) == config.PREFETCH_QUEUE_SIZE
+
+    gate.set()
+    wait_until(lambda: not prefetch.stats()["running"])
+    assert prefetch.claim("runningVid1")[0] == "ready"
+    assert calls[0] == ("runningVid1", True)
+
+
+def test_videos_without_captions_are_not_prefetched(fake_ingest):
+    assert prefetch.schedule("audioOnlyVid", source="audio") is None
+    assert prefetch.schedule("captionsVid", source="captions") == "queued"
+
+
+def test_question_waits_for_a_running_prefetch_on_the_event_loop(fake_ingest):
+    gate, _ = fake_ingest
+    prefetch.schedule("claimedVid1")
+    wait_until(lambda: prefetch.stats()["running"] == ["claimedVid1"])
+    state, job = prefetch.claim("claimedVid1")
+    assert state == "running"
+
+    async def main():
+        assert await job.wait(0.05) is False
+        threading.Timer(0.05, gate.set).start()
+        return await job.wait(2)
+
+    assert asyncio.run(main()) is True
+    assert job.report["status"] == "ingested"
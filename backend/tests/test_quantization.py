@@ -0,0 +1,54 @@
+"""Index selection and PQ re-ranking memo in app.storage.quantization."""
+import numpy as np
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+from app.storage import quantization
+from app.storage.quantization import RerankedFAISS, build_index, evaluate_index
+
+
+class CountingEmbeddings(Embeddings):
+    """Deterministic 384-d vectors derived from the chunk text; counts embedded chunks."""
+
+    def __init__(self):
+        self.embedded = 0
+
+    def embed_documents(self, texts):
+        self.embedded += len(texts)
+        return [np.random.default_rng(int(text.split()[-1])).standard_normal(384).tolist() for text in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+def random_vectors(n: int, seed: int = 0) -> np.ndarray:
+    return np.random.default_rng(seed).standard_normal((n, 384)).astype(np.float32)
+
+
+def test_pq_falls_back_to_sq8_while_its_codebook_dominates():
+    _, info = build_index(random_vectors(300), "pq")
+    assert info["type"] == "sq8"
+
+
+def test_pq_is_built_once_it_is_smaller_than_sq8():
+    vectors = random_vectors(2000)
+    _, _, pq = evaluate_index(vectors, vectors[:50], "pq", k=3, fetch_k=10)
+    _, _, sq8 = evaluate_index(vectors, vectors[:50], "sq8", k=3, fetch_k=10)
+    assert pq["index"]["type"] == "pq"
+    assert pq["index_bytes"] < sq8["index_bytes"]
+
+
+def test_reranking_memo_is_bounded(monkeypatch):
+    monkeypatch.setattr(quantization, "PQ_RERANK_CACHE_CHUNKS", 8)
+    embeddings = CountingEmbeddings()
+    documents = {str(i): Document(page_content=f"chunk {i}") for i in range(20)}
+    store = RerankedFAISS(embeddings, None, InMemoryDocstore(documents), {i: str(i) for i in range(20)})
+
+    first = store.exact_vectors([0, 1, 2])
+    assert np.allclose(store.exact_vectors([2, 1, 0]), first[::-1])
+    assert embeddings.embedded == 3
+
+    store.exact_vectors(list(range(3, 20)))
+    assert len(store._exact) == 8
+    assert list(store._exact) == list(range(12, 20))
@@ -0,0 +1,26 @@
+"""Which questions are answered from the cached whole-video summary."""
+import pytest
+
+from app.services.summaries import is_overview_question
+
+
+@pytest.mark.parametrize("question", [
+    "Summarize this video",
+    "Can you give me a quick summary of the video?",
+    "What are the key takeaways?",
+    "tl;dr",
+    "What is this video about?",
+    "Give me 5 main points",
+])
+def test_bare_overview_requests_use_the_summary(question):
+    assert is_overview_question(question)
+
+
+@pytest.mark.parametrize("question", [
+    "key points about battery life",
+    "what does he summarize about pricing",
+    "Give me an overview of the camera settings",
+    "What tool does he use for editing?",
+])
+def test_questions_about_a_topic_go_to_retrieval(question):
+    assert not is_overview_question(question)
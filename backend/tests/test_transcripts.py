@@ -0,0 +1,66 @@
+"""Tier accounting of the transcript fallback chain (captions -> audio -> Whisper)."""
+import os
+from contextlib import contextmanager
+
+import pytest
+from prometheus_client import REGISTRY
+
+from app.config import config
+from app.services import transcripts
+from app.services.transcripts import TranscriptError, get_transcript
+
+
+def tier_errors(tier: str) -> float:
+    return REGISTRY.get_sample_value("klypse_transcript_tier_total", {"tier": tier, "outcome": "error"}) or 0.0
+
+
+@pytest.fixture(autouse=True)
+def no_captions(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(transcripts, "_fetch_captions", lambda video_id: None)
+
+    def groq_down(audio_path):
+        raise RuntimeError("groq unavailable")
+
+    monkeypatch.setattr(transcripts, "transcribe_with_groq", groq_down)
+
+
+def downloads(monkeypatch, tmp_path, fail: bool):
+    @contextmanager
+    def fake_download(video_url, cancel=None):
+        if fail:
+            raise RuntimeError("403 Forbidden")
+        path = os.path.join(tmp_path, "audio.opus")
+        with open(path, "wb") as f:
+            f.write(b"audio")
+        yield path
+
+    monkeypatch.setattr(transcripts, "downloaded_audio", fake_download)
+
+
+def local_whisper_fails(audio_path):
+    raise RuntimeError("model not available")
+
+
+@pytest.mark.parametrize("hedge_delay", [-1, 0])
+def test_failed_download_is_recorded_as_the_audio_tier(monkeypatch, tmp_path, hedge_delay):
+    monkeypatch.setattr(config, "TRANSCRIPT_HEDGE_DELAY", hedge_delay)
+    downloads(monkeypatch, tmp_path, fail=True)
+    audio, local = tier_errors("audio"), tier_errors("local_whisper")
+
+    with pytest.raises(TranscriptError):
+        get_transcript("nodownload1")
+    assert (tier_errors("audio") - audio, tier_errors("local_whisper") - local) == (1, 0)
+
+
+@pytest.mark.parametrize("hedge_delay", [-1, 0])
+def test_failed_local_whisper_is_recorded_as_its_own_tier(monkeypatch, tmp_path, hedge_delay):
+    monkeypatch.setattr(config, "TRANSCRIPT_HEDGE_DELAY", hedge_delay)
+    monkeypatch.setattr(transcripts, "transcribe_local", local_whisper_fails)
+    downloads(monkeypatch, tmp_path, fail=False)
+    audio, local = tier_errors("audio"), tier_errors("local_whisper")
+
+    with pytest.raises(TranscriptError):
+        get_transcript("nowhisper01")
+    assert (tier_errors("audio") - audio, tier_errors("local_whisper") - local) == (0, 1)
+    assert tier_errors("groq_whisper") >= 1
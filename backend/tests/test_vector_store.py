@@ -0,0 +1,50 @@
+"""Per-video index construction in app.storage.vector_store."""
+import hashlib
+
+import numpy as np
+import pytest
+from langchain_community.vectorstores import FAISS
+from langchain_core.embeddings import Embeddings
+
+from app.config import config
+from app.storage import vector_store
+from app.storage.index_store import read_manifest
+
+
+class HashEmbeddings(Embeddings):
+    """Deterministic 16-d vectors derived from the text (no model download)."""
+
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+
+    def embed_query(self, text):
+        seed = int.from_bytes(hashlib.sha256(text.encode()).digest()[:4], "little")
+        return np.random.default_rng(seed).standard_normal(16).tolist()
+
+
+@pytest.fixture(autouse=True)
+def fresh_data(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(vector_store, "get_embeddings", lambda: HashEmbeddings())
+    monkeypatch.setattr(vector_store, "_loaded_indexes", vector_store.OrderedDict())
+
+    def flat_build(*args, **kwargs):
+        raise AssertionError("the index must be built once, by build_index")
+
+    monkeypatch.setattr(FAISS, "from_embeddings", flat_build)
+
+
+def transcript(sentences: int) -> str:
+    return " ".join(f"Sentence number {n} talks about topic {n * 7}." for n in range(sentences))
+
+
+@pytest.mark.parametrize("index_type", ["flat", "hnsw", "sq8"])
+def test_index_is_built_once_with_the_configured_structure(monkeypatch, index_type):
+    monkeypatch.setattr(config, "INDEX_TYPE", index_type)
+    store = vector_store.create_vectorstore_for_video("vsvideo0001", transcript(200))
+
+    assert read_manifest("vsvideo0001")["index"]["type"] == index_type
+    assert store.index.ntotal == len(store.index_to_docstore_id) == read_manifest("vsvideo0001")["chunks"]
+    # Row i of the index is the chunk stored under index_to_docstore_id[i]
+    first = store.docstore.search(store.index_to_docstore_id[0])
+    assert store.similarity_search(first.page_content, k=1)[0].page_content == first.page_content
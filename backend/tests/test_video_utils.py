@@ -0,0 +1,40 @@
+"""Video ID parsing and playlist sources."""
+import os
+
+import pytest
+
+from app.services.video_utils import extract_video_id, is_youtube_playlist_url, list_playlist_video_ids, read_playlist_fixture
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+@pytest.mark.parametrize("value", [
+    "dQw4w9WgXcQ",
+    "https://www.youtube.com/watch?v=dQw4w9WgXcQ&t=42",
+    "https://youtu.be/dQw4w9WgXcQ",
+])
+def test_extract_video_id(value):
+    assert extract_video_id(value) == "dQw4w9WgXcQ"
+
+
+@pytest.mark.parametrize("url, expected", [
+    ("https://www.youtube.com/playlist?list=PLabc_123-x", True),
+    ("https://music.youtube.com/watch?v=dQw4w9WgXcQ&list=PLabc", True),
+    ("https://www.youtube.com/watch?v=dQw4w9WgXcQ", False),
+    ("https://evil.example/playlist?list=PLabc", False),
+    ("file:///etc/passwd", False),
+    ("/etc/passwd", False),
+    (os.path.join(FIXTURES, "playlist.json"), False),
+])
+def test_is_youtube_playlist_url(url, expected):
+    assert is_youtube_playlist_url(url) is expected
+
+
+def test_list_playlist_refuses_local_paths():
+    with pytest.raises(ValueError):
+        list_playlist_video_ids(os.path.join(FIXTURES, "playlist.json"))
+
+
+def test_read_playlist_fixture():
+    video_ids = read_playlist_fixture(os.path.join(FIXTURES, "playlist.json"))
+    assert video_ids[:2] == ["fu6bYPTp_kE", "dQw4w9WgXcQ"]
@@ -1,7 +1,9 @@
 // Configuration
 const CONFIG = {
     API_BASE_URL: 'https://devjhawar-klypse.hf.space',
-    API_TIMEOUT: 30000
+    API_TIMEOUT: 30000,
+    STREAM_MAX_RECONNECTS: 3,
+    STREAM_RECONNECT_DELAY: 1000
 };
 
 // Installation handler
@@ -46,8 +48,23 @@ async function checkTranscript(videoId) {
   }
 }
 
-// Streaming function with full validation
-async function askQuestionStream(videoId, question, onChunk, onError) {
+// Parse one SSE event block ("id: ...\ndata: ...") into { id, data }
+function parseSseEvent(block) {
+  const event = { id: null, data: null };
+  for (const line of block.split("\n")) {
+    if (line.startsWith("id: ")) {
+      event.id = line.slice(4).trim();
+    } else if (line.startsWith("data: ")) {
+      event.data = line.slice(6).trim();
+    }
+  }
+  return event;
+}
+
+// Streaming function with full validation.
+// If the connection drops mid-answer, the same request is re-sent with
+// Last-Event-ID so the server replays only the missing frames from its buffer.
+async function askQuestionStream(videoId, question, onChunk, onError, onReset) {
   try {
     // CRITICAL: Validate video ID
     if (!videoId || typeof videoId !== 'string') {
@@ -79,59 +96,103 @@ async function askQuestionStream(videoId, question, onChunk, onError) {
     console.log(`🔄 Starting stream for video ${videoId}`);
     console.log(`📝 Question: "${question}"`);
 
-    const response = await fetch(`${apiUrl}/ask/stream`, {
-      method: 'POST',
-      headers: { 
+    let lastEventId = null;
+    let streamId = null;
+
+    for (let attempt = 0; attempt <= CONFIG.STREAM_MAX_RECONNECTS; attempt++) {
+      if (attempt > 0) {
+        console.log(`🔁 Reconnecting (attempt ${attempt}) after ${lastEventId}`);
+        await new Promise((resolve) => setTimeout(resolve, CONFIG.STREAM_RECONNECT_DELAY * attempt));
+      }
+
+      const headers = { 
         'Content-Type': 'application/json',
         'Accept': 'text/event-stream'
-      },
-      body: JSON.stringify({ 
-        video_id: videoId, 
-        question: question 
-      })
-    });
-
-    if (!response.ok) {
-      throw new Error(`HTTP error! status: ${response.status}`);
-    }
+      };
+      if (lastEventId) {
+        headers['Last-Event-ID'] = lastEventId;
+      }
 
-    if (!response.body) {
-      throw new Error("No response body for streaming");
-    }
+      let response;
+      try {
+        response = await fetch(`${apiUrl}/ask/stream`, {
+          method: 'POST',
+          headers,
+          body: JSON.stringify({ 
+            video_id: videoId, 
+            question: question 
+          })
+        });
+      } catch (networkError) {
+        console.warn('✗ Stream request failed:', networkError);
+        continue;
+      }
 
-    const reader = response.body.getReader();
-    const decoder = new TextDecoder();
-    let buffer = "";
+      if (!response.ok) {
+        throw new Error(`HTTP error! status: ${response.status}`);
+      }
 
-    while (true) {
-      const { value, done } = await reader.read();
-      if (done) {
-        console.log('✓ Stream completed');
-        break;
+      if (!response.body) {
+        throw new Error("No response body for streaming");
       }
 
-      buffer += decoder.decode(value, { stream: true });
+      // The server could not resume (buffer expired or another worker): it
+      // started over under a new stream id, so drop what was shown so far.
+      const responseStreamId = response.headers.get('X-Stream-ID');
+      if (streamId && responseStreamId && responseStreamId !== streamId) {
+        console.log('↺ Stream restarted from the beginning');
+        onReset();
+      }
+      streamId = responseStreamId;
 
-      // Split on SSE event boundaries
-      const events = buffer.split("\n\n");
-      buffer = events.pop(); // Keep incomplete event in buffer
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = "";
 
-      for (const event of events) {
-        if (event.startsWith("data: ")) {
-          const chunk = event.replace("data: ", "").trim();
-          
-          if (chunk === "[END]") {
-            console.log('✓ Stream ended normally');
-            return;
+      try {
+        while (true) {
+          const { value, done } = await reader.read();
+          if (done) {
+            break;
           }
-          
-          if (chunk.length > 0) {
-            console.log('📦 Chunk received:', chunk.substring(0, 50) + (chunk.length > 50 ? '...' : ''));
-            onChunk(chunk);
+
+          buffer += decoder.decode(value, { stream: true });
+
+          // Split on SSE event boundaries
+          const events = buffer.split("\n\n");
+          buffer = events.pop(); // Keep incomplete event in buffer
+
+          for (const block of events) {
+            const event = parseSseEvent(block);
+            if (event.id) {
+              lastEventId = event.id;
+            }
+            if (event.data === null) {
+              continue;
+            }
+
+            if (event.data === "[END]") {
+              console.log('✓ Stream ended normally');
+              return;
+            }
+
+            if (event.data.length > 0) {
+              console.log('📦 Chunk received:', event.data.substring(0, 50) + (event.data.length > 50 ? '...' : ''));
+              onChunk(event.data);
+            }
           }
         }
+      } catch (readError) {
+        console.warn('✗ Stream interrupted:', readError);
+      }
+
+      // Connection closed before [END]; without an id we cannot resume
+      if (!lastEventId) {
+        throw new Error('Stream closed before any data was received');
       }
     }
+
+    throw new Error('Connection lost and could not be resumed');
   } catch (error) {
     console.error('✗ Streaming error:', error);
     onError(error.message);
@@ -203,6 +264,18 @@ chrome.runtime.onMessage.addListener((request, sender, sendResponse) => {
             });
           }
         });
+      },
+      () => {
+        // Server restarted the answer: clear the partial text
+        chrome.tabs.query({ active: true, currentWindow: true }, (tabs) => {
+          if (tabs && tabs[0]) {
+            chrome.tabs.sendMessage(tabs[0].id, { 
+              type: 'STREAM_RESET' 
+            }).catch(err => {
+              console.error('Error sending reset to tab:', err);
+            });
+          }
+        });
       }
     );
     
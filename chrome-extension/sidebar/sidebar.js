@@ -285,6 +285,14 @@ window.addEventListener("message", (event) => {
         }
     }
     
+    if (event.data?.type === 'STREAM_RESET') {
+        const lastMsg = chatContainer.querySelector('.message.bot:last-child');
+        const textSpan = lastMsg && lastMsg.querySelector('.message-text');
+        if (textSpan) {
+            textSpan.textContent = '';
+        }
+    }
+    
     if (event.data?.type === 'STREAM_ERROR') {
         const lastMsg = chatContainer.querySelector('.message.bot:last-child');
         if (lastMsg) {